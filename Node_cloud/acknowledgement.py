@@ -1,6 +1,11 @@
+import logging
 import requests
 import re
 
+
+logger = logging.getLogger(__name__)
+
+
 class AcknowledgementSender:
     """Sends acknowledgment, enode, and required files to the Fog Node."""
 
@@ -43,7 +48,7 @@ class AcknowledgementSender:
             return None
 
         except requests.exceptions.RequestException as e:
-            print(f"Error fetching enode: {e}")
+            logger.error("Error fetching enode: %s", e)
             return None
         
 
@@ -53,17 +58,14 @@ class AcknowledgementSender:
         # Fetch enode ID
         enode_id = self.get_enode()
         if not enode_id:
-            print("Error: Enode could not be retrieved!")
+            logger.error("Enode could not be retrieved!")
             return
 
         data = {
             "node_id": node_id,
             "enode": enode_id  # Include enode in the acknowledgment data
         }
-        print(self.registering_node_url)
-        print(self.genesis_file)
-        print(self.node_registry_file)
-        print(self.prefunded_keys_file)
+        logger.debug("Sending %s, %s and %s to %s", self.genesis_file, self.node_registry_file, self.prefunded_keys_file, self.registering_node_url)
 
         files = {
             "genesis_file": open(self.genesis_file, "rb"),
@@ -75,12 +77,12 @@ class AcknowledgementSender:
             response = requests.post(f"{self.registering_node_url}/acknowledgement", data=data, files=files)
 
             if response.status_code == 200:
-                print(f"Acknowledgment sent successfully to Node {node_id} with enode: {enode_id}")
+                logger.info("Acknowledgment sent successfully to Node %s with enode: %s", node_id, enode_id)
             else:
-                print(f"Failed to send acknowledgment: {response.json()}")
+                logger.error("Failed to send acknowledgment: %s", response.text)
 
         except Exception as e:
-            print(f"Error sending acknowledgment: {e}")
+            logger.error("Error sending acknowledgment: %s", e)
 
         finally:
             # Close file handles
@@ -11,15 +11,108 @@ const fetch = require("node-fetch");
 const networkId = Object.keys(contractJson.networks)[0];
 const contractAddress = contractJson.networks[networkId].address;
 const accountsData = JSON.parse(fs.readFileSync(path.join(rootPath, 'prefunded_keys.json')));
-const account = accountsData.prefunded_accounts[0].address; 
-const privateKey = accountsData.prefunded_accounts[0].private_key; 
+// Each worker of a prefork server sends from its own account (see InteractDaemon).
+const accountIndex = Number(process.env.PREFUNDED_ACCOUNT_INDEX || 0);
+const account = accountsData.prefunded_accounts[accountIndex].address;
+const privateKey = accountsData.prefunded_accounts[accountIndex].private_key;
 const contract = new web3.eth.Contract(contractJson.abi, contractAddress);
 
+// ----------------------------------NONCES----------------------------------------------------
+// Nonces of the prefunded account are counted here instead of reading the pending count before
+// every transaction, so transactions sent at the same time (daemon mode) get distinct nonces and
+// can share a block. Allocation is chained on a promise, so it is atomic.
+// A nonce whose transaction never reached the pool is released and handed out again, lowest
+// first, so it does not leave a gap. A nonce error resyncs: the pending count is read again,
+// and the nonces of transactions still in flight are skipped over.
+const NONCE_ERRORS = ["nonce too low", "nonce too high", "nonce too far", "known transaction", "already known", "replacement transaction underpriced"];
+let nextNonce = null;
+let nonceAllocation = Promise.resolve();
+const inFlightNonces = new Set();
+let releasedNonces = [];  // Sorted, lowest first.
+
+function allocateNonce(web3ToUse = web3) {
+    const allocation = nonceAllocation.then(async () => {
+        let nonce;
+        if (releasedNonces.length > 0) {
+            nonce = releasedNonces.shift();
+        } else {
+            if (nextNonce === null) {
+                nextNonce = Number(await web3ToUse.eth.getTransactionCount(account, 'pending'));
+            }
+            while (inFlightNonces.has(nextNonce)) {
+                nextNonce++;
+            }
+            nonce = nextNonce++;
+        }
+        inFlightNonces.add(nonce);
+        return nonce;
+    });
+    nonceAllocation = allocation.catch(() => {});
+    return allocation;
+}
+
+// The transaction with `nonce` was mined (reverted transactions use up their nonce too).
+function nonceDone(nonce) {
+    inFlightNonces.delete(nonce);
+}
+
+// The transaction with `nonce` was rejected before reaching the pool: hand the nonce out again.
+function releaseNonce(nonce) {
+    if (!inFlightNonces.delete(nonce) || nextNonce === null) {
+        return;
+    }
+    if (nonce === nextNonce - 1) {
+        nextNonce = nonce;
+    } else if (nonce < nextNonce) {
+        const index = releasedNonces.findIndex(released => released > nonce);
+        releasedNonces.splice(index === -1 ? releasedNonces.length : index, 0, nonce);
+    }
+}
+
+// A transaction with `nonce` failed in a way that may have left a gap, or another process sent
+// from the account: read the pending count from the chain again on the next allocation.
+// The other transactions in flight keep their nonces.
+function resyncNonce(nonce) {
+    if (nonce !== undefined) {
+        inFlightNonces.delete(nonce);
+    }
+    nextNonce = null;
+    releasedNonces = [];
+}
+
+function isNonceError(error) {
+    const message = [error.message, error.cause && error.cause.message, error.innerError && error.innerError.message].join(" ").toLowerCase();
+    return NONCE_ERRORS.some(text => message.includes(text));
+}
+
+// Signs and sends `tx`, whose nonce comes from allocateNonce, and returns its receipt.
+// On failure the nonce is done (mined but reverted), resynced (a nonce error, or sent but never
+// seen mined) or released (rejected before reaching the pool).
+async function sendTransaction(tx, web3ToUse = web3) {
+    let sent = false;
+    try {
+        const signedTx = await web3ToUse.eth.accounts.signTransaction(tx, privateKey);
+        const receipt = await web3ToUse.eth.sendSignedTransaction(signedTx.rawTransaction)
+            .on('transactionHash', () => { sent = true; });
+        nonceDone(tx.nonce);
+        return receipt;
+    } catch (error) {
+        if (error.receipt) {
+            nonceDone(tx.nonce);
+        } else if (sent || isNonceError(error)) {
+            resyncNonce(tx.nonce);
+        } else {
+            releaseNonce(tx.nonce);
+        }
+        throw error;
+    }
+}
+
 // ----------------------------------TRANSACTIONS----------------------------------------------------
 async function emitValidatorProposalToChain(validatorAddress) {
     try {
         const txData = contract.methods.proposeValidator(validatorAddress).encodeABI();
-        const nonce = await web3.eth.getTransactionCount(account, "pending");
+        const nonce = await allocateNonce();
         
 
         const tx = {
@@ -31,8 +124,7 @@ async function emitValidatorProposalToChain(validatorAddress) {
             data: txData
         };
 
-        const signedTx = await web3.eth.accounts.signTransaction(tx, privateKey);
-        const receipt = await web3.eth.sendSignedTransaction(signedTx.rawTransaction);
+        const receipt = await sendTransaction(tx);
 
         console.log("Tx Sent. Hash:", receipt.transactionHash);
 
@@ -52,12 +144,15 @@ async function emitValidatorProposalToChain(validatorAddress) {
 
         if (decodedEvent) {
             console.log(decodedEvent.validator);
+            return decodedEvent.validator;
         } else {
             console.log("No ValidatorProposed event found in logs.");
+            return null;
         }
 
     } catch (error) {
         console.error("Error emitting validator proposal:", error);
+        throw error;
     }
 }
 
@@ -67,9 +162,7 @@ async function registerNode(nodeId, nodeName, senderNodeTypeStr, publicKey, addr
             nodeId, nodeName, senderNodeTypeStr, publicKey, address, rpcURL, receiverNodeTypeStr, nodeSignature
         ).encodeABI();
 
-        let latestNonce = await web3.eth.getTransactionCount(account, 'pending');
-        let nonce = Number(latestNonce) + 1;
-        console.log("Nonce:", nonce);
+        let latestNonce = await allocateNonce();
 
         const tx = {
             from: account,
@@ -80,10 +173,10 @@ async function registerNode(nodeId, nodeName, senderNodeTypeStr, publicKey, addr
             data: txData
         };
 
-        const signedTx = await web3.eth.accounts.signTransaction(tx, privateKey);
-        const receipt = await web3.eth.sendSignedTransaction(signedTx.rawTransaction);
+        const receipt = await sendTransaction(tx);
 
         console.log("Transaction Hash:", receipt.transactionHash);
+        const result = { transactionHash: receipt.transactionHash, blockNumber: Number(receipt.blockNumber), event: null };
 
         for (const log of receipt.logs) {
             if (log.address.toLowerCase() === contractAddress.toLowerCase()) {
@@ -98,20 +191,30 @@ async function registerNode(nodeId, nodeName, senderNodeTypeStr, publicKey, addr
 
                     if (eventAbi.name === "NodeRegistered") {
                         console.log(`Node Signature: ${decoded.nodeSignature}`);
+                        result.event = {
+                            nodeName: decoded.nodeName,
+                            nodeType: decoded.nodeType,
+                            publicKey: decoded.publicKey,
+                            registeredBy: decoded.registeredBy,
+                            registeredByNodeType: decoded.registeredByNodeType,
+                            nodeSignature: decoded.nodeSignature
+                        };
                     }
                 }
             }
         }
+        return result;
 
     } catch (error) {
         console.error("Error Registering Node:", error);
+        throw error;
     }
 }
 
 async function issueCapabilityToken(fromNodeSignature, toNodeSignature) {
     try {
         const txData = contract.methods.issueToken(fromNodeSignature, toNodeSignature).encodeABI();
-        const nonce = await web3.eth.getTransactionCount(account, 'pending');
+        const nonce = await allocateNonce();
         const tx = {
             from: account,
             to: contractAddress,
@@ -121,10 +224,10 @@ async function issueCapabilityToken(fromNodeSignature, toNodeSignature) {
             data: txData
         };
 
-        const signedTx = await web3.eth.accounts.signTransaction(tx, privateKey);
-        const receipt = await web3.eth.sendSignedTransaction(signedTx.rawTransaction);
+        const receipt = await sendTransaction(tx);
 
         console.log("Token issued. Tx Hash:", receipt.transactionHash);
+        const result = { transactionHash: receipt.transactionHash, blockNumber: Number(receipt.blockNumber), event: null };
 
         const event = receipt.logs.find(log => log.address.toLowerCase() === contractAddress.toLowerCase());
         if (event) {
@@ -140,17 +243,25 @@ async function issueCapabilityToken(fromNodeSignature, toNodeSignature) {
             console.log("-> To Signature:", decoded.toNodeSignature);
             console.log("-> Policy:", decoded.policy);
             console.log("-> Issued At:", new Date(Number(decoded.issuedAt) * 1000).toISOString());
+            result.event = {
+                fromNodeSignature: decoded.fromNodeSignature,
+                toNodeSignature: decoded.toNodeSignature,
+                policy: decoded.policy,
+                issuedAt: decoded.issuedAt
+            };
         }
+        return result;
 
     } catch (error) {
         console.error("Error issuing token:", error.message);
+        throw error;
     }
 }
 
 async function revokeCapabilityToken(fromNodeSignature, toNodeSignature) {
     try {
         const txData = contract.methods.revokeToken(fromNodeSignature, toNodeSignature).encodeABI();
-        const latestNonce = await web3.eth.getTransactionCount(account, 'pending');
+        const latestNonce = await allocateNonce();
 
         const tx = {
             from: account,
@@ -161,10 +272,10 @@ async function revokeCapabilityToken(fromNodeSignature, toNodeSignature) {
             data: txData
         };
 
-        const signedTx = await web3.eth.accounts.signTransaction(tx, privateKey);
-        const receipt = await web3.eth.sendSignedTransaction(signedTx.rawTransaction);
+        const receipt = await sendTransaction(tx);
 
         console.log("Token revoked. Tx Hash:", receipt.transactionHash);
+        const result = { transactionHash: receipt.transactionHash, blockNumber: Number(receipt.blockNumber), event: null };
 
         const log = receipt.logs.find(log => log.address.toLowerCase() === contractAddress.toLowerCase());
         if (log) {
@@ -176,10 +287,33 @@ async function revokeCapabilityToken(fromNodeSignature, toNodeSignature) {
             console.log("TokenRevoked Event:");
             console.log("-> From Signature:", decoded.fromNodeSignature);
             console.log("-> To Signature:", decoded.toNodeSignature);
+            result.event = {
+                fromNodeSignature: decoded.fromNodeSignature,
+                toNodeSignature: decoded.toNodeSignature
+            };
         }
+        return result;
     } catch (error) {
         console.error("Error revoking token:", error.message);
+        throw error;
+    }
+}
+
+// Replaces an expired token: revokes it, then issues a new one. A token already revoked (e.g. by a
+// concurrent renewal) is still reissued; any other revoke failure is thrown.
+async function renewCapabilityToken(fromNodeSignature, toNodeSignature) {
+    try {
+        await revokeCapabilityToken(fromNodeSignature, toNodeSignature);
+    } catch (error) {
+        // The receipt of a reverted transaction has no reason: replay the call for it.
+        const reason = await contract.methods.revokeToken(fromNodeSignature, toNodeSignature).call({ from: account })
+            .then(() => null, callError => [callError.message, callError.reason, callError.cause && callError.cause.message].join(" "));
+        if (!reason || !reason.includes("Token already revoked")) {
+            throw error;
+        }
+        console.log("Token already revoked. Reissuing.");
     }
+    return issueCapabilityToken(fromNodeSignature, toNodeSignature);
 }
 
 // ----------------------------------NODE RELATED FUNCTIONS----------------------------------------------------------------
@@ -196,6 +330,18 @@ async function isNodeRegistered(nodeSignature) {
     }
 }
 
+// isNodeRegistered for many nodes, the calls sent concurrently.
+async function areNodesRegistered(...nodeSignatures) {
+    try {
+        const registered = await Promise.all(nodeSignatures.map(signature => contract.methods.isNodeRegistered(signature).call()));
+        console.log(registered);
+        return registered;
+    } catch (error) {
+        console.error("Error Checking Node Registrations:", error.message);
+        throw error;
+    }
+}
+
 async function getNodeDetails(nodeSignature) {
     try {
         const result = await contract.methods.getNodeDetailsBySignature(nodeSignature).call();
@@ -210,11 +356,13 @@ async function getNodeDetails(nodeSignature) {
             registeredByNodeType: result[7].toString(),
         };
         console.log(JSON.stringify(details));
+        return details;
     } catch (error) {
         console.log(JSON.stringify({
             error: "Error fetching node details",
             message: error.message
         }));
+        throw error;
     }
 }
 
@@ -231,8 +379,19 @@ async function getNodeDetailsByAddress(nodeAddress) {
         console.log("-> Registered By (address):", details[5]);
         console.log("-> Node Signature:", details[6]);
         console.log("-> Registered By Node Type (Enum Index):", details[7]);
+        return {
+            nodeId: details[0],
+            nodeName: details[1],
+            nodeType: details[2].toString(),
+            publicKey: details[3],
+            isRegistered: details[4],
+            registeredBy: details[5],
+            nodeSignature: details[6],
+            registeredByNodeType: details[7].toString(),
+        };
     } catch (error) {
         console.error("Error fetching node details by address:", error.message);
+        throw error;
     }
 }
 
@@ -291,8 +450,37 @@ async function getCapabilityToken(fromNodeSignature, toNodeSignature) {
         console.log("-> Issued At (UTC):", new Date(Number(token.issuedAt) * 1000).toISOString());
         console.log("-> Is Issued:", token.isIssued);
         console.log("-> Is Revoked:", token.isRevoked);
+        return tokenInfo(token);
     } catch (error) {
         console.error("Error fetching token:", error.message);
+        throw error;
+    }
+}
+
+// getToken's result as returned to callers.
+function tokenInfo(token) {
+    return {
+        policy: token.policy,
+        issuedAt: token.issuedAt,
+        isIssued: token.isIssued,
+        isRevoked: token.isRevoked
+    };
+}
+
+// getToken for many pairs, given as fromSignature, toSignature, fromSignature, ...
+// The getToken calls are sent concurrently.
+async function getCapabilityTokens(...nodeSignatures) {
+    const pairs = [];
+    for (let i = 0; i + 1 < nodeSignatures.length; i += 2) {
+        pairs.push([nodeSignatures[i], nodeSignatures[i + 1]]);
+    }
+    try {
+        const tokens = await Promise.all(pairs.map(async ([from, to]) => tokenInfo(await contract.methods.getToken(from, to).call())));
+        console.log(`Fetched ${tokens.length} capability tokens`);
+        return tokens;
+    } catch (error) {
+        console.error("Error fetching tokens:", error.message);
+        throw error;
     }
 }
 
@@ -300,8 +488,10 @@ async function checkCapabilityToken(fromNodeSignature, toNodeSignature) {
     try {
         const isValid = await contract.methods.checkToken(fromNodeSignature, toNodeSignature).call();
         console.log(isValid); 
+        return isValid;
     } catch (error) {
         console.error("Error checking token:", error.message);
+        throw error;
     }
 }
 
@@ -317,9 +507,69 @@ async function checkTokenExpiry(fromNodeSignature, toNodeSignature, validityPeri
         // console.log(`→ To: ${toNodeSignature}`);
         // console.log(`→ Validity Period: ${validityPeriodInSeconds} seconds`);
         console.log(`${isExpired}`);
+        return isExpired;
     } catch (error) {
         console.error("Error checking token expiry:", error.message);
+        throw error;
+    }
+}
+
+// Reads everything an access decision needs, pinned to one block so the answers are consistent.
+async function authorizationSnapshot(fromNodeSignature, toNodeSignature, validityPeriodInSeconds) {
+    const block = await web3.eth.getBlockNumber();
+    const code = await web3.eth.getCode(contractAddress, block);
+    const deployed = code !== '0x' && code !== '0x0';
+    if (!deployed) {
+        return { block, deployed };
     }
+
+    const [registered, details, tokenAvailable, tokenExpired, token] = await Promise.all([
+        contract.methods.isNodeRegistered(fromNodeSignature).call({}, block),
+        contract.methods.getNodeDetailsBySignature(fromNodeSignature).call({}, block).catch(() => null),
+        contract.methods.checkToken(fromNodeSignature, toNodeSignature).call({}, block),
+        contract.methods.isTokenExpired(fromNodeSignature, toNodeSignature, validityPeriodInSeconds).call({}, block),
+        contract.methods.getToken(fromNodeSignature, toNodeSignature).call({}, block)
+    ]);
+
+    return {
+        block,
+        deployed,
+        registered,
+        details: details && {
+            nodeId: details[0],
+            nodeName: details[1],
+            nodeType: details[2].toString(),
+            publicKey: details[3],
+            isRegistered: details[4],
+            registeredBy: details[5],
+            nodeSignature: details[6],
+            registeredByNodeType: details[7].toString(),
+        },
+        tokenAvailable,
+        tokenExpired,
+        token: {
+            policy: token.policy,
+            issuedAt: token.issuedAt,
+            isIssued: token.isIssued,
+            isRevoked: token.isRevoked
+        }
+    };
+}
+
+// Decoded contract events of the given names between two blocks, oldest first.
+async function getContractEvents(fromBlock, toBlock, ...eventNames) {
+    const events = await contract.getPastEvents('allEvents', { fromBlock, toBlock });
+    return events
+        .filter(event => eventNames.length === 0 || eventNames.includes(event.event))
+        .map(event => {
+            const args = {};
+            for (const [name, value] of Object.entries(event.returnValues)) {
+                if (name !== '__length__' && isNaN(Number(name))) {
+                    args[name] = typeof value === 'bigint' ? value.toString() : value;
+                }
+            }
+            return { event: event.event, args, blockNumber: Number(event.blockNumber), transactionHash: event.transactionHash };
+        });
 }
 
 // ----------------------------------VALIDATOR RELATED FUNCTIONS----------------------------------------------------------------
@@ -343,12 +593,16 @@ async function watchValidatorProposals() {
             toBlock: 'latest'
         });
 
+        const validators = [];
         for (const event of pastEvents) {
             console.log(event.returnValues.validator);
+            validators.push(event.returnValues.validator.toLowerCase());
         }
+        return validators;
 
     } catch (err) {
         console.error("Error during event handling:", err);
+        throw err;
     }
 }
 
@@ -369,8 +623,10 @@ async function proposeValidatorVote(validatorAddress, add) {
 
         const data = await response.json();
         console.log("Vote submitted:", data);
+        return data.result;
     } catch (error) {
         console.error("Error proposing validator vote:", error);
+        throw error;
     }
 }
 
@@ -470,9 +726,82 @@ async function getPeerCount(rpcURL) {
     }
 }
 
+// ----------------------------------DAEMON MODE----------------------------------------------------------------
+
+// Every CLI verb, callable by name from one long-lived process ("node interact.js daemon").
+// Requests and responses are line-delimited JSON on stdin/stdout:
+//   -> {"id": 7, "method": "isNodeRegistered", "params": ["0x..."]}
+//   <- {"id": 7, "result": true}  or  {"id": 7, "error": {"message": "..."}}
+const daemonCommands = {
+    registerNode,
+    isNodeRegistered,
+    areNodesRegistered,
+    getNodeDetails,
+    getNodeDetailsByAddress,
+    checkIfDeployed: () => checkIfDeployed(contractAddress),
+    isValidator,
+    proposeValidatorVote,
+    getValidatorsByBlockNumber: () => getValidatorsByBlockNumber(rpcURL),
+    emitValidatorProposalToChain,
+    listenForValidatorProposals: () => watchValidatorProposals(),
+    issueCapabilityToken,
+    revokeCapabilityToken,
+    renewCapabilityToken,
+    getCapabilityToken,
+    getCapabilityTokens,
+    checkCapabilityToken,
+    checkTokenExpiry,
+    authorizationSnapshot,
+    getContractEvents,
+    getBlockNumber: () => web3.eth.getBlockNumber(),
+    getBlockHash: async (blockNumber) => { const block = await web3.eth.getBlock(blockNumber); return block ? block.hash : null; },
+    getPeerCount: () => getPeerCount(rpcURL)
+};
+
+function toJson(value) {
+    return JSON.stringify(value, (key, item) => typeof item === "bigint" ? Number(item) : item);
+}
+
+function startDaemon() {
+    // stdout carries the protocol, so the human-readable logging of the functions goes to stderr.
+    console.log = (...items) => console.error(...items);
+    const readline = require("readline");
+    const lines = readline.createInterface({ input: process.stdin, terminal: false });
+    const respond = (response) => process.stdout.write(toJson(response) + "\n");
+
+    lines.on("line", (line) => {
+        if (!line.trim()) {
+            return;
+        }
+        let request;
+        try {
+            request = JSON.parse(line);
+        } catch (error) {
+            respond({ id: null, error: { message: `Invalid JSON request: ${error.message}` } });
+            return;
+        }
+
+        const handler = daemonCommands[request.method];
+        if (!handler) {
+            respond({ id: request.id, error: { message: `Unknown method: ${request.method}` } });
+            return;
+        }
+
+        // Transactions run concurrently too: allocateNonce keeps their nonces distinct.
+        Promise.resolve()
+            .then(() => handler(...(request.params || [])))
+            .then(result => respond({ id: request.id, result: result === undefined ? null : result }))
+            .catch(error => respond({ id: request.id, error: { message: error.reason || error.message || String(error) } }));
+    });
+
+    lines.on("close", () => process.exit(0));
+    respond({ id: null, event: "ready", contractAddress });
+}
+
 module.exports = {
     registerNode,
     isNodeRegistered,
+    areNodesRegistered,
     getNodeDetails,
     checkIfDeployed,
     proposeValidatorVote,
@@ -480,7 +809,9 @@ module.exports = {
     getAllTransactions,
     issueCapabilityToken,
     revokeCapabilityToken,
+    renewCapabilityToken,
     getCapabilityToken,
+    getCapabilityTokens,
     checkTokenExpiry,
     watchValidatorProposals,
     emitValidatorProposalToChain,
@@ -496,6 +827,10 @@ if (require.main === module) {
 
     (async () => {
 
+        if (command === "daemon") {
+            startDaemon();
+        }
+
         if (command === "listenForValidatorProposals") {
             watchValidatorProposals();
         }
@@ -516,11 +851,19 @@ if (require.main === module) {
             const toNodeSignature = args[2];
             await revokeCapabilityToken(fromNodeSignature, toNodeSignature);
         }
+        if (command === "renewCapabilityToken") {
+            const fromNodeSignature = args[1];
+            const toNodeSignature = args[2];
+            await renewCapabilityToken(fromNodeSignature, toNodeSignature);
+        }
         if (command === "getCapabilityToken") {
             const fromNodeSignature = args[1];
             const toNodeSignature = args[2];
             await getCapabilityToken(fromNodeSignature, toNodeSignature);
         }
+        if (command === "getCapabilityTokens") {
+            await getCapabilityTokens(...args.slice(1));
+        }
         if (command === "checkTokenExpiry") {
             const fromNodeSignature = args[1];
             const toNodeSignature = args[2];
@@ -540,6 +883,10 @@ if (require.main === module) {
             const result = await isNodeRegistered(nodeSignature);
         }
 
+        if (command === "areNodesRegistered") {
+            await areNodesRegistered(...args.slice(1));
+        }
+
         if (command === "getNodeDetails") {
             const nodeSignature = args[1];
             await getNodeDetails(nodeSignature);
@@ -603,7 +950,9 @@ if (require.main === module) {
                 nodeSignature
             );
         }
-    })();
+    })().catch(() => {
+        process.exitCode = 1;
+    });
 }
 
 // registerNode(
@@ -0,0 +1,223 @@
+import atexit
+import itertools
+import json
+import logging
+import os
+import subprocess
+import threading
+import time
+from chain_gateway import ChainError
+
+
+logger = logging.getLogger(__name__)
+
+
+class InteractDaemon:
+    """Client for a long-lived `node interact.js daemon` process.
+
+    Concurrent Flask requests share the one warm process: each request gets an id,
+    responses are matched back by id, and a crashed daemon is restarted on the next call.
+    """
+
+    def __init__(self, interact_file_path, timeout=180, confirmations=0, account_index=0):
+        """
+        :param interact_file_path: Path to interact.js.
+        :param timeout: Seconds to wait for a response (transactions wait for their receipt).
+        :param confirmations: Blocks that must be mined on top of a transaction's block before it counts as done.
+        :param account_index: Index in prefunded_accounts of the account interact.js sends from.
+        """
+        self.interact_file_path = interact_file_path
+        self.account_index = account_index
+        self.confirmations = confirmations
+        self.artifact_path = os.path.join(os.path.dirname(interact_file_path), "data", "NodeRegistry.json")
+        self._artifact_mtime = None
+        self.timeout = timeout
+        self.process = None
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def _artifact_changed(self):
+        try:
+            return os.stat(self.artifact_path).st_mtime_ns != self._artifact_mtime
+        except FileNotFoundError:
+            return False
+
+    def _start(self):
+        # interact.js reads the contract address once at start-up.
+        try:
+            self._artifact_mtime = os.stat(self.artifact_path).st_mtime_ns
+        except FileNotFoundError:
+            self._artifact_mtime = None
+        self.process = subprocess.Popen(
+            ["node", self.interact_file_path, "daemon"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+            cwd=os.path.dirname(self.interact_file_path),
+            env=dict(os.environ, PREFUNDED_ACCOUNT_INDEX=str(self.account_index))
+        )
+        reader = threading.Thread(target=self._read_responses, args=(self.process,))
+        reader.daemon = True
+        reader.start()
+
+    def _read_responses(self, process):
+        for line in process.stdout:
+            try:
+                response = json.loads(line)
+            except json.JSONDecodeError:
+                logger.debug("Unexpected output from interact.js daemon: %s", line.strip())
+                continue
+            with self._lock:
+                waiter = self._pending.pop(response.get("id"), None)
+            if waiter is not None:
+                waiter["response"] = response
+                waiter["done"].set()
+
+        # The daemon exited: fail every request still waiting on it.
+        with self._lock:
+            if self.process is process:
+                self.process = None
+            waiters = [waiter for waiter in self._pending.values() if waiter["process"] is process]
+            for request_id in [key for key, waiter in self._pending.items() if waiter["process"] is process]:
+                del self._pending[request_id]
+        for waiter in waiters:
+            waiter["response"] = {"error": {"message": "interact.js daemon exited"}}
+            waiter["done"].set()
+
+    def request(self, method, *params):
+        """Sends one command to the daemon and returns its result."""
+        with self._lock:
+            if self.process is not None and self.process.poll() is None and self._artifact_changed():
+                logger.info("Smart contract artifact changed. Restarting interact.js daemon.")
+                self.process.stdin.close()
+                self.process = None
+            if self.process is None or self.process.poll() is not None:
+                self._start()
+            request_id = next(self._ids)
+            waiter = {"done": threading.Event(), "response": None, "process": self.process}
+            self._pending[request_id] = waiter
+            try:
+                self.process.stdin.write(json.dumps({"id": request_id, "method": method, "params": list(params)}) + "\n")
+                self.process.stdin.flush()
+            except (BrokenPipeError, OSError) as e:
+                del self._pending[request_id]
+                self.process = None
+                raise ChainError(f"interact.js daemon is not reachable: {e}")
+
+        if not waiter["done"].wait(self.timeout):
+            with self._lock:
+                self._pending.pop(request_id, None)
+            raise ChainError(f"Timed out waiting for interact.js {method}")
+
+        response = waiter["response"]
+        if response.get("error"):
+            raise ChainError(response["error"].get("message", "interact.js error"))
+        return response.get("result")
+
+    def close(self):
+        with self._lock:
+            process, self.process = self.process, None
+        if process is not None and process.poll() is None:
+            process.stdin.close()
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    # ----------------------------------TRANSACTIONS----------------------------------
+
+    def _confirmed(self, result, poll_interval=0.5):
+        """Waits until the block of a transaction result has `confirmations` blocks on top of it."""
+        if self.confirmations <= 0 or not result or result.get("blockNumber") is None:
+            return result
+        target = int(result["blockNumber"]) + self.confirmations
+        deadline = time.monotonic() + self.timeout
+        while self.head_block() < target:
+            if time.monotonic() > deadline:
+                raise ChainError(f"Timed out waiting for {self.confirmations} confirmations of {result['transactionHash']}")
+            time.sleep(poll_interval)
+        return result
+
+    def register_node(self, node_id, node_name, node_type, public_key, address, rpc_url, receiver_node_type, node_signature, reg_by_signature=None):
+        params = [node_id, node_name, node_type, public_key, address, rpc_url, receiver_node_type, node_signature]
+        if reg_by_signature is not None:
+            params.append(reg_by_signature)
+        return self._confirmed(self.request("registerNode", *params))
+
+    def issue_token(self, from_signature, to_signature, route_signature=None):
+        # interact.js routes token transactions by the receiving node itself.
+        return self._confirmed(self.request("issueCapabilityToken", from_signature, to_signature))
+
+    def revoke_token(self, from_signature, to_signature, route_signature=None):
+        return self._confirmed(self.request("revokeCapabilityToken", from_signature, to_signature))
+
+    def renew_token(self, from_signature, to_signature, route_signature=None):
+        return self._confirmed(self.request("renewCapabilityToken", from_signature, to_signature))
+
+    def emit_validator_proposal(self, validator_address):
+        return self.request("emitValidatorProposalToChain", validator_address)
+
+    # ----------------------------------NODE RELATED FUNCTIONS----------------------------------
+
+    def is_node_registered(self, node_signature):
+        return self.request("isNodeRegistered", node_signature)
+
+    def are_nodes_registered(self, node_signatures):
+        return self.request("areNodesRegistered", *node_signatures)
+
+    def get_node_details(self, node_signature):
+        return self.request("getNodeDetails", node_signature)
+
+    def get_node_details_by_address(self, address):
+        return self.request("getNodeDetailsByAddress", address)
+
+    # ----------------------------------TOKEN RELATED FUNCTIONS----------------------------------
+
+    def get_token(self, from_signature, to_signature):
+        return self.request("getCapabilityToken", from_signature, to_signature)
+
+    def get_tokens(self, pairs):
+        return self.request("getCapabilityTokens", *[signature for pair in pairs for signature in pair])
+
+    def check_token(self, from_signature, to_signature):
+        return self.request("checkCapabilityToken", from_signature, to_signature)
+
+    def is_token_expired(self, from_signature, to_signature, validity_period):
+        return self.request("checkTokenExpiry", from_signature, to_signature, str(validity_period))
+
+    def authorization_snapshot(self, from_signature, to_signature, validity_period):
+        return self.request("authorizationSnapshot", from_signature, to_signature, str(validity_period))
+
+    # ----------------------------------VALIDATOR RELATED FUNCTIONS----------------------------------
+
+    def is_validator(self, node_signature):
+        return self.request("isValidator", node_signature)
+
+    def get_validators(self):
+        return [address.lower() for address in self.request("getValidatorsByBlockNumber") or []]
+
+    def propose_validator_vote(self, validator_address, add):
+        return self.request("proposeValidatorVote", validator_address, "true" if add in (True, "true") else "false")
+
+    def get_validator_proposals(self):
+        return self.request("listenForValidatorProposals") or []
+
+    # ----------------------------------GENERAL FUNCTIONS----------------------------------
+
+    def check_if_deployed(self):
+        return self.request("checkIfDeployed")
+
+    def get_peer_count(self):
+        return self.request("getPeerCount")
+
+    def head_block(self):
+        return int(self.request("getBlockNumber"))
+
+    def block_hash(self, block_number):
+        return self.request("getBlockHash", block_number)
+
+    def get_contract_logs(self, event_names, from_block, to_block):
+        return self.request("getContractEvents", from_block, to_block, *event_names) or []
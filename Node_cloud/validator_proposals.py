@@ -0,0 +1,85 @@
+import json
+import logging
+import os
+import time
+from chain_events import ChainEventFollower
+
+
+logger = logging.getLogger(__name__)
+
+
+class ValidatorProposalListener:
+    """Votes for the validators announced through ValidatorProposed events.
+
+    A ChainEventFollower reads only the blocks mined since the last poll instead of every
+    ValidatorProposed log since block 0. Proposed addresses stay pending, and are voted for on
+    every poll, until they show up in the validator set. The cursor and the pending addresses
+    are saved in `state_path`, so a restart continues where the previous run stopped.
+    """
+
+    def __init__(self, registry, state_path, poll_interval=10, max_failures=3):
+        """
+        :param registry: The NodeRegistry used to read validators and propose votes.
+        :param state_path: JSON file holding the follower cursor and the pending proposals.
+        :param poll_interval: Seconds between two polls.
+        :param max_failures: Failed polls in a row after which run() returns.
+        """
+        self.registry = registry
+        self.state_path = state_path
+        self.poll_interval = poll_interval
+        self.max_failures = max_failures
+        state = self._load()
+        self.pending = set(state.get("pending", []))
+        self.follower = ChainEventFollower(registry.chain, poll_interval, start_block=0, cursor=state.get("cursor"))
+        self.follower.subscribe("ValidatorProposed", self.on_proposal)
+        self.follower.on_advance(self.save)
+
+    def _load(self):
+        if not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path, "r") as state_file:
+                return json.load(state_file)
+        except ValueError as e:
+            logger.warning("Validator proposal state unreadable, reading proposals from block 0: %s", e)
+            return {}
+
+    def save(self):
+        temp_path = self.state_path + ".tmp"
+        with open(temp_path, "w") as state_file:
+            json.dump({"cursor": self.follower.cursor(), "pending": sorted(self.pending)}, state_file)
+        os.replace(temp_path, self.state_path)
+
+    def on_proposal(self, event):
+        self.pending.add(event["args"]["validator"].lower())
+
+    def propose_pending(self, node_id, node_name):
+        if not self.pending:
+            return
+        all_validators = self.registry.get_all_validators()
+        accepted = {address for address in self.pending if address in all_validators}
+        if accepted:
+            self.pending -= accepted
+            self.save()
+        if not self.pending:
+            return
+
+        logger.info("This Node is a Validator. Proposer Details: %s: %s", node_id, node_name)
+        for new_validator in sorted(self.pending):
+            response = self.registry.proposeValidator(new_validator, "true")
+            logger.info("Proposed %s → Response: %s", new_validator, response)
+
+    def run(self, node_id, node_name):
+        """Polls until `max_failures` polls in a row fail, then returns so the caller can restart it."""
+        failures = 0
+        while True:
+            try:
+                self.follower.poll()
+                self.propose_pending(node_id, node_name)
+                failures = 0
+            except Exception as e:
+                failures += 1
+                logger.error("Error fetching validator proposals (%d/%d): %s", failures, self.max_failures, e)
+                if failures >= self.max_failures:
+                    return
+            time.sleep(self.poll_interval)
@@ -0,0 +1,175 @@
+import logging
+import threading
+from collections import OrderedDict
+
+
+logger = logging.getLogger(__name__)
+
+
+class ChainEventFollower:
+    """Follows the NodeRegistry contract events and hands them to subscribed handlers.
+
+    Each poll reads only the blocks mined since the previous one (in ranges of at most
+    `max_range` blocks) and calls the handlers in block order. The hashes of recently handled
+    blocks are kept, so a reorg is noticed and the follower rewinds to the last block both forks
+    share and handles the events from there again; handlers must therefore be idempotent.
+
+    Whenever the follower cannot vouch for having seen every event (at start-up without a
+    cursor, after an RPC failure, on a reorg or a chain reset) the reset handlers run, so caches
+    built on the event stream start over.
+    """
+
+    def __init__(self, chain, poll_interval=2.0, start_block=None, cursor=None, max_range=5000, reorg_depth=64):
+        """
+        :param chain: ChainGateway or InteractDaemon, anything with head_block(), block_hash() and get_contract_logs().
+        :param poll_interval: Seconds between two polls for new blocks.
+        :param start_block: First block to read when there is no cursor; None starts at the current head.
+        :param cursor: {"block": n, "hash": "0x..."} of the last block handled by a previous run, see cursor().
+        :param max_range: Most blocks asked for in one eth_getLogs.
+        :param reorg_depth: How many recent block hashes are kept to find where a reorg forked.
+        """
+        self.chain = chain
+        self.poll_interval = poll_interval
+        self.start_block = start_block
+        self.max_range = max_range
+        self.reorg_depth = reorg_depth
+        self.handlers = {}
+        self.reset_handlers = []
+        self.advance_handlers = []
+        self.range_handlers = []
+        self.last_block = None
+        self._hashes = OrderedDict()
+        if cursor and cursor.get("block") is not None:
+            self.last_block = cursor["block"]
+            if cursor.get("hash"):
+                self._hashes[cursor["block"]] = cursor["hash"]
+        self._stop = threading.Event()
+        self._thread = None
+
+    def subscribe(self, event_name, handler):
+        """Calls handler(event) for every `event_name` log, event being a decoded log dict."""
+        self.handlers.setdefault(event_name, []).append(handler)
+
+    def on_reset(self, handler):
+        """Calls handler() whenever events may have been missed or undone."""
+        self.reset_handlers.append(handler)
+
+    def on_advance(self, handler):
+        """Calls handler() after each handled block range, e.g. to persist cursor()."""
+        self.advance_handlers.append(handler)
+
+    def on_range(self, handler):
+        """Calls handler(events, to_block, block_hash) for each handled block range, e.g. to relay it."""
+        self.range_handlers.append(handler)
+
+    def cursor(self):
+        return {"block": self.last_block, "hash": self._hashes.get(self.last_block)}
+
+    def is_current(self, block):
+        """True when data read at `block` cannot predate an event the follower already handled."""
+        last_block = self.last_block
+        return last_block is not None and block is not None and block >= last_block
+
+    def poll(self):
+        """Handles the events of the blocks mined since the previous poll."""
+        head = self.chain.head_block()
+        if self.last_block is None:
+            if self.start_block is None:
+                self._reset()
+                self.apply([], head, self.chain.block_hash(head))
+                return
+            self.last_block = self.start_block - 1
+
+        if head != self.last_block and self._forked(head):
+            self._rewind()
+            if self.last_block is None:
+                return
+
+        while self.last_block < head:
+            to_block = min(head, self.last_block + self.max_range)
+            # The hash is read before the logs: if a reorg lands in between, the next poll sees it.
+            block_hash = self.chain.block_hash(to_block)
+            events = self.chain.get_contract_logs(list(self.handlers), self.last_block + 1, to_block) if self.handlers else []
+            self.apply(events, to_block, block_hash)
+
+    def apply(self, events, to_block, block_hash):
+        """Handles the events of the blocks after last_block up to `to_block`.
+
+        Called by poll(), or with the ranges another process's follower read (see WorkerEvents).
+        """
+        for event in events:
+            for handler in self.handlers.get(event["event"], []):
+                handler(event)
+        self._remember(to_block, block_hash)
+        self.last_block = to_block
+        for handler in self.range_handlers:
+            handler(events, to_block, block_hash)
+        for handler in self.advance_handlers:
+            handler()
+
+    def _remember(self, block, block_hash):
+        self._hashes[block] = block_hash
+        while len(self._hashes) > self.reorg_depth:
+            self._hashes.popitem(last=False)
+
+    def _forked(self, head):
+        if head < self.last_block:
+            return True
+        known_hash = self._hashes.get(self.last_block)
+        return known_hash is not None and self.chain.block_hash(self.last_block) != known_hash
+
+    def _rewind(self):
+        """Moves back to the newest handled block that is still on the chain."""
+        ancestor = None
+        for block in reversed(list(self._hashes)):
+            if self.chain.block_hash(block) == self._hashes[block]:
+                ancestor = block
+                break
+            del self._hashes[block]
+
+        if ancestor is not None:
+            logger.warning("Chain reorganized after block %s. Handling the events from there again.", ancestor)
+            self.last_block = ancestor
+        elif self.start_block is not None:
+            logger.warning("Chain reorganized deeper than %s known blocks or was reset. Reading events again from block %s.", self.reorg_depth, self.start_block)
+            self._hashes.clear()
+            self.last_block = self.start_block - 1
+        else:
+            logger.warning("Chain reorganized deeper than the known blocks or was reset. Following from the current head.")
+            self._hashes.clear()
+            self.last_block = None
+        self._reset()
+
+    def restart(self):
+        """Forgets the followed position, e.g. when the contract address changed."""
+        self._hashes.clear()
+        self.last_block = None
+
+    def forget(self):
+        """Forgets the followed position and runs the reset handlers."""
+        self.restart()
+        self._reset()
+
+    def _reset(self):
+        for handler in self.reset_handlers:
+            handler()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                # Without a start block there is no history to resume from: start over at the head.
+                if self.start_block is None and self.last_block is not None:
+                    logger.warning("Lost track of contract events: %s", e)
+                    self.forget()
+            self._stop.wait(self.poll_interval)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,620 @@
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from eth_abi import encode, decode
+from eth_account import Account
+from eth_utils import keccak, to_checksum_address
+from nonce_manager import NonceManager
+
+
+logger = logging.getLogger(__name__)
+
+
+NODE_TYPES = ["Unknown", "Cloud", "Fog", "Edge", "Sensor", "Actuator"]
+
+# Gas limits used by interact.js for the same transactions.
+REGISTER_NODE_GAS = 3000000
+ISSUE_TOKEN_GAS = 300000
+REVOKE_TOKEN_GAS = 200000
+PROPOSE_VALIDATOR_GAS = 100000
+
+ERROR_SELECTOR = keccak(text="Error(string)")[:4]
+
+# Revert reason of revokeToken for a token that is already revoked.
+TOKEN_ALREADY_REVOKED = "Token already revoked"
+
+
+class ChainError(Exception):
+    """Raised when Besu rejects a JSON-RPC request or a contract call reverts."""
+
+
+class ChainGateway:
+    """Talks to Besu directly over JSON-RPC using the ABI in data/NodeRegistry.json.
+
+    A single requests.Session keeps a pool of keep-alive connections to Besu,
+    so contract calls cost one HTTP round trip instead of a Node.js process.
+    """
+
+    def __init__(self, rpc_url, node_registry_path, prefunded_keys_file, pool_size=16, timeout=10, receipt_timeout=120, head_max_age=1.0, confirmations=0, account_index=0):
+        """
+        :param rpc_url: Besu JSON-RPC URL of this node.
+        :param node_registry_path: Path to the Truffle artifact of the NodeRegistry contract.
+        :param prefunded_keys_file: Path to prefunded_keys.json.
+        :param pool_size: Maximum number of pooled connections per host.
+        :param timeout: HTTP timeout in seconds for a single JSON-RPC request.
+        :param receipt_timeout: Seconds a transaction may take to be mined and confirmed.
+        :param head_max_age: Seconds a fetched block number is reused to pin batched reads.
+        :param confirmations: Blocks that must be mined on top of a transaction's block before it counts as done.
+        :param account_index: Index in prefunded_accounts of the account transactions are sent from.
+        """
+        self.rpc_url = rpc_url
+        self.node_registry_path = node_registry_path
+        self.prefunded_keys_file = prefunded_keys_file
+        self.account_index = account_index
+        self.timeout = timeout
+        self.receipt_timeout = receipt_timeout
+        self.confirmations = confirmations
+        self.head_max_age = head_max_age
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Content-Type": "application/json"})
+
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._artifact_mtime = None
+        self.contract_address = None
+        self.functions = {}
+        self.events = {}
+        self.events_by_topic = {}
+        self._account = None
+        self._chain_id = None
+        self.nonces = NonceManager(self._pending_nonce)
+        self._head = None
+        self._head_time = 0.0
+
+    # ----------------------------------JSON-RPC----------------------------------
+
+    def rpc(self, method, params=None, url=None):
+        """Sends a single JSON-RPC request and returns its result."""
+        payload = {"jsonrpc": "2.0", "method": method, "params": params or [], "id": next(self._ids)}
+        response = self.session.post(url or self.rpc_url, data=json.dumps(payload), timeout=self.timeout)
+        data = response.json()
+        if data.get("error"):
+            raise ChainError(self._error_message(data["error"]))
+        return data.get("result")
+
+    def batch(self, calls, url=None):
+        """Sends several JSON-RPC requests in one HTTP round trip.
+
+        :param calls: List of (method, params) pairs.
+        :return: One entry per call, either its result or a ChainError for a failed call.
+        """
+        payload = [{"jsonrpc": "2.0", "method": method, "params": params, "id": next(self._ids)} for method, params in calls]
+        response = self.session.post(url or self.rpc_url, data=json.dumps(payload), timeout=self.timeout)
+        replies = response.json()
+        if isinstance(replies, dict):
+            raise ChainError(self._error_message(replies.get("error") or {}))
+
+        replies_by_id = {reply.get("id"): reply for reply in replies}
+        results = []
+        for entry in payload:
+            reply = replies_by_id.get(entry["id"], {"error": {"message": "No response in batch"}})
+            if reply.get("error"):
+                results.append(ChainError(self._error_message(reply["error"])))
+            else:
+                results.append(reply.get("result"))
+        return results
+
+    def head_block(self):
+        """Returns the latest block number, fetched at most once every head_max_age seconds."""
+        now = time.monotonic()
+        if self._head is None or now - self._head_time > self.head_max_age:
+            self._head = int(self.rpc("eth_blockNumber"), 16)
+            self._head_time = now
+        return self._head
+
+    def block_hash(self, block_number):
+        """Returns the hash of a block, or None if the chain has no such block (yet)."""
+        block = self.rpc("eth_getBlockByNumber", [hex(block_number), False])
+        return block["hash"] if block else None
+
+    def _error_message(self, error):
+        revert_data = error.get("data")
+        if isinstance(revert_data, str) and revert_data.startswith("0x"):
+            reason = self.decode_revert_reason(revert_data)
+            if reason:
+                return reason
+        return error.get("message", str(error))
+
+    def decode_revert_reason(self, revert_data):
+        """Decodes the Error(string) payload of a revert, or returns None."""
+        raw = bytes.fromhex(revert_data[2:])
+        if raw[:4] != ERROR_SELECTOR:
+            return None
+        try:
+            return decode(["string"], raw[4:])[0]
+        except Exception:
+            return None
+
+    # ----------------------------------CONTRACT ABI----------------------------------
+
+    def load_contract(self):
+        """Loads (or reloads after a redeployment) the ABI and address from the artifact."""
+        mtime = os.stat(self.node_registry_path).st_mtime_ns
+        if mtime == self._artifact_mtime:
+            return
+        with self._lock:
+            if mtime == self._artifact_mtime:
+                return
+            with open(self.node_registry_path, "r") as artifact_file:
+                artifact = json.load(artifact_file)
+
+            network_id = list(artifact["networks"].keys())[0]
+            functions = {}
+            events = {}
+            events_by_topic = {}
+            for entry in artifact["abi"]:
+                if entry.get("type") == "function":
+                    input_types = [self._abi_type(param) for param in entry["inputs"]]
+                    signature = f"{entry['name']}({','.join(input_types)})"
+                    functions[entry["name"]] = {
+                        "selector": keccak(text=signature)[:4],
+                        "inputs": input_types,
+                        "outputs": [self._abi_type(param) for param in entry.get("outputs", [])],
+                        "output_names": [param.get("name", "") for param in entry.get("outputs", [])],
+                    }
+                elif entry.get("type") == "event":
+                    input_types = [self._abi_type(param) for param in entry["inputs"]]
+                    topic = "0x" + keccak(text=f"{entry['name']}({','.join(input_types)})").hex()
+                    event = {
+                        "name": entry["name"],
+                        "topic": topic,
+                        "inputs": entry["inputs"],
+                    }
+                    events[entry["name"]] = event
+                    events_by_topic[topic] = event
+
+            self.contract_address = to_checksum_address(artifact["networks"][network_id]["address"])
+            self.functions = functions
+            self.events = events
+            self.events_by_topic = events_by_topic
+            self._artifact_mtime = mtime
+
+    def _abi_type(self, param):
+        if param["type"].startswith("tuple"):
+            inner = ",".join(self._abi_type(component) for component in param["components"])
+            return f"({inner}){param['type'][len('tuple'):]}"
+        return param["type"]
+
+    def _normalize_arg(self, abi_type, value):
+        if abi_type.endswith("]"):
+            base = abi_type[:abi_type.rindex("[")]
+            return [self._normalize_arg(base, item) for item in value]
+        if abi_type == "address":
+            return to_checksum_address(value)
+        if abi_type.startswith("uint") or abi_type.startswith("int"):
+            return int(value)
+        if abi_type == "bool":
+            return value in (True, "true", "True", 1)
+        if abi_type.startswith("bytes") and isinstance(value, str):
+            return bytes.fromhex(value[2:] if value.startswith("0x") else value)
+        return value
+
+    def _normalize_result(self, value):
+        if isinstance(value, bytes):
+            return "0x" + value.hex()
+        if isinstance(value, (list, tuple)):
+            return [self._normalize_result(item) for item in value]
+        return value
+
+    def encode_call(self, function_name, *args):
+        """Returns the calldata for a contract function as a 0x-prefixed hex string."""
+        self.load_contract()
+        function = self.functions[function_name]
+        normalized = [self._normalize_arg(abi_type, arg) for abi_type, arg in zip(function["inputs"], args)]
+        return "0x" + (function["selector"] + encode(function["inputs"], normalized)).hex()
+
+    def decode_result(self, function_name, result):
+        """Decodes the return data of an eth_call into a list of Python values."""
+        function = self.functions[function_name]
+        raw = bytes.fromhex(result[2:]) if result and result != "0x" else b""
+        return self._normalize_result(decode(function["outputs"], raw))
+
+    def call(self, function_name, *args, block="latest"):
+        """Executes a view function through eth_call and returns the decoded outputs."""
+        data = self.encode_call(function_name, *args)
+        result = self.rpc("eth_call", [{"to": self.contract_address, "data": data}, block])
+        return self.decode_result(function_name, result)
+
+    def revert_reason(self, function_name, *args):
+        """Revert reason of sending `function_name` from our account now, or None if it would not revert."""
+        data = self.encode_call(function_name, *args)
+        try:
+            self.rpc("eth_call", [{"from": self._load_account().address, "to": self.contract_address, "data": data}, "latest"])
+        except ChainError as e:
+            return str(e)
+        return None
+
+    def call_many(self, calls, block="latest"):
+        """Executes several view functions in one JSON-RPC batch against the same block.
+
+        :param calls: List of (function_name, args) pairs.
+        :return: One entry per call, either its decoded outputs or a ChainError if it reverted.
+        """
+        requests_ = [
+            ("eth_call", [{"to": self.contract_address, "data": self.encode_call(name, *args)}, block])
+            for name, args in calls
+        ]
+        results = self.batch(requests_)
+        return [
+            result if isinstance(result, ChainError) else self.decode_result(name, result)
+            for (name, _), result in zip(calls, results)
+        ]
+
+    def decode_log(self, log):
+        """Decodes a contract log into {"event": name, "args": {...}}, or returns None."""
+        self.load_contract()
+        if not log.get("topics") or log.get("address", "").lower() != self.contract_address.lower():
+            return None
+        event = self.events_by_topic.get(log["topics"][0])
+        if event is None:
+            return None
+
+        indexed = [param for param in event["inputs"] if param.get("indexed")]
+        not_indexed = [param for param in event["inputs"] if not param.get("indexed")]
+        data = bytes.fromhex(log["data"][2:]) if log.get("data") and log["data"] != "0x" else b""
+        values = decode([self._abi_type(param) for param in not_indexed], data) if not_indexed else []
+
+        args = {}
+        for param, topic in zip(indexed, log["topics"][1:]):
+            if param["type"] in ("string", "bytes") or param["type"].endswith("]"):
+                args[param["name"]] = topic  # Only the hash of dynamic indexed values is logged.
+            else:
+                args[param["name"]] = self._normalize_result(decode([param["type"]], bytes.fromhex(topic[2:]))[0])
+        for param, value in zip(not_indexed, values):
+            args[param["name"]] = self._normalize_result(value)
+        block_number = log.get("blockNumber")
+        if isinstance(block_number, str):
+            block_number = int(block_number, 16)
+        return {"event": event["name"], "args": args, "blockNumber": block_number, "transactionHash": log.get("transactionHash")}
+
+    def get_logs(self, event_name, from_block=0, to_block="latest", topics=None):
+        """Fetches and decodes the contract logs of one event type."""
+        self.load_contract()
+        event = self.events[event_name]
+        log_filter = {
+            "address": self.contract_address,
+            "fromBlock": hex(from_block) if isinstance(from_block, int) else from_block,
+            "toBlock": hex(to_block) if isinstance(to_block, int) else to_block,
+            "topics": [event["topic"]] + (topics or []),
+        }
+        logs = self.rpc("eth_getLogs", [log_filter]) or []
+        return [decoded for decoded in (self.decode_log(log) for log in logs) if decoded]
+
+    def get_contract_logs(self, event_names, from_block, to_block):
+        """Fetches and decodes the logs of several event types in one eth_getLogs, oldest first."""
+        self.load_contract()
+        log_filter = {
+            "address": self.contract_address,
+            "fromBlock": hex(from_block),
+            "toBlock": hex(to_block),
+            "topics": [[self.events[name]["topic"] for name in event_names]],
+        }
+        logs = self.rpc("eth_getLogs", [log_filter]) or []
+        return [decoded for decoded in (self.decode_log(log) for log in logs) if decoded]
+
+    # ----------------------------------TRANSACTIONS----------------------------------
+
+    def _load_account(self):
+        if self._account is None:
+            with open(self.prefunded_keys_file, "r") as keys_file:
+                accounts = json.load(keys_file)["prefunded_accounts"]
+            self._account = Account.from_key(accounts[self.account_index]["private_key"])
+        return self._account
+
+    def chain_id(self):
+        if self._chain_id is None:
+            self._chain_id = int(self.rpc("eth_chainId"), 16)
+        return self._chain_id
+
+    def _pending_nonce(self, url=None):
+        # Read from the node the transaction goes to: another node's pool may not have it yet.
+        return int(self.rpc("eth_getTransactionCount", [self._load_account().address, "pending"], url=url), 16)
+
+    def transact(self, function_name, *args, gas=REGISTER_NODE_GAS, url=None, confirmations=None, timeout=None, nonce_retries=3):
+        """Signs and sends a contract transaction, then waits for its confirmed receipt.
+
+        Nonces come from the NonceManager, so concurrent callers do not wait for each other's
+        receipts. A nonce error from the node resyncs the manager and re-sends the transaction.
+        """
+        account = self._load_account()
+        data = self.encode_call(function_name, *args)
+        chain_id = self.chain_id()
+        for attempt in range(nonce_retries + 1):
+            nonce = self.nonces.allocate(url)
+            tx = {
+                "from": account.address,
+                "to": self.contract_address,
+                "gas": gas,
+                "gasPrice": 0,
+                "value": 0,
+                "nonce": nonce,
+                "data": data,
+                "chainId": chain_id,
+            }
+            signed = account.sign_transaction(tx)
+            raw_tx = getattr(signed, "raw_transaction", None) or signed.rawTransaction
+            try:
+                tx_hash = self.rpc("eth_sendRawTransaction", ["0x" + bytes(raw_tx).hex()], url=url)
+                break
+            except ChainError as e:
+                if not NonceManager.is_nonce_error(e) or attempt == nonce_retries:
+                    self.nonces.release(nonce)
+                    raise
+                logger.warning("Nonce %s rejected (%s). Resyncing nonces.", nonce, e)
+                self.nonces.resync(nonce)
+            except requests.RequestException:
+                # The transaction may or may not have reached the pool: ask the node.
+                self.nonces.resync(nonce)
+                raise
+
+        try:
+            receipt = self.wait_for_receipt(tx_hash, url=url, confirmations=confirmations, timeout=timeout)
+        except Exception as e:
+            if isinstance(e, ChainError) and str(e).endswith("reverted"):
+                self.nonces.done(nonce)
+            else:
+                # Not seen mined: the transaction may have been dropped, leaving a gap.
+                self.nonces.resync(nonce)
+            raise
+        self.nonces.done(nonce)
+        return receipt
+
+    def wait_for_receipt(self, tx_hash, url=None, confirmations=None, timeout=None, poll_interval=0.5):
+        """Waits until a transaction is mined and `confirmations` blocks deep, and returns its receipt.
+
+        Polling starts at 50ms and backs off to `poll_interval`, so a transaction mined in the
+        next block returns right after that block instead of after a fixed sleep. The receipt is
+        read again on every poll, so a transaction moved by a reorg is counted from its new block.
+        Raises ChainError if the transaction reverted or `timeout` (default receipt_timeout) passed.
+        """
+        confirmations = self.confirmations if confirmations is None else confirmations
+        deadline = time.monotonic() + (self.receipt_timeout if timeout is None else timeout)
+        delay = 0.05
+        while time.monotonic() < deadline:
+            receipt = self.rpc("eth_getTransactionReceipt", [tx_hash], url=url)
+            if receipt and receipt.get("blockNumber"):
+                if int(receipt.get("status", "0x1"), 16) == 0:
+                    raise ChainError(f"Transaction {tx_hash} reverted")
+                mined_block = int(receipt["blockNumber"], 16)
+                if confirmations <= 0 or int(self.rpc("eth_blockNumber", url=url), 16) >= mined_block + confirmations:
+                    receipt["events"] = [decoded for decoded in (self.decode_log(log) for log in receipt.get("logs", [])) if decoded]
+                    # Reads pinned to the cached head must see our own transaction.
+                    if self._head is not None and mined_block > self._head:
+                        self._head = mined_block
+                    return receipt
+            time.sleep(min(delay, max(0, deadline - time.monotonic())))
+            delay = min(delay * 2, poll_interval)
+        raise ChainError(f"Timed out waiting for {confirmations} confirmations of {tx_hash}")
+
+    def _find_event(self, receipt, event_name):
+        for event in receipt["events"]:
+            if event["event"] == event_name:
+                return event["args"]
+        return None
+
+    def transaction_url(self, route_signature=None):
+        """Returns the RPC URL a transaction should be sent to.
+
+        Nodes that are not validators forward their transactions to the first
+        validator's RPC URL, taken from the RpcUrlMapped events.
+        """
+        if route_signature is None or self.is_validator(route_signature):
+            return None
+        validators = self.get_validators()
+        if not validators:
+            return None
+        rpc_mapping = self.get_rpc_url_mappings()
+        validator = validators[0].lower()
+        if validator in rpc_mapping:
+            return rpc_mapping[validator]
+        logger.warning("Validator %s is not found in the RPC mapping.", validator)
+        return None
+
+    def register_node(self, node_id, node_name, node_type, public_key, address, rpc_url, receiver_node_type, node_signature, reg_by_signature=None):
+        """Registers a node on the contract and returns the transaction hash and NodeRegistered event."""
+        receipt = self.transact(
+            "registerNode", node_id, node_name, node_type, public_key, address, rpc_url, receiver_node_type, node_signature,
+            gas=REGISTER_NODE_GAS, url=self.transaction_url(reg_by_signature)
+        )
+        return {"transactionHash": receipt["transactionHash"], "event": self._find_event(receipt, "NodeRegistered")}
+
+    def issue_token(self, from_signature, to_signature, route_signature=None):
+        """Issues a capability token and returns the transaction hash, block and TokenIssued event."""
+        receipt = self.transact("issueToken", from_signature, to_signature, gas=ISSUE_TOKEN_GAS, url=self.transaction_url(route_signature))
+        return {"transactionHash": receipt["transactionHash"], "blockNumber": int(receipt["blockNumber"], 16), "event": self._find_event(receipt, "TokenIssued")}
+
+    def revoke_token(self, from_signature, to_signature, route_signature=None):
+        """Revokes a capability token and returns the transaction hash and TokenRevoked event."""
+        receipt = self.transact("revokeToken", from_signature, to_signature, gas=REVOKE_TOKEN_GAS, url=self.transaction_url(route_signature))
+        return {"transactionHash": receipt["transactionHash"], "event": self._find_event(receipt, "TokenRevoked")}
+
+    def renew_token(self, from_signature, to_signature, route_signature=None):
+        """Renews an expired capability token with revokeToken then issueToken; returns what issue_token returns.
+
+        A revoke that fails because the token is already revoked (e.g. by a concurrent renewal)
+        still goes on to reissue; any other failure is raised.
+        """
+        try:
+            self.revoke_token(from_signature, to_signature, route_signature)
+        except ChainError as e:
+            # A reverted receipt carries no reason unless Besu runs with --revert-reason-enabled: replay the call for it.
+            if self.revert_reason("revokeToken", from_signature, to_signature) != TOKEN_ALREADY_REVOKED:
+                raise
+            logger.info("Token already revoked (%s). Reissuing.", e)
+        return self.issue_token(from_signature, to_signature, route_signature)
+
+    def emit_validator_proposal(self, validator_address):
+        """Emits a ValidatorProposed event and returns the proposed validator address."""
+        receipt = self.transact("proposeValidator", validator_address, gas=PROPOSE_VALIDATOR_GAS)
+        event = self._find_event(receipt, "ValidatorProposed")
+        return event["validator"] if event else None
+
+    # ----------------------------------NODE RELATED FUNCTIONS----------------------------------
+
+    def is_node_registered(self, node_signature):
+        return self.call("isNodeRegistered", node_signature)[0]
+
+    def are_nodes_registered(self, node_signatures, chunk_size=200):
+        """isNodeRegistered for many signatures: one eth_call each, `chunk_size` per JSON-RPC batch."""
+        chunks = [node_signatures[start:start + chunk_size] for start in range(0, len(node_signatures), chunk_size)]
+        registered = []
+        for chunk in chunks:
+            for result in self.call_many([("isNodeRegistered", (signature,)) for signature in chunk]):
+                if isinstance(result, ChainError):
+                    raise result
+                registered.append(result[0])
+        return registered
+
+    def _node_details(self, result):
+        return {
+            "nodeId": result[0],
+            "nodeName": result[1],
+            "nodeType": str(result[2]),
+            "publicKey": result[3],
+            "isRegistered": result[4],
+            "registeredBy": result[5],
+            "nodeSignature": result[6],
+            "registeredByNodeType": str(result[7]),
+        }
+
+    def get_node_details(self, node_signature):
+        """Returns the registered details of a node, keyed like interact.js getNodeDetails."""
+        return self._node_details(self.call("getNodeDetailsBySignature", node_signature))
+
+    def get_node_details_by_address(self, address):
+        return self._node_details(self.call("getNodeDetailsByAddress", address))
+
+    # ----------------------------------TOKEN RELATED FUNCTIONS----------------------------------
+
+    @staticmethod
+    def _token(result):
+        """getToken result as a dict."""
+        policy, issued_at, is_issued, is_revoked = result
+        return {"policy": policy, "issuedAt": issued_at, "isIssued": is_issued, "isRevoked": is_revoked}
+
+    def get_token(self, from_signature, to_signature):
+        return self._token(self.call("getToken", from_signature, to_signature))
+
+    def get_tokens(self, pairs, chunk_size=200):
+        """get_token for many (from_signature, to_signature) pairs, in the order given.
+
+        Each pair is one eth_call, `chunk_size` per JSON-RPC batch.
+        """
+        chunks = [pairs[start:start + chunk_size] for start in range(0, len(pairs), chunk_size)]
+        tokens = []
+        for chunk in chunks:
+            for result in self.call_many([("getToken", pair) for pair in chunk]):
+                if isinstance(result, ChainError):
+                    raise result
+                tokens.append(self._token(result))
+        return tokens
+
+    def check_token(self, from_signature, to_signature):
+        return self.call("checkToken", from_signature, to_signature)[0]
+
+    def is_token_expired(self, from_signature, to_signature, validity_period):
+        return self.call("isTokenExpired", from_signature, to_signature, validity_period)[0]
+
+    def authorization_snapshot(self, from_signature, to_signature, validity_period):
+        """Reads everything an access decision needs in one JSON-RPC batch pinned to one block.
+
+        Deployment, registration, node details and token state all come from the
+        same block, so a registration and a token check can never disagree.
+        """
+        self.load_contract()
+        block = hex(self.head_block())
+        calls = [
+            ("isNodeRegistered", (from_signature,)),
+            ("getNodeDetailsBySignature", (from_signature,)),
+            ("checkToken", (from_signature, to_signature)),
+            ("isTokenExpired", (from_signature, to_signature, validity_period)),
+            ("getToken", (from_signature, to_signature)),
+        ]
+        requests_ = [("eth_getCode", [self.contract_address, block])] + [
+            ("eth_call", [{"to": self.contract_address, "data": self.encode_call(name, *args)}, block])
+            for name, args in calls
+        ]
+        code, *results = self.batch(requests_)
+        if isinstance(code, ChainError):
+            raise code
+
+        snapshot = {"block": int(block, 16), "deployed": code not in (None, "0x", "0x0")}
+        if not snapshot["deployed"]:
+            return snapshot
+
+        decoded = {}
+        for (name, _), result in zip(calls, results):
+            if isinstance(result, ChainError):
+                decoded[name] = result
+            else:
+                decoded[name] = self.decode_result(name, result)
+        for name in ("isNodeRegistered", "checkToken", "isTokenExpired", "getToken"):
+            if isinstance(decoded[name], ChainError):
+                raise decoded[name]
+
+        details = decoded["getNodeDetailsBySignature"]
+        snapshot.update({
+            "registered": decoded["isNodeRegistered"][0],
+            "details": None if isinstance(details, ChainError) else self._node_details(details),
+            "tokenAvailable": decoded["checkToken"][0],
+            "tokenExpired": decoded["isTokenExpired"][0],
+            "token": self._token(decoded["getToken"]),
+        })
+        return snapshot
+
+    # ----------------------------------VALIDATOR RELATED FUNCTIONS----------------------------------
+
+    def is_validator(self, node_signature):
+        try:
+            return self.call("isValidator", node_signature)[0]
+        except ChainError:
+            return False
+
+    def get_validators(self, block="latest"):
+        """Returns the current QBFT validator addresses in lower case."""
+        return [address.lower() for address in self.rpc("qbft_getValidatorsByBlockNumber", [block]) or []]
+
+    def propose_validator_vote(self, validator_address, add):
+        return self.rpc("qbft_proposeValidatorVote", [validator_address, add in (True, "true")])
+
+    def get_validator_proposals(self, from_block=0, to_block="latest"):
+        """Returns the addresses proposed through ValidatorProposed events in lower case."""
+        return [event["args"]["validator"].lower() for event in self.get_logs("ValidatorProposed", from_block, to_block)]
+
+    def get_rpc_url_mappings(self):
+        """Maps node addresses (lower case) to the RPC URLs they registered with."""
+        mapping = {}
+        for event in self.get_logs("RpcUrlMapped"):
+            mapping[event["args"]["nodeAddress"].lower()] = event["args"]["rpcURL"].lower()
+        return mapping
+
+    # ----------------------------------GENERAL FUNCTIONS----------------------------------
+
+    def get_contract_code(self):
+        self.load_contract()
+        return self.rpc("eth_getCode", [self.contract_address, "latest"])
+
+    def check_if_deployed(self):
+        return self.get_contract_code() not in (None, "0x", "0x0")
+
+    def get_peer_count(self):
+        return int(self.rpc("net_peerCount"), 16)
@@ -0,0 +1,84 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+
+class DeploymentCheck:
+    """Memoizes "is the NodeRegistry contract of the artifact deployed?".
+
+    Contract code never changes under a fixed address, so a positive answer is kept until the
+    artifact changes (new mtime/size/inode and a different address or content hash) or
+    invalidate() is called after a chain reset. Negative answers are never memoized.
+    """
+
+    def __init__(self, chain, artifact_path):
+        """
+        :param chain: ChainGateway or InteractDaemon, anything with check_if_deployed().
+        :param artifact_path: Path to the Truffle artifact (data/NodeRegistry.json).
+        """
+        self.chain = chain
+        self.artifact_path = artifact_path
+        self.change_handlers = []
+        self._stat = None
+        self._key = None
+        self._deployed = False
+        self._lock = threading.Lock()
+
+    def on_change(self, handler):
+        """Calls handler() when the artifact starts pointing at a different contract."""
+        self.change_handlers.append(handler)
+
+    def _refresh_key(self):
+        """Re-reads the artifact if its stat changed; returns True if it now names another contract."""
+        try:
+            stat = os.stat(self.artifact_path)
+        except FileNotFoundError:
+            changed = self._key is not None
+            self._stat = self._key = None
+            self._deployed = False
+            return changed
+        stat_key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        if stat_key == self._stat:
+            return False
+
+        with open(self.artifact_path, "rb") as artifact_file:
+            content = artifact_file.read()
+        artifact = json.loads(content)
+        network_id = list(artifact["networks"].keys())[0]
+        key = (artifact["networks"][network_id]["address"].lower(), hashlib.sha256(content).hexdigest())
+        self._stat = stat_key
+        if key == self._key:
+            return False
+        changed = self._key is not None
+        self._key = key
+        self._deployed = False
+        return changed
+
+    def is_deployed(self):
+        with self._lock:
+            changed = self._refresh_key()
+            known = self._deployed
+            has_artifact = self._key is not None
+        if changed:
+            logger.info("Smart contract artifact changed. Re-checking deployment.")
+            for handler in self.change_handlers:
+                handler()
+        if known:
+            return True
+        if not has_artifact:
+            return False
+
+        deployed = self.chain.check_if_deployed()
+        if deployed:
+            with self._lock:
+                self._deployed = True
+        return deployed
+
+    def invalidate(self):
+        with self._lock:
+            self._deployed = False
@@ -0,0 +1,98 @@
+import heapq
+import threading
+
+
+# Substrings of the Besu/geth errors that mean our idea of the next nonce is wrong.
+NONCE_ERRORS = ("nonce too low", "nonce too high", "nonce too far", "known transaction", "already known", "replacement transaction underpriced")
+
+
+class NonceManager:
+    """Hands out the nonces of the sending account from inside this process.
+
+    Reading `eth_getTransactionCount(account, "pending")` before each transaction makes
+    concurrent senders pick the same nonce, so they replace or reject each other. Here the
+    pending count is read once and then counted up locally under a lock, so any number of
+    transactions can be in the pool at the same time and land in the same block.
+
+    A nonce whose transaction never reached the pool is released and handed out again, so it
+    does not leave a gap that would hold back every later transaction. When the node reports a
+    nonce error (another process sends from the same account, a transaction was dropped), the
+    manager resyncs: the next allocation reads the pending count from the chain again. Nonces
+    other senders of this process still have in flight are kept and skipped over, so a resync
+    caused by one transaction does not hand out the nonce of another.
+    """
+
+    def __init__(self, fetch_pending_nonce):
+        """
+        :param fetch_pending_nonce: fetch_pending_nonce(url) -> the account's pending transaction count
+            at the RPC endpoint `url` (None for the default one).
+        """
+        self.fetch_pending_nonce = fetch_pending_nonce
+        self.in_flight = set()
+        self._next = None
+        self._released = []
+        self._lock = threading.Lock()
+        self.allocated = 0
+        self.resyncs = 0
+
+    def allocate(self, url=None):
+        """
+        Returns a nonce no other transaction of this process is using.
+        :param url: RPC endpoint the transaction is sent to, whose pending count is read when needed.
+        """
+        with self._lock:
+            if self._released:
+                nonce = heapq.heappop(self._released)
+            else:
+                if self._next is None:
+                    self._next = self.fetch_pending_nonce(url)
+                while self._next in self.in_flight:
+                    self._next += 1
+                nonce = self._next
+                self._next += 1
+            self.in_flight.add(nonce)
+            self.allocated += 1
+            return nonce
+
+    def done(self, nonce):
+        """The transaction with `nonce` was mined (reverted transactions use up their nonce too)."""
+        with self._lock:
+            self.in_flight.discard(nonce)
+
+    def release(self, nonce):
+        """The transaction with `nonce` was rejected before reaching the pool: reuse the nonce."""
+        with self._lock:
+            if nonce not in self.in_flight:
+                return
+            self.in_flight.discard(nonce)
+            if self._next is not None and nonce == self._next - 1:
+                self._next = nonce
+            elif self._next is not None and nonce < self._next:
+                heapq.heappush(self._released, nonce)
+
+    def resync(self, nonce=None):
+        """
+        Forgets the local count; the next allocate() reads the pending count again.
+        :param nonce: Nonce of the transaction that failed, which is no longer in flight.
+        """
+        with self._lock:
+            if nonce is not None:
+                self.in_flight.discard(nonce)
+            self._next = None
+            self._released = []
+            self.resyncs += 1
+
+    @staticmethod
+    def is_nonce_error(error):
+        message = str(error).lower()
+        return any(text in message for text in NONCE_ERRORS)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "next": self._next,
+                "in_flight": len(self.in_flight),
+                "released": len(self._released),
+                "allocated": self.allocated,
+                "resyncs": self.resyncs
+            }
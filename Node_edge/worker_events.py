@@ -0,0 +1,125 @@
+import glob
+import json
+import logging
+import os
+import socket
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerEvents:
+    """Shares one worker's chain event stream with the other workers of a prefork server.
+
+    Only one worker follows the contract events (see NodeRegistry background tasks). It relays
+    every handled block range and every reset over Unix datagram sockets, one per worker, in
+    `directory`. The other workers feed what they receive into their own, non-polling
+    ChainEventFollower, so their token and node caches are invalidated exactly as in the
+    following worker. A worker that missed a message is sent a reset before anything else.
+    """
+
+    MAX_EVENTS_PER_MESSAGE = 50
+
+    def __init__(self, follower, directory, send_timeout=0.5):
+        """
+        :param follower: This worker's ChainEventFollower.
+        :param directory: Directory shared by the workers of one server for their sockets.
+        :param send_timeout: Seconds a relay waits on a worker whose socket buffer is full.
+        """
+        self.follower = follower
+        self.directory = directory
+        self.path = os.path.join(directory, f"events-{os.getpid()}.sock")
+        self.publishing = False
+        self._pending = []
+        self._out_of_sync = set()
+        self._send_lock = threading.Lock()
+
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._inbox = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._inbox.bind(self.path)
+        self._outbox = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._outbox.settimeout(send_timeout)
+
+    # ----------------------------------RECEIVING----------------------------------
+
+    def listen(self):
+        thread = threading.Thread(target=self._receive)
+        thread.daemon = True
+        thread.start()
+
+    def _receive(self):
+        while True:
+            try:
+                message = json.loads(self._inbox.recv(1 << 20))
+            except OSError:
+                return  # Socket closed.
+            except ValueError as e:
+                logger.warning("Unreadable worker event message: %s", e)
+                continue
+            if self.publishing:
+                continue
+            try:
+                self._handle(message)
+            except Exception as e:
+                logger.warning("Error applying relayed chain events: %s", e)
+                self.follower.forget()
+
+    def _handle(self, message):
+        if message["type"] == "events":
+            self._pending.extend(message["events"])
+        elif message["type"] == "advance":
+            events, self._pending = self._pending, []
+            self.follower.apply(events, message["block"], message["hash"])
+        elif message["type"] == "reset":
+            self._pending = []
+            self.follower.forget()
+
+    # ----------------------------------RELAYING----------------------------------
+
+    def publish(self):
+        """Makes this worker the source: its follower's ranges and resets go to all other workers."""
+        self.publishing = True
+        self.follower.on_range(self._relay_range)
+        self.follower.on_reset(self._relay_reset)
+
+    def _relay_range(self, events, to_block, block_hash):
+        for start in range(0, len(events), self.MAX_EVENTS_PER_MESSAGE):
+            self._send({"type": "events", "events": events[start:start + self.MAX_EVENTS_PER_MESSAGE]})
+        self._send({"type": "advance", "block": to_block, "hash": block_hash})
+
+    def _relay_reset(self):
+        self._send({"type": "reset"})
+
+    def _peers(self):
+        return [path for path in glob.glob(os.path.join(self.directory, "events-*.sock")) if path != self.path]
+
+    def _send(self, message):
+        data = json.dumps(message).encode()
+        reset = json.dumps({"type": "reset"}).encode()
+        with self._send_lock:
+            for peer in self._peers():
+                try:
+                    if peer in self._out_of_sync:
+                        self._outbox.sendto(reset, peer)
+                        self._out_of_sync.discard(peer)
+                    self._outbox.sendto(data, peer)
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # The worker is gone; its socket file was left behind.
+                    self._out_of_sync.discard(peer)
+                    try:
+                        os.unlink(peer)
+                    except FileNotFoundError:
+                        pass
+                except OSError as e:
+                    logger.warning("Could not relay chain events to %s: %s", peer, e)
+                    self._out_of_sync.add(peer)
+
+    def close(self):
+        self._inbox.close()
+        self._outbox.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
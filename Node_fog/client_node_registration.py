@@ -1,20 +1,56 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 from acknowledgement import AcknowledgementSender
 from client_blockchain_init import BlockchainInit
-import json
 import threading
+import fcntl
+import json
+import logging
 import os
 import subprocess
 import time
 import sys
-import re
-from eth_keys import keys
-from eth_utils import keccak
+from concurrent.futures import ThreadPoolExecutor
+from chain_gateway import ChainGateway
+from interact_daemon import InteractDaemon
+from authorization_engine import AuthorizationEngine
+from chain_events import ChainEventFollower
+from token_cache import TokenCache
+from node_directory import NodeDirectory
+from deployment_check import DeploymentCheck
+from node_identity import NodeIdentity
+from validator_proposals import ValidatorProposalListener
+from signature_verifier import SignatureVerifier
+from worker_events import WorkerEvents
+import logging_pipeline
+from logging_pipeline import RouteSampler
+from metrics import Metrics
+import prefork_server
+from registration_jobs import RegistrationJobs, REQUIRED_FIELDS, VERIFYING, ON_CHAIN, ACKED, PEERED, VALIDATOR, COMPLETED, FAILED
+
+
+logger = logging.getLogger(__name__)
 
 
 class NodeRegistry:
 
-    def __init__(self, besu_RPC_url):
+    # Steps timed in /metrics: they reach the chain or verify signatures.
+    METERED_STEPS = (
+        "verify_node_identity", "register_node_on_chain", "is_node_registered_js", "nodes_registered",
+        "get_node_details_js", "check_smart_contract_deployment", "checkValidator", "proposeValidator",
+        "emitValidatorProposalToChain", "get_all_validators", "get_peers", "issue_capability_token",
+        "renew_capability_token", "revoke_capability_token", "get_capability_token", "check_token_expiry", "check_token_availability",
+        "get_capability_tokens", "authorization_snapshot"
+    )
+
+    def __init__(self, besu_RPC_url, chain_backend=None, worker_dir=None, account_index=0):
+        """
+        :param besu_RPC_url: RPC endpoint of the local Besu node.
+        :param chain_backend: "gateway", "interact" or a backend object with the ChainGateway methods
+                              (e.g. test/stub_chain.StubChain); defaults to the CHAIN_BACKEND environment variable.
+        :param worker_dir: Runtime directory shared with the other workers of a prefork server, or None for a single process.
+        :param account_index: Prefunded account the transactions are sent from; each worker of a prefork server has its own,
+                              so the workers do not hand out the same nonces.
+        """
         self.root_path = os.path.dirname(os.path.abspath(__file__))
         self.data_path = os.path.join(self.root_path, "data/")
         self.genesis_files_path = os.path.join(self.root_path, "genesis/")
@@ -24,822 +60,705 @@ class NodeRegistry:
         self.prefunded_keys_file = os.path.join(self.root_path, "prefunded_keys.json")
         self.interact_file_path = os.path.join(self.root_path, "interact.js")
         self.node_details = os.path.join(self.root_path, "node-details.json")
+        self.validator_proposals_file = os.path.join(self.data_path, "validator_proposals.json")
+        self.identity = NodeIdentity(self.node_details)
         self.enode_file = os.path.join(self.data_path, "enode.txt") 
         self.besu_RPC_url = besu_RPC_url
+        # CHAIN_BACKEND=interact keeps the web3 stack of interact.js, running as one warm daemon process.
+        chain_backend = chain_backend or os.environ.get("CHAIN_BACKEND", "gateway")
+        # A transaction counts as done once CHAIN_CONFIRMATIONS blocks are mined on top of it
+        # (0: its receipt is enough); CHAIN_TX_TIMEOUT seconds is the deadline for getting there.
+        confirmations = int(os.environ.get("CHAIN_CONFIRMATIONS", 0))
+        tx_timeout = float(os.environ.get("CHAIN_TX_TIMEOUT", 120))
+        if not isinstance(chain_backend, str):
+            self.chain = chain_backend
+        elif chain_backend == "interact":
+            self.chain = InteractDaemon(self.interact_file_path, timeout=tx_timeout, confirmations=confirmations, account_index=account_index)
+        else:
+            self.chain = ChainGateway(self.besu_RPC_url, self.node_registry_path, self.prefunded_keys_file, receipt_timeout=tx_timeout,
+                                      confirmations=confirmations, account_index=account_index)
+        self.deployment = DeploymentCheck(self.chain, self.node_registry_path)
+        self.deployment.on_change(self.reset_chain_caches)
+
+        self.authorization = AuthorizationEngine(self)
+        self.worker_dir = worker_dir
+        self.registration_jobs = RegistrationJobs(self.run_registration_step, store_dir=os.path.join(worker_dir, "jobs") if worker_dir else None)
+        # Validator registrations wait for the new node to peer and for validator consensus.
+        self.peer_timeout = 600
+        self.consensus_timeout = 600
+        self.registration_poll_interval = 5
+        self.signature_verifier = SignatureVerifier()
+        # /register-nodes: registerNode transactions are sent from this pool.
+        self.bulk_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="bulk-registration")
+        self.bulk_registration_limit = 1000
+        self.token_cache = TokenCache()
+        self.node_directory = NodeDirectory()
+
+        self.metrics = Metrics()
+        self.metrics.instrument(self, self.METERED_STEPS)
+        if isinstance(self.chain, InteractDaemon):
+            self.metrics.instrument_by_name(self.chain, "request", "contract")
+        elif isinstance(self.chain, ChainGateway):
+            self.metrics.instrument_by_name(self.chain, "call", "contract")
+            self.metrics.instrument_by_name(self.chain, "transact", "contract")
+            self.metrics.instrument_by_name(self.chain, "rpc", "rpc")
+            self.metrics.instrument(self.chain, ["batch"], layer="rpc")
+        if worker_dir is not None:
+            self.metrics.share(worker_dir)
+
+        # Token caches are kept current by following TokenIssued/TokenRevoked instead of re-reading the chain.
+        self.chain_events = ChainEventFollower(self.chain)
+        self.chain_events.subscribe("TokenIssued", self.on_token_event)
+        self.chain_events.subscribe("TokenRevoked", self.on_token_event)
+        self.chain_events.subscribe("NodeRegistered", self.on_node_registered)
+        self.chain_events.on_reset(self.token_cache.clear)
+        self.chain_events.on_reset(self.node_directory.clear)
+        self.chain_events.on_reset(self.authorization.invalidate)
+        self.chain_events.on_reset(self.deployment.invalidate)
+        self.worker_events = None
+        if worker_dir is None:
+            self.start_background_tasks()
+        else:
+            self.worker_events = WorkerEvents(self.chain_events, worker_dir)
+            self.worker_events.listen()
+            election_thread = threading.Thread(target=self.elect_background_worker)
+            election_thread.daemon = True
+            election_thread.start()
 
-        listener_thread = threading.Thread(target=self.listenForValidatorProposal)
-        listener_thread.daemon = True 
-        listener_thread.start()
         self.app = Flask(__name__)
+        self.app.extensions["node_registry"] = self
+        RouteSampler.from_env().install(self.app)
+        self.metrics.instrument_app(self.app)
         self.setup_routes() 
         
-    def verify_node_identity(self, data):
-        try:
-            signature_hex = data.get("signature")
-            public_key_hex = data.get("public_key")
-
-            message_dict = {
-                "node_id": data.get("node_id"),
-                "node_name": data.get("node_name"),
-                "node_type": data.get("node_type"),
-                "public_key": public_key_hex
-            }
+    def start_background_tasks(self):
+        """Starts following the contract events and, on validators, voting for proposed validators."""
+        self.chain_events.start()
 
-            message_json = json.dumps(message_dict, sort_keys=True)
-            message_hash = keccak(text=message_json)
-
-            if public_key_hex.startswith("0x"):
-                public_key_hex = public_key_hex[2:]
-            if signature_hex.startswith("0x"):
-                signature_hex = signature_hex[2:]
-
-            public_key = keys.PublicKey(bytes.fromhex(public_key_hex))
-            signature = keys.Signature(bytes.fromhex(signature_hex))
+        listener_thread = threading.Thread(target=self.listenForValidatorProposal)
+        listener_thread.daemon = True
+        listener_thread.start()
 
-            return public_key.verify_msg_hash(message_hash, signature)
+    def elect_background_worker(self):
+        """Runs the background tasks in exactly one worker of a prefork server.
+
+        The workers queue on a lock file; the holder polls the chain and votes, and relays the
+        contract events to the other workers so their caches stay valid. When it dies, the lock
+        is released with it and the next worker takes over.
+        """
+        lock_file = open(os.path.join(self.worker_dir, "background.lock"), "w")
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        self._background_lock = lock_file
+        logger.info("Worker %s runs the background tasks.", os.getpid())
+        self.worker_events.publish()
+        # Events relayed by the previous holder may be incomplete: every worker starts over.
+        self.chain_events.forget()
+        self.start_background_tasks()
+
+    def shutdown(self):
+        """Stops the background work of this process, e.g. when its server worker exits."""
+        self.chain_events.stop()
+        if self.worker_events is not None:
+            self.worker_events.close()
+        self.signature_verifier.close()
+        if hasattr(self.chain, "close"):
+            self.chain.close()
 
-        except Exception as e:
-            print("Signature verification failed:", str(e))
-            return False
+    def verify_node_identity(self, data):
+        return self.signature_verifier.verify(data)
 
     def register_node_on_chain(self, node_id, node_name, node_type, public_key, address, rpcURL, receiver_node_type, regNodeSig, regBySig):
         try:
-            result = subprocess.run([
-                "node", self.interact_file_path, "registerNode",
-                node_id, node_name, node_type, public_key, address, rpcURL, receiver_node_type, regNodeSig, regBySig
-            ], capture_output=True, text=True)
-
-            output = result.stdout.strip()
-
-            if result.returncode != 0:
-                return "error", result.stderr.strip(), output  
-
-            # Changed: return 3 values to match expected unpacking
-            return "success", "Node registered", output
+            result = self.chain.register_node(
+                node_id, node_name, node_type, public_key, address, rpcURL, receiver_node_type, regNodeSig, reg_by_signature=regBySig
+            )
+            self.node_directory.forget(regNodeSig)
+            return "success", "Node registered", result
 
         except Exception as e:
-            return "error", f"Exception occurred: {str(e)}", ""  
+            return "error", f"Exception occurred: {str(e)}", None
         
     def is_node_registered_js(self, nodeSignature):
-        try:
-            result = subprocess.run(
-                ["node", self.interact_file_path, "isNodeRegistered", nodeSignature],
-                capture_output=True,
-                text=True
-            )
+        if self.node_directory.get(nodeSignature) is not None:
+            return {"status": "success", "registered": True}, 200
+        if self.node_directory.is_unregistered(nodeSignature):
+            return {"status": "success", "registered": False}, 200
 
-            output = result.stdout.strip()
-            if output == "true":
-                return {"status": "success", "registered": True}, 200
-            elif output == "false":
-                return {"status": "success", "registered": False}, 200
-            else:
-                print("Unexpected output:", output)
-                return {"status": "error", "message": f"Unexpected output: {output}"}, 500
+        synced_block = self.chain_events.last_block
+        try:
+            registered = self.chain.is_node_registered(nodeSignature)
+            if registered:
+                self.cache_node_details(self.chain.get_node_details(nodeSignature), synced_block)
+            elif self.chain_events.is_current(synced_block):
+                self.node_directory.put_unregistered(nodeSignature)
+            return {"status": "success", "registered": registered}, 200
 
         except Exception as e:
-            return {"status": "error", "message": str(e)}, 500
+            return {"status": "error", "registered": False, "message": str(e)}, 500
         
-    def get_node_details_js(self, nodeSignature):
-        try:
-            result = subprocess.run(
-                ["node", self.interact_file_path, "getNodeDetails", nodeSignature],
-                capture_output=True,
-                text=True
-            )
+    def nodes_registered(self, node_signatures):
+        """is_node_registered_js for many nodes: the node directory first, one batched chain read for the rest."""
+        registered = {}
+        missing = []
+        for signature in node_signatures:
+            if self.node_directory.get(signature) is not None:
+                registered[signature] = True
+            elif self.node_directory.is_unregistered(signature):
+                registered[signature] = False
+            else:
+                missing.append(signature)
 
-            if result.returncode != 0:
-                return {"status": "error", "message": result.stderr.strip()}, 500
+        if missing:
+            synced_block = self.chain_events.last_block
+            for signature, is_registered in zip(missing, self.chain.are_nodes_registered(missing)):
+                registered[signature] = is_registered
+                if not is_registered and self.chain_events.is_current(synced_block):
+                    self.node_directory.put_unregistered(signature)
+        return registered
 
-            output = result.stdout.strip()
-            
-            try:
-                details = json.loads(output)
-                return {"status": "success", "details": details}, 200
-            except json.JSONDecodeError:
-                return {"status": "error", "message": "Invalid JSON from JS", "raw_output": output}, 500
+    def get_node_details_js(self, nodeSignature):
+        details = self.node_directory.get(nodeSignature)
+        if details is not None:
+            return {"status": "success", "details": details}, 200
+
+        synced_block = self.chain_events.last_block
+        try:
+            details = self.chain.get_node_details(nodeSignature)
+            self.cache_node_details(details, synced_block)
+            return {"status": "success", "details": details}, 200
 
         except Exception as e:
             return {"status": "error", "message": str(e)}, 500
+
+    def cache_node_details(self, details, block):
+        """Caches node details read at `block`, unless a registration newer than that read was already handled."""
+        if details is not None and details["isRegistered"] and self.chain_events.is_current(block):
+            self.node_directory.put(details)
+
+    def reset_chain_caches(self):
+        """Forgets everything cached about the old contract once the artifact names a new one."""
+        self.token_cache.clear()
+        self.node_directory.clear()
+        self.authorization.invalidate()
+        self.authorization.reset_permissions()
+        self.chain_events.restart()
+
+    def on_node_registered(self, event):
+        signature = event["args"]["nodeSignature"]
+        self.node_directory.forget(signature)
+        try:
+            self.node_directory.put(self.chain.get_node_details(signature))
+        except Exception as e:
+            logger.warning("Error loading details of newly registered node: %s", e)
     
+
     def check_smart_contract(self):
         if os.path.exists(self.node_registry_path):
-            print("Node registry file exists. Smart contract can be checked onchain.")
+            logger.debug("Node registry file exists. Smart contract can be checked onchain.")
             return True
         else:
-            print("Node registry file does not exist. Smart contract cannot be checked onchain.")
+            logger.warning("Node registry file does not exist. Smart contract cannot be checked onchain.")
             return False
         
     def check_smart_contract_deployment(self):
-            result = subprocess.run([
-                "node", self.interact_file_path, "checkIfDeployed",
-            ], capture_output=True, text=True)
-            
-            output = result.stdout.strip()
-            if output == "true":
-                print("Smart contract is correctly deployed.")
-                return True
-            elif output == "false":
-                print("Older version of smart contract deployed. Update Contract address.")
-                return False
-            else:
-                print("Unexpected output:", output)
-                return False
+        try:
+            deployed = self.deployment.is_deployed()
+        except Exception as e:
+            logger.error("Unexpected error checking deployment: %s", e)
+            return False
+        if deployed:
+            logger.debug("Smart contract is correctly deployed.")
+        else:
+            logger.warning("Older version of smart contract deployed. Update Contract address.")
+        return deployed
             
     def checkValidator(self, node_Signature):
-        result = subprocess.run([
-            "node", self.interact_file_path, "isValidator", node_Signature
-        ], capture_output=True, text=True)
-
-        output = result.stdout.strip()
-        if output == "true":
-            return True
-        else:
+        try:
+            return self.chain.is_validator(node_Signature)
+        except Exception as e:
+            logger.error("Error checking validator: %s", e)
             return False
         
     def proposeValidator(self, address, add):
         # print(address)
-        result = subprocess.run([
-            "node", self.interact_file_path,
-            "proposeValidatorVote", address, add
-        ], capture_output=True, text=True)
-
-        output = result.stdout.strip()
-        return output
+        return self.chain.propose_validator_vote(address, add)
         
     def emitValidatorProposalToChain(self, address):
-        result = subprocess.run([
-            "node", self.interact_file_path,
-            "emitValidatorProposalToChain", address
-        ], capture_output=True, text=True)
-
-        output = result.stdout.strip()
-        print("Raw JS Output emitValidatorProposalToChain:", output)
-        return output
+        validator = self.chain.emit_validator_proposal(address)
+        logger.info("Validator proposal emitted for: %s", validator)
+        return validator
         
     def listenForValidatorProposal(self):
         while True:
-            if os.path.exists(self.node_details):
-                with open(self.node_details, "r") as json_file:
-                    node_data = json.load(json_file)
-                    signature = node_data.get("signature")
-                    node_id = node_data.get("node_id")
-                    node_name = node_data.get("node_name")
+            node_data = self.identity.get()
+            if node_data is not None:
+                signature = node_data.get("signature")
+                node_id = node_data.get("node_id")
+                node_name = node_data.get("node_name")
+
                 is_validator = self.checkValidator(signature)
 
                 if is_validator:
-                    result = subprocess.run(
-                        ["node", self.interact_file_path, "listenForValidatorProposals"],
-                        capture_output=True,
-                        text=True
-                    )
-
-                    addresses = [address.lower() for address in re.findall(r'0x[a-fA-F0-9]{40}', result.stdout)]
-                    all_validators = self.get_all_validators()
-                    new_addresses = [addr for addr in addresses if addr not in all_validators]
-                    if new_addresses:
-                        print("---------------------------------")
-                        print(f"This Node is a Validator.\nProposer Details : {node_id}: {node_name}")
-                        print("---------------------------------")
-                        # print(f"New validator addresses to propose: {new_addresses}")
-                        for new_validator in new_addresses:
-                            print(f"\nProposing Validator with address: {new_validator}")
-                            response = self.proposeValidator(new_validator, "true")
-                            print(f"Proposed {new_validator} → Response: {response}")
-                    # else:
-                    #     print("All proposed addresses are already validators.")
+                    listener = ValidatorProposalListener(self, self.validator_proposals_file)
+                    listener.run(node_id, node_name)
+                    logger.warning("Validator proposal listener stopped. Checking the validator status again.")
                 else:
-                    print(f"{node_id}: {node_name}is not a validator.")
-                    print(f"Stopping the listener thread. ")
+                    logger.info("%s: %s is not a validator. Stopping the listener thread.", node_id, node_name)
                     break
             else:
-                print("Waiting for the Node to get registered to start the eventListener.")
+                logger.info("Waiting for the Node to get registered to start the eventListener.")
             time.sleep(10)
 
-
     def get_all_validators(self):
-
-        result = subprocess.run([
-            "node", self.interact_file_path, "getValidatorsByBlockNumber"
-        ], capture_output=True, text=True)
-
-        output = result.stdout.strip()
-        return output
+        return self.chain.get_validators()
     
     def get_peers(self):
-        result = subprocess.run([
-            "node", self.interact_file_path, "getPeerCount"
-        ], capture_output=True, text=True)
-
-        output = result.stdout.strip()
-        return output
+        return self.chain.get_peer_count()
     
     def issue_capability_token(self, from_node, to_node):
-
-        result = subprocess.run([
-            "node", self.interact_file_path, "issueCapabilityToken",
-            from_node, to_node
-        ], capture_output=True, text=True)
-
-        output = result.stdout.strip()
-        print("Raw JS Output issueCapabilityToken:", output)
-        return output
+        try:
+            result = self.chain.issue_token(from_node, to_node, route_signature=to_node)
+        except Exception as e:
+            logger.error("Error issuing token: %s", e)
+            return None
+        logger.info("Token issued. Tx Hash: %s", result["transactionHash"])
+        self.token_cache.invalidate(from_node, to_node)
+        self.authorization.invalidate(from_node, to_node)
+        if result.get("event"):
+            # The receipt log carries the new token: no getToken read is needed.
+            self.cache_token(from_node, to_node, TokenCache.from_issued_event(result["event"]), result.get("blockNumber"))
+        return result["event"]
     
+    def renew_capability_token(self, from_node, to_node):
+        """Replaces an expired token: revokes it and issues a new one."""
+        try:
+            result = self.chain.renew_token(from_node, to_node, route_signature=to_node)
+        except Exception as e:
+            logger.error("Error renewing token: %s", e)
+            return None
+        logger.info("Token renewed. Tx Hash: %s", result["transactionHash"])
+        self.token_cache.invalidate(from_node, to_node)
+        self.authorization.invalidate(from_node, to_node)
+        if result.get("event"):
+            self.cache_token(from_node, to_node, TokenCache.from_issued_event(result["event"]), result.get("blockNumber"))
+        return result["event"]
+
     def revoke_capability_token(self, from_node, to_node):
-        result = subprocess.run([
-            "node", self.interact_file_path, "revokeCapabilityToken",
-            from_node, to_node
-        ], capture_output=True, text=True)
-
-        output = result.stdout.strip()
-        print("Raw JS Output revokeCapabilityToken:", output)
-        return output
+        try:
+            result = self.chain.revoke_token(from_node, to_node, route_signature=to_node)
+        except Exception as e:
+            logger.error("Error revoking token: %s", e)
+            return None
+        logger.info("Token revoked. Tx Hash: %s", result["transactionHash"])
+        self.token_cache.invalidate(from_node, to_node)
+        self.authorization.invalidate(from_node, to_node)
+        return result["event"]
     
     def get_capability_token(self, from_node, to_node):
-        result = subprocess.run([
-            "node", self.interact_file_path, "getCapabilityToken",
-            from_node, to_node
-        ], capture_output=True, text=True)
+        token = self.token_cache.get(from_node, to_node)
+        if token is not None:
+            return token
+        synced_block = self.chain_events.last_block
+        try:
+            token = self.chain.get_token(from_node, to_node)
+        except Exception as e:
+            logger.error("Error fetching token: %s", e)
+            return None
+        self.cache_token(from_node, to_node, token, synced_block)
+        return token
+
+    def get_capability_tokens(self, pairs):
+        """get_capability_token for many (from, to) pairs: the token cache first, one batched chain read for the rest.
+
+        Tokens read from the chain are cached, so this also warms the cache for a group of nodes.
+        Returns {(from, to): token}; raises if the chain read fails.
+        """
+        tokens = {}
+        missing = []
+        for from_node, to_node in pairs:
+            token = self.token_cache.get(from_node, to_node)
+            if token is not None:
+                tokens[(from_node, to_node)] = token
+            else:
+                missing.append((from_node, to_node))
 
-        output = result.stdout.strip()
-        return output
+        if missing:
+            synced_block = self.chain_events.last_block
+            for (from_node, to_node), token in zip(missing, self.chain.get_tokens(missing)):
+                tokens[(from_node, to_node)] = token
+                self.cache_token(from_node, to_node, token, synced_block)
+        return tokens
+
+    def cache_token(self, from_node, to_node, token, block):
+        """Caches a token read at `block`, unless an event newer than that read was already handled."""
+        if token is not None and self.chain_events.is_current(block):
+            self.token_cache.put(from_node, to_node, token)
+
+    def on_token_event(self, event):
+        self.token_cache.on_token_event(event)
+        self.authorization.invalidate(event["args"]["fromNodeSignature"], event["args"]["toNodeSignature"])
 
-    
     def check_token_expiry(self, from_node, to_node, validity_period):
-        result = subprocess.run([
-            "node", self.interact_file_path, "checkTokenExpiry",
-            from_node, to_node, validity_period
-        ], capture_output=True, text=True)
-
-        output = result.stdout.strip()
-        # print("Raw JS Output checkTokenExpiry:", output)
-        if output == "true":
-            return True
-        elif output == "false":
-            return False
+        token = self.get_capability_token(from_node, to_node)
+        if token is None:
+            return self.chain.is_token_expired(from_node, to_node, validity_period)
+        return TokenCache.is_expired(token, validity_period)
     
     def check_token_availability(self, from_node, to_node):
-        result = subprocess.run([
-            "node", self.interact_file_path, "checkCapabilityToken",
-            from_node, to_node
-        ], capture_output=True, text=True)
+        token = self.get_capability_token(from_node, to_node)
+        if token is None:
+            return self.chain.check_token(from_node, to_node)
+        return TokenCache.is_available(token)
+
+    def authorization_snapshot(self, from_node, to_node, validity_period):
+        """Deployment, registration, details and token state of a (from, to) pair in one chain round trip."""
+        details = self.node_directory.get(from_node)
+        token = self.token_cache.get(from_node, to_node) if details is not None else None
+        if token is not None and self.check_smart_contract_deployment():
+            return {
+                "block": None,
+                "deployed": True,
+                "registered": True,
+                "details": details,
+                "tokenAvailable": TokenCache.is_available(token),
+                "tokenExpired": TokenCache.is_expired(token, validity_period),
+                "token": token
+            }
+        if self.node_directory.is_unregistered(from_node) and self.check_smart_contract_deployment():
+            return {"block": None, "deployed": True, "registered": False, "details": None}
 
-        output = result.stdout.strip()
-        if output == "true":
-            return True
-        elif output == "false":
-            return False
+        try:
+            snapshot = self.chain.authorization_snapshot(from_node, to_node, validity_period)
+        except Exception as e:
+            logger.error("Error reading authorization state: %s", e)
+            return None
+        if snapshot["deployed"]:
+            self.cache_token(from_node, to_node, snapshot["token"], snapshot["block"])
+            if snapshot["registered"]:
+                self.cache_node_details(snapshot["details"], snapshot["block"])
+            elif self.chain_events.is_current(snapshot["block"]):
+                self.node_directory.put_unregistered(from_node)
+        else:
+            self.deployment.invalidate()
+        return snapshot
+
+    def register_nodes_bulk(self, nodes, callback_url=None):
+        """Registers many nodes at once and returns one result per node, in request order.
+
+        Signatures are verified in parallel worker processes, the registration status of all nodes is read in one
+        batched lookup, and the registerNode transactions are sent concurrently, so they share
+        blocks instead of waiting for each other's receipts. Every node put on chain continues as
+        a registration job from the on-chain state (acknowledgement, validator onboarding).
+        """
+        results = [None] * len(nodes)
+
+        def fail(index, http_status, message):
+            node_id = nodes[index].get("node_id") if isinstance(nodes[index], dict) else None
+            results[index] = {"node_id": node_id, "status": "error", "http_status": http_status, "message": message}
+
+        complete = []
+        for index, data in enumerate(nodes):
+            if isinstance(data, dict) and all(data.get(field) is not None for field in REQUIRED_FIELDS):
+                complete.append(index)
+            else:
+                fail(index, 400, "Missing node details: " + ", ".join(REQUIRED_FIELDS))
+
+        logger.debug("Checking %d node signatures...", len(complete))
+        verified = self.signature_verifier.verify_many([nodes[index] for index in complete])
+        candidates = []
+        signatures = set()
+        for index, is_valid in zip(complete, verified):
+            if not is_valid:
+                fail(index, 400, "Signature verification failed")
+            elif nodes[index]["signature"] in signatures:
+                fail(index, 409, "Node listed more than once in the request")
+            else:
+                signatures.add(nodes[index]["signature"])
+                candidates.append(index)
 
+        logger.debug("Checking if %d nodes are registered on the blockchain...", len(candidates))
+        try:
+            registered = self.nodes_registered([nodes[index]["signature"] for index in candidates])
+        except Exception as e:
+            for index in candidates:
+                fail(index, 500, f"Exception occurred: {str(e)}")
+            return results
+
+        unregistered = []
+        for index in candidates:
+            if registered[nodes[index]["signature"]]:
+                fail(index, 409, "Node already registered on the blockchain")
+            else:
+                unregistered.append(index)
+
+        node_data = self.identity.get()
+        if node_data is None:
+            logger.error("Details of this Node not found. Register First.")
+            for index in unregistered:
+                fail(index, 404, "Details of the connected node not found.")
+            return results
+
+        def register(index):
+            data = nodes[index]
+            return self.register_node_on_chain(
+                data["node_id"], data["node_name"], data["node_type"], data["public_key"],
+                data["address"], data["rpcURL"], node_data.get("node_type"), data["signature"], node_data.get("signature")
+            )
 
+        logger.info("Registering %d nodes on the blockchain...", len(unregistered))
+        for index, (status, message, raw_output) in zip(unregistered, self.bulk_executor.map(register, unregistered)):
+            data = nodes[index]
+            if status != "success":
+                fail(index, 500, message)
+                continue
+            context = {"registrar_node_id": node_data.get("node_id"), "registrar_signature": node_data.get("signature")}
+            job = self.registration_jobs.submit(data, callback_url, state=ON_CHAIN, context=context)
+            results[index] = {
+                "node_id": data["node_id"],
+                "status": "success",
+                "http_status": 200,
+                "message": "Node registered on the blockchain.",
+                "transactionHash": raw_output["transactionHash"],
+                "job_id": job["job_id"],
+                "status_url": f"/register-node/{job['job_id']}"
+            }
+        return results
+
+    def run_registration_step(self, job):
+        """One step of a registration job; returns seconds until the next step, or None when finished."""
+        data = job["request"]
+        context = job["context"]
+        state = job["state"]
+
+        if state == VERIFYING:
+            verify_result = self.verify_node_identity(data)
+            if verify_result is not True:
+                logger.info("Job %s: signature verification failed. The node is invalid.", job["job_id"])
+                return self.registration_jobs.finish(job, FAILED, 400, "Signature verification failed")
+
+            logger.debug("Job %s: signature verified. Checking if the node is registered on the blockchain...", job["job_id"])
+            result, status_code = self.is_node_registered_js(data["signature"])
+            logger.debug("Job %s: node registration check result: %s", job["job_id"], result)
+
+            node_data = self.identity.get()
+            if node_data is not None:
+                node_id = node_data.get("node_id")
+                node_type = node_data.get("node_type")
+                node_signature = node_data.get("signature")
+            else:
+                logger.error("Details of this Node not found. Register First.")
+                return self.registration_jobs.finish(job, FAILED, 404, "Details of the connected node not found.")
+
+            if result["registered"] == True:
+                logger.info("Job %s: node is already registered on the blockchain.", job["job_id"])
+                return self.registration_jobs.finish(job, FAILED, 409, "Node already registered on the blockchain")
+
+            logger.debug("Job %s: node is not registered on the blockchain. Proceeding with registration.", job["job_id"])
+            status, message, raw_output = self.register_node_on_chain(
+                data["node_id"], data["node_name"], data["node_type"], data["public_key"],
+                data["address"], data["rpcURL"], node_type, data["signature"], node_signature
+            )
+            if status != "success":
+                logger.error("Job %s: error in registering node on the blockchain: %s", job["job_id"], message)
+                return self.registration_jobs.finish(job, FAILED, 500, message)
+
+            logger.info("Job %s: node registered on the blockchain. Tx Hash: %s", job["job_id"], raw_output["transactionHash"])
+            job["transactionHash"] = raw_output["transactionHash"]
+            context["registrar_node_id"] = node_id
+            context["registrar_signature"] = node_signature
+            self.registration_jobs.set_state(job, ON_CHAIN, "Node registered on the blockchain.")
+            return 0
+
+        if state == ON_CHAIN:
+            get_All_validators = self.get_all_validators()
+
+            if data["address"].lower() in get_All_validators:
+                logger.info("Job %s: address already exists. This is a Root chain validator", job["job_id"])
+                return self.registration_jobs.finish(job, VALIDATOR, 200, f"Node{data['node_type']} with ID: {data['node_id']} is a root chain. It is already registered as a validator.")
+
+            logger.debug("All Validators: %s", get_All_validators)
+
+            if data["node_type"] != "Sensor" and data["node_type"] != "Activator":
+                logger.info("Job %s: sending acknowledgment to the %s with ID: %s", job["job_id"], data["node_type"], data["node_id"])
+                cloud_ack_sender = AcknowledgementSender(data["node_url"], self.genesis_file_path, self.node_registry_path, self.besu_RPC_url, self.prefunded_keys_file, self.enode_file)
+                cloud_ack_sender.send_acknowledgment(context["registrar_node_id"])
+
+            if not self.checkValidator(data["signature"]):
+                logger.info("Job %s: %s is not a validator.", job["job_id"], data["node_id"])
+                return self.registration_jobs.finish(job, COMPLETED, 200, f"Registration Successful: Node {data['node_id']}: {data['node_name']} not a Validator.")
+
+            context["initial_peers"] = self.get_peers()
+            logger.info("Job %s: %s is a validator. Waiting for %s:%s to connect to chain network (initial peers count: %s).",
+                        job["job_id"], data["node_id"], data["node_id"], data["node_name"], context["initial_peers"])
+            self.registration_jobs.set_state(job, ACKED, f"Waiting for {data['node_id']}:{data['node_name']} to connect to chain network.", timeout=self.peer_timeout)
+            return 0
+
+        if state == ACKED:
+            current_peers = self.get_peers()
+            logger.debug("Job %s: current peers count: %s", job["job_id"], current_peers)
+            if current_peers <= context["initial_peers"]:
+                if self.registration_jobs.timed_out(job):
+                    return self.registration_jobs.finish(job, FAILED, 504, f"Timed out waiting for {data['node_id']}:{data['node_name']} to connect to chain network")
+                return self.registration_poll_interval
+
+            logger.info("Job %s: peers count has increased.", job["job_id"])
+            if self.checkValidator(context["registrar_signature"]):
+                logger.info("Job %s: proposing the validator...", job["job_id"])
+                self.emitValidatorProposalToChain(data["address"])
+            self.registration_jobs.set_state(job, PEERED, "Waiting for the validators to reach consensus.", timeout=self.consensus_timeout)
+            return 0
+
+        if state == PEERED:
+            get_All_validators = self.get_all_validators()
+            logger.debug("All Validators: %s", get_All_validators)
+            if data["address"].lower() not in get_All_validators:
+                if self.registration_jobs.timed_out(job):
+                    return self.registration_jobs.finish(job, FAILED, 504, f"Timed out waiting for the validators to add {data['node_id']}: {data['node_name']}")
+                return self.registration_poll_interval
+
+            logger.info("Job %s: consensus reached. All validators agreed to add %s: %s as a Validator.", job["job_id"], data["node_id"], data["node_name"])
+            return self.registration_jobs.finish(job, VALIDATOR, 200, f"Registration Successful...Consensus Reached...All validators agreed to add {data['node_id']}: {data['node_name']}  as a Validator...")
+
+        return None
+
+    def handle_access_request(self, action):
+        """Shared body of the access routes: may the calling node perform `action` on this node?"""
+        from_signature = request.args.get("signature")
+        node_id = request.args.get("node_id")
+        node_name = request.args.get("node_name")
+
+        if not from_signature:
+            return jsonify({"status": "error", "message": "Missing signature"}), 400
+
+        # print(f"Signature of the {node_id} :", from_signature)
+
+        logger.debug("Received Data %s Request from %s:%s", action.capitalize(), node_id, node_name)
+
+        # No policy of the contract grants this permission: refuse without a chain lookup.
+        if not self.authorization.permissions.grants(action):
+            return jsonify({"status": "error", "message": f"Unsupported action: no node type is granted {action} permission."}), 400
+
+        decision = self.authorization.authorize(from_signature, action)
+        verb = action.lower()
+
+        if decision["reason"] == "not_registered":
+            return jsonify({"status": "error", "message": f"Node {node_id}:{node_name} is not registered.  Register the node first"}), 404
+        if decision["reason"] not in ("permitted", "not_permitted"):
+            return jsonify({"status": "error", "message": decision["message"]}), decision["http_status"]
+
+        to_node_name = decision["to_node_name"]
+        to_node_id = decision["to_node_id"]
+        if decision["allowed"]:
+            logger.debug("%s:%s is allowed to %s at %s:%s with flow %s: %s", node_id, node_name, verb, to_node_name, to_node_id, decision["flow"], decision["permissions"])
+            return jsonify({"status": "success", "message": f"Node {node_id}:{node_name} is allowed to {verb} at {to_node_name}:{to_node_id}"}), 200
+        else:
+            logger.info("%s:%s is not allowed to %s at %s:%s", node_id, node_name, verb, to_node_name, to_node_id)
+            return jsonify({"status": "failure", "message": f"Node {node_id}:{node_name} is not allowed to {verb} at {to_node_name}:{to_node_id}"}), 200
 
     def setup_routes(self):
         """Setup Flask API routes inside the class."""
 
         @self.app.route("/register-node", methods=["POST"])
         def register_node():
-
             check_smart_contract = self.check_smart_contract()
 
             if check_smart_contract:
-                print("Received Node Registration Request")
-                if self.check_smart_contract_deployment():
-                    print("Smart Contract correctly deployed.\n")
-                    print("----------------------------------")
-                    print("Received Node Registration Request")
-                    print("----------------------------------\n")
-                else:
-                    print("Error with Smart Contract File. Redeploy or Check interact.js")
+                if not self.check_smart_contract_deployment():
+                    logger.error("Error with Smart Contract File. Redeploy or Check interact.js")
                     return jsonify({"status": "error", "message": "Older version of smart contract deployed. Update required by admin."}), 500
             else:
                 return jsonify({"status": "error", "message": "Smart contract not deployed.... \nWait for admin to deploy Smart Contract..."}), 500
             
-            data = request.json
-            print("Node Details:")
-            for key, value in data.items():
-                print(f"{key}: {value}")
-            print("---------------------")
-
-            # if os.path.exists(self.node_details):
-            #     with open(self.node_details, "r") as json_file:
-            #         node_data = json.load(json_file)
-            #         node_id = node_data.get("node_id")
-            #         node_type = node_data.get("node_type")
-            #         node_signature = node_data.get("signature")
-            # else:
-            #     print("Details of this Node not found. Register First.")
-            #     return jsonify({"status": "error", "message": "Details of the connected node not found."}), 404
-            
-            verify_result = self.verify_node_identity(data)
-            print("\nChecking Received Node Signature...")
-            if verify_result is True:
-                print("Signature Verification Successful. The node is valid.")
-                print("Lets check if the node is registered on the blockchain or not")
-
-                result, status_code = self.is_node_registered_js(data["signature"])
-                print("Node Registration Check Result:", result)
-
-                if os.path.exists(self.node_details):
-                    with open(self.node_details, "r") as json_file:
-                        node_data = json.load(json_file)
-                        node_id = node_data.get("node_id")
-                        node_type = node_data.get("node_type")
-                        node_signature = node_data.get("signature")
-                else:
-                    print("Details of this Node not found. Register First.")
-                    return jsonify({"status": "error", "message": "Details of the connected node not found."}), 404
-                
-                if result["registered"] == True:
-                    print("Node is already registered on the blockchain.")
-                    return jsonify({"status": "error", "message": "Node already registered on the blockchain"}), 409
-                else:
-                    print("Node is not registered on the blockchain. Proceeding with registration.")
-                    status, message, raw_output = self.register_node_on_chain(
-                        data["node_id"], data["node_name"], data["node_type"], data["public_key"],
-                        data["address"], data["rpcURL"], node_type, data["signature"], node_signature
-                    )
-
-                    if status == "success":
-                        print("Node registered successfully on the blockchain.\n")
-                        print("Node Registration Output Message:")
-                        for line in raw_output.split("\n"):
-                            print(line)
-                    
-                        get_All_validators = self.get_all_validators()
-                        # print("\nAll Validators:", get_All_validators)
-    
-                        if data["address"] in get_All_validators:
-                            print("Address already exists. This is a Root chain validator")
-                            get_All_validators = self.get_all_validators()
-                            # print("All Validators:", get_All_validators)
-                            return jsonify({"status": "success", "message": f"Node{data['node_type']} with ID: {data['node_id']} is a root chain. It is already registered as a validator."}), 200
-
-                        print("All Validators:", get_All_validators)
-
-                        if data["node_type"] != "Sensor" and data["node_type"] != "Activator":
-                            print(f"Sending acknowledgment to the {data['node_type']} with ID: {data['node_id']}")
-                            cloud_ack_sender = AcknowledgementSender(data["node_url"], self.genesis_file_path, self.node_registry_path, self.besu_RPC_url, self.prefunded_keys_file, self.enode_file)
-                            # response = jsonify({"status": "success...", "message": "Node registered successfully", "raw_output": raw_output})
-                            cloud_ack_sender.send_acknowledgment(node_id)
-                        
-                        if self.checkValidator(data["signature"]):
-                            print(f"{data['node_id']} is a validator.\n")
-
-                            get_All_validators = self.get_all_validators()
-                            print("Current Available Validators:", get_All_validators)
-                            print(f"\nWaiting for {data['node_id']}:{data['node_name']} to connect to chain network")
-                            initial_peers = int(self.get_peers())
-                            print("\nInitial Peers Count:", initial_peers)
-
-                            while True:
-                                current_peers = int(self.get_peers())
-                                print("Current Peers Count:", current_peers)
-
-                                if current_peers > initial_peers:
-                                    print("Peers count has increased.")
-                                    break
-
-                                print("Waiting for peers to increase...")
-                                time.sleep(5)
-
-
-                            if self.checkValidator(node_signature):
-                                emitValidatorProposal = self.emitValidatorProposalToChain(data["address"])
-                                print("Emit Validator Proposal Response:", emitValidatorProposal)
-                                print("Proposing the validator...")
-
-                            # response = self.proposeValidator(data["address"], "true")
-                            # print("DEBUG-------> Propose Validator Response:", response)
-                            
-                            get_All_validators = self.get_all_validators()
-                            print("All Validators:", get_All_validators)
-                            while data["address"] not in get_All_validators:
-                                print("Validator is not added yet. Waiting for some time.")
-                                get_All_validators = self.get_all_validators()
-                                print("All Validators:", get_All_validators)
-                                time.sleep(5)
-
-                            print(f"Consensus Reached...\nAll validators agreed to add {data['node_id']}: {data['node_name']}  as a Validator...")
-                            return jsonify({"status": "success", "message": f"Registration Successful...Consensus Reached...All validators agreed to add {data['node_id']}: {data['node_name']}  as a Validator..."}), 200
-
-                        else:
-                            print(f"{data['node_id']} is not a validator.\n")
-                            return jsonify({"status": "success", "message": f"Registration Successful: Node {data['node_id']}: {data['node_name']} not a Validator."}), 200
-                
-                    else:
-                        print("Error in registering node on the blockchain:", message)
-                        return jsonify({"status": "error", "message": message}), 500
-            else:
-                print("Signature Verification Failed. The node is invalid.")
-                return jsonify({"status": "error", "message": "Signature verification failed"}), 400
-                    
+            data = request.get_json(silent=True)
+            logger.debug("Received Node Registration Request: %s", data)
+            if not isinstance(data, dict) or any(data.get(field) is None for field in REQUIRED_FIELDS):
+                return jsonify({"status": "error", "message": "Missing node details: " + ", ".join(REQUIRED_FIELDS)}), 400
+
+            job = self.registration_jobs.submit(data, data.get("callback_url"))
+            logger.info("Registration job %s started for %s", job["job_id"], data.get("node_id"))
+            response = jsonify({
+                "status": "accepted",
+                "message": f"Registration of {data.get('node_id')} accepted.",
+                "job_id": job["job_id"],
+                "status_url": f"/register-node/{job['job_id']}"
+            })
+            response.headers["Location"] = f"/register-node/{job['job_id']}"
+            return response, 202
+
+        @self.app.route("/register-node/<job_id>", methods=["GET"])
+        def registration_status(job_id):
+            wait = min(request.args.get("wait", 0, type=float), 60)
+            job = self.registration_jobs.wait(job_id, wait) if wait > 0 else self.registration_jobs.get(job_id)
+            if job is None:
+                return jsonify({"status": "error", "message": f"Registration job {job_id} not found"}), 404
+            return jsonify(RegistrationJobs.public(job)), 200
+
+        @self.app.route("/register-nodes", methods=["POST"])
+        def register_nodes():
+            if not self.check_smart_contract():
+                return jsonify({"status": "error", "message": "Smart contract not deployed... Wait for admin to deploy Smart Contract..."}), 500
+            if not self.check_smart_contract_deployment():
+                logger.error("Error with Smart Contract File. Redeploy or Check interact.js")
+                return jsonify({"status": "error", "message": "Older version of smart contract deployed. Update required by admin."}), 500
+
+            data = request.json or {}
+            nodes = data.get("nodes")
+            if not isinstance(nodes, list) or not nodes:
+                return jsonify({"status": "error", "message": "Expected a non-empty \"nodes\" list."}), 400
+            if len(nodes) > self.bulk_registration_limit:
+                return jsonify({"status": "error", "message": f"At most {self.bulk_registration_limit} nodes per request."}), 413
+
+            logger.info("Received Bulk Registration of %d Nodes", len(nodes))
+            results = self.register_nodes_bulk(nodes, data.get("callback_url"))
+            registered = sum(1 for result in results if result["status"] == "success")
+            logger.info("Bulk Registration: %d of %d nodes registered on the blockchain.", registered, len(nodes))
+            return jsonify({
+                "status": "success" if registered == len(nodes) else "partial" if registered else "error",
+                "registered": registered,
+                "failed": len(nodes) - registered,
+                "results": results
+            }), 200
 
         @self.app.route("/read", methods=["GET"])
         def read():
-            from_signature = request.args.get("signature")
-            node_id = request.args.get("node_id")
-            node_name = request.args.get("node_name")
-
-            if not from_signature:
-                return jsonify({"status": "error", "message": "Missing signature"}), 400
-
-            # print(f"Signature of the {node_id} :", from_signature)
-
-            check_smart_contract = self.check_smart_contract()
-
-            if check_smart_contract:
-                if self.check_smart_contract_deployment():
-                    print("Smart Contract correctly deployed.\n")
-                    print("----------------------------------")
-                    print("Received Data Read Request")
-                    print("----------------------------------\n")
-                else:
-                    print("Error with Smart Contract File. Redeploy or Check interact.js")
-                    return jsonify({"status": "error", "message": "Older version of smart contract deployed. Update required by admin."}), 500
-            else:
-                print("Deploy Smart Contract first")
-                return jsonify({"status": "error", "message": "Smart contract not deployed... \nWait for admin to deploy Smart Contract..."}), 500
-            result, status_code = self.is_node_registered_js(from_signature)
-            if os.path.exists(self.node_details):
-                with open(self.node_details, "r") as json_file:
-                    node_data = json.load(json_file)
-                    to_node_name = node_data.get("node_name")
-                    to_node_id = node_data.get("node_id")
-                    to_signature = node_data.get("signature")
-            else:
-                print("Details of this Node not found. Register First.")
-                return jsonify({"status": "error", "message": "Details of the connected node not found."}), 404
-            
-            if result["registered"]:
-                print("Node is already registered on the blockchain.")
-                details, status = self.get_node_details_js(from_signature)
-                # print(details)
-
-                check_token = self.check_token_availability(from_signature, to_signature)
-                print("\nChecking if the Token is avalilable:")
-                if check_token:
-                    print("Token is available.")
-                    validity_period = "360000"
-
-                    check_expiry = self.check_token_expiry(from_signature, to_signature, validity_period)
-                    print("\n Checking Token Expiration:")
-                    if check_expiry:
-                        print("Token is expired and needs to be renewed.")
-
-                        revoke_token = self.revoke_capability_token(from_signature, to_signature)
-                        print("Revoke Capability Token:", revoke_token)
-                        issue_token = self.issue_capability_token(from_signature, to_signature)
-                        print("New Capability Token:", issue_token)
-
-                    else:
-                        print("Not Expired. Token is valid.")
-
-                else:
-                    print("Token is not available. Issuing New Token...")
-
-                    issue_token = self.issue_capability_token(from_signature, to_signature)
-                    time.sleep(5)
-                    print("New Capability Token:", issue_token)
-
-                get_token = self.get_capability_token(from_signature, to_signature)
-                policy_line = None
-                for line in get_token.split("\n"):
-                    if line.startswith("Policy:"):
-                        policy_line = line
-                        break
-
-                print("Extracted Policy Line:", policy_line)
-                if policy_line:
-                    policy_data = policy_line.replace("Policy:", "").strip()
-
-                    if ":" in policy_data:
-                        flow, permissions_str = policy_data.split(":", 1)
-                        permissions = [p.strip() for p in permissions_str.split(",")]
-
-                        print("Flow:", flow)
-                        print("Permissions:", permissions)
-
-                        if "READ" in permissions:
-                            print(f"{node_id}:{node_name} is allowed to read at {to_node_name}:{to_node_id} with flow {flow}: {permissions}")
-                            return jsonify({"status": "success", "message": f"Node {node_id}:{node_name} is allowed to read at {to_node_name}:{to_node_id}"}), 200
-                        else:
-                            print(f"{node_id}:{node_name} is not allowed to read at {to_node_name}:{to_node_id}")
-                            return jsonify({"status": "failure", "message": f"Node {node_id}:{node_name} is not allowed to read at {to_node_name}:{to_node_id}"}), 200
-                    else:
-                        print("Invalid policy.")
-                        print(policy_data)
-                        return jsonify({"status": "error", "message": f"{policy_data}"}), 400
-
-            else:
-                print("Node is not registered on the blockchain. Go through the Registration process.")
-                return jsonify({"status": "error", "message": f"Node {node_id}:{node_name} is not registered.  Register the node first"}), 404
-
+            return self.handle_access_request("READ")
 
         @self.app.route("/write", methods=["POST"])
         def write():
-            from_signature = request.args.get("signature")
-            node_id = request.args.get("node_id")
-            node_name = request.args.get("node_name")
-
-            if not from_signature:
-                return jsonify({"status": "error", "message": "Missing signature"}), 400
-
-            # print(f"Signature of the {node_id} :", from_signature)
-
-            check_smart_contract = self.check_smart_contract()
-
-            if check_smart_contract:
-                if self.check_smart_contract_deployment():
-                    print("Smart Contract correctly deployed.\n")
-                    print("----------------------------------")
-                    print("Received Data Write Request")
-                    print("----------------------------------\n")
-                else:
-                    print("Error with Smart Contract File. Redeploy or Check interact.js")
-                    return jsonify({"status": "error", "message": "Older version of smart contract deployed. Update required by admin."}), 500
-            else:
-                print("Deploy Smart Contract first")
-                return jsonify({"status": "error", "message": "Smart contract not deployed... \nWait for admin to deploy Smart Contract..."}), 500
-            result, status_code = self.is_node_registered_js(from_signature)
-            if os.path.exists(self.node_details):
-                with open(self.node_details, "r") as json_file:
-                    node_data = json.load(json_file)
-                    to_node_name = node_data.get("node_name")
-                    to_node_id = node_data.get("node_id")
-                    to_signature = node_data.get("signature")
-            else:
-                print("Details of this Node not found. Register First.")
-                return jsonify({"status": "error", "message": "Details of the connected node not found."}), 404
-            
-            if result["registered"]:
-                print("Node is already registered on the blockchain.")
-                details, status = self.get_node_details_js(from_signature)
-                # print(details)
-
-                check_token = self.check_token_availability(from_signature, to_signature)
-                print("\nChecking if the Token is avalilable:")
-                if check_token:
-                    print("Token is available.")
-                    validity_period = "360000"
-
-                    check_expiry = self.check_token_expiry(from_signature, to_signature, validity_period)
-                    print("\n Checking Token Expiration:")
-                    if check_expiry:
-                        print("Token is expired and needs to be renewed.")
-
-                        revoke_token = self.revoke_capability_token(from_signature, to_signature)
-                        print("Revoke Capability Token:", revoke_token)
-                        issue_token = self.issue_capability_token(from_signature, to_signature)
-                        print("New Capability Token:", issue_token)
-
-                    else:
-                        print("Not Expired. Token is valid.")
-
-                else:
-                    print("Token is not available. Issuing New Token...")
-
-                    issue_token = self.issue_capability_token(from_signature, to_signature)
-                    time.sleep(5)
-                    print("New Capability Token:", issue_token)
-
-                get_token = self.get_capability_token(from_signature, to_signature)
-                policy_line = None
-                for line in get_token.split("\n"):
-                    if line.startswith("Policy:"):
-                        policy_line = line
-                        break
-
-                print("Extracted Policy Line:", policy_line)
-                if policy_line:
-                    policy_data = policy_line.replace("Policy:", "").strip()
-
-                    if ":" in policy_data:
-                        flow, permissions_str = policy_data.split(":", 1)
-                        permissions = [p.strip() for p in permissions_str.split(",")]
-
-                        print("Flow:", flow)
-                        print("Permissions:", permissions)
-
-                        if "WRITE" in permissions:
-                            print(f"{node_id}:{node_name} is allowed to write at {to_node_name}:{to_node_id} with flow {flow}: {permissions}")
-                            return jsonify({"status": "success", "message": f"Node {node_id}:{node_name} is allowed to write at {to_node_name}:{to_node_id}"}), 200
-                        else:
-                            print(f"{node_id}:{node_name} is not allowed to write at {to_node_name}:{to_node_id}")
-                            return jsonify({"status": "failure", "message": f"Node {node_id}:{node_name} is not allowed to write at {to_node_name}:{to_node_id}"}), 200
-                    else:
-                        print("Invalid policy.")
-                        print(policy_data)
-                        return jsonify({"status": "error", "message": f"{policy_data}"}), 400
-
-            else:
-                print("Node is not registered on the blockchain. Go through the Registration process.")
-                return jsonify({"status": "error", "message": f"Node {node_id}:{node_name} is not registered.  Register the node first"}), 404
-            
+            return self.handle_access_request("WRITE")
 
         @self.app.route("/update", methods=["PUT"])
         def update():
-            from_signature = request.args.get("signature")
-            node_id = request.args.get("node_id")
-            node_name = request.args.get("node_name")
-
-            if not from_signature:
-                return jsonify({"status": "error", "message": "Missing signature"}), 400
-
-            # print(f"Signature of the {node_id} :", from_signature)
-
-            check_smart_contract = self.check_smart_contract()
-
-            if check_smart_contract:
-                if self.check_smart_contract_deployment():
-                    print("Smart Contract correctly deployed.\n")
-                    print("----------------------------------")
-                    print("Received Data Update Request")
-                    print("----------------------------------\n")
-                else:
-                    print("Error with Smart Contract File. Redeploy or Check interact.js")
-                    return jsonify({"status": "error", "message": "Older version of smart contract deployed. Update required by admin."}), 500
-            else:
-                print("Deploy Smart Contract first")
-                return jsonify({"status": "error", "message": "Smart contract not deployed... \nWait for admin to deploy Smart Contract..."}), 500
-            result, status_code = self.is_node_registered_js(from_signature)
-            if os.path.exists(self.node_details):
-                with open(self.node_details, "r") as json_file:
-                    node_data = json.load(json_file)
-                    to_node_name = node_data.get("node_name")
-                    to_node_id = node_data.get("node_id")
-                    to_signature = node_data.get("signature")
-            else:
-                print("Details of this Node not found. Register First.")
-                return jsonify({"status": "error", "message": "Details of the connected node not found."}), 404
-            
-            if result["registered"]:
-                print("Node is already registered on the blockchain.")
-                details, status = self.get_node_details_js(from_signature)
-                # print(details)
-
-                check_token = self.check_token_availability(from_signature, to_signature)
-                print("\nChecking if the Token is avalilable:")
-                if check_token:
-                    print("Token is available.")
-                    validity_period = "360000"
-
-                    check_expiry = self.check_token_expiry(from_signature, to_signature, validity_period)
-                    print("\n Checking Token Expiration:")
-                    if check_expiry:
-                        print("Token is expired and needs to be renewed.")
-
-                        revoke_token = self.revoke_capability_token(from_signature, to_signature)
-                        print("Revoke Capability Token:", revoke_token)
-                        issue_token = self.issue_capability_token(from_signature, to_signature)
-                        print("New Capability Token:", issue_token)
-
-                    else:
-                        print("Not Expired. Token is valid.")
-
-                else:
-                    print("Token is not available. Issuing New Token...")
-
-                    issue_token = self.issue_capability_token(from_signature, to_signature)
-                    time.sleep(5)
-                    print("New Capability Token:", issue_token)
-
-                get_token = self.get_capability_token(from_signature, to_signature)
-                policy_line = None
-                for line in get_token.split("\n"):
-                    if line.startswith("Policy:"):
-                        policy_line = line
-                        break
-
-                print("Extracted Policy Line:", policy_line)
-                if policy_line:
-                    policy_data = policy_line.replace("Policy:", "").strip()
-
-                    if ":" in policy_data:
-                        flow, permissions_str = policy_data.split(":", 1)
-                        permissions = [p.strip() for p in permissions_str.split(",")]
-
-                        print("Flow:", flow)
-                        print("Permissions:", permissions)
-
-                        if "UPDATE" in permissions:
-                            print(f"{node_id}:{node_name} is allowed to update at {to_node_name}:{to_node_id} with flow {flow}: {permissions}")
-                            return jsonify({"status": "success", "message": f"Node {node_id}:{node_name} is allowed to update at {to_node_name}:{to_node_id}"}), 200
-                        else:
-                            print(f"{node_id}:{node_name} is not allowed to update at {to_node_name}:{to_node_id}")
-                            return jsonify({"status": "failure", "message": f"Node {node_id}:{node_name} is not allowed to update at {to_node_name}:{to_node_id}"}), 200
-                    else:
-                        print("Invalid policy.")
-                        print(policy_data)
-                        return jsonify({"status": "error", "message": f"{policy_data}"}), 400
+            return self.handle_access_request("UPDATE")
 
-            else:
-                print("Node is not registered on the blockchain. Go through the Registration process.")
-                return jsonify({"status": "error", "message": f"Node {node_id}:{node_name} is not registered.  Register the node first"}), 404        
-           
         @self.app.route("/remove", methods=["DELETE"])
         def remove():
-            from_signature = request.args.get("signature")
-            node_id = request.args.get("node_id")
-            node_name = request.args.get("node_name")
-
-            if not from_signature:
-                return jsonify({"status": "error", "message": "Missing signature"}), 400
-
-            # print(f"Signature of the {node_id} :", from_signature)
-
-            check_smart_contract = self.check_smart_contract()
-
-            if check_smart_contract:
-                if self.check_smart_contract_deployment():
-                    print("Smart Contract correctly deployed.\n")
-                    print("----------------------------------")
-                    print("Received Data Remove Request")
-                    print("----------------------------------\n")
-                else:
-                    print("Error with Smart Contract File. Redeploy or Check interact.js")
-                    return jsonify({"status": "error", "message": "Older version of smart contract deployed. Update required by admin."}), 500
-            else:
-                print("Deploy Smart Contract first")
-                return jsonify({"status": "error", "message": "Smart contract not deployed... \nWait for admin to deploy Smart Contract..."}), 500
-            result, status_code = self.is_node_registered_js(from_signature)
-            if os.path.exists(self.node_details):
-                with open(self.node_details, "r") as json_file:
-                    node_data = json.load(json_file)
-                    to_node_name = node_data.get("node_name")
-                    to_node_id = node_data.get("node_id")
-                    to_signature = node_data.get("signature")
-            else:
-                print("Details of this Node not found. Register First.")
-                return jsonify({"status": "error", "message": "Details of the connected node not found."}), 404
-            
-            if result["registered"]:
-                print("Node is already registered on the blockchain.")
-                details, status = self.get_node_details_js(from_signature)
-                # print(details)
-
-                check_token = self.check_token_availability(from_signature, to_signature)
-                print("\nChecking if the Token is avalilable:")
-                if check_token:
-                    print("Token is available.")
-                    validity_period = "360000"
-
-                    check_expiry = self.check_token_expiry(from_signature, to_signature, validity_period)
-                    print("\n Checking Token Expiration:")
-                    if check_expiry:
-                        print("Token is expired and needs to be renewed.")
-
-                        revoke_token = self.revoke_capability_token(from_signature, to_signature)
-                        print("Revoke Capability Token:", revoke_token)
-                        issue_token = self.issue_capability_token(from_signature, to_signature)
-                        print("New Capability Token:", issue_token)
-
-                    else:
-                        print("Not Expired. Token is valid.")
-
-                else:
-                    print("Token is not available. Issuing New Token...")
-
-                    issue_token = self.issue_capability_token(from_signature, to_signature)
-                    time.sleep(5)
-                    print("New Capability Token:", issue_token)
-
-                get_token = self.get_capability_token(from_signature, to_signature)
-                policy_line = None
-                for line in get_token.split("\n"):
-                    if line.startswith("Policy:"):
-                        policy_line = line
-                        break
-
-                print("Extracted Policy Line:", policy_line)
-                if policy_line:
-                    policy_data = policy_line.replace("Policy:", "").strip()
-
-                    if ":" in policy_data:
-                        flow, permissions_str = policy_data.split(":", 1)
-                        permissions = [p.strip() for p in permissions_str.split(",")]
-
-                        print("Flow:", flow)
-                        print("Permissions:", permissions)
-
-                        if "REMOVE" in permissions:
-                            print(f"{node_id}:{node_name} is allowed to remove at {to_node_name}:{to_node_id} with flow {flow}: {permissions}")
-                            return jsonify({"status": "success", "message": f"Node {node_id}:{node_name} is allowed to remove at {to_node_name}:{to_node_id}"}), 200
-                        else:
-                            print(f"{node_id}:{node_name} is not allowed to remove at {to_node_name}:{to_node_id}")
-                            return jsonify({"status": "failure", "message": f"Node {node_id}:{node_name} is not allowed to remove at {to_node_name}:{to_node_id}"}), 200
-                    else:
-                        print("Invalid policy.")
-                        print(policy_data)
-                        return jsonify({"status": "error", "message": f"{policy_data}"}), 400
-
-            else:
-                print("Node is not registered on the blockchain. Go through the Registration process.")
-                return jsonify({"status": "error", "message": f"Node {node_id}:{node_name} is not registered.  Register the node first"}), 404
+            return self.handle_access_request("REMOVE")
+
+        @self.app.route("/transmit", methods=["POST"])
+        def transmit():
+            # Sensor readings are written to this node: the contract's policies grant WRITE, there is no TRANSMIT permission.
+            return self.handle_access_request("WRITE")
+
+        @self.app.route("/execute", methods=["POST"])
+        def execute():
+            return self.handle_access_request("EXECUTE")
+
+        @self.app.route("/authorization-stats", methods=["GET"])
+        def authorization_stats():
+            stats = self.authorization.stats()
+            stats["token_cache"] = self.token_cache.stats()
+            stats["node_directory"] = self.node_directory.stats()
+            stats["signatures"] = self.signature_verifier.stats()
+            stats["logging"] = logging_pipeline.stats()
+            return jsonify(stats), 200
+
+        @self.app.route("/metrics", methods=["GET"])
+        def metrics():
+            return Response(self.metrics.render(), mimetype="text/plain; version=0.0.4")
 
         @self.app.route("/acknowledgement", methods=["POST"])
         def acknowledgement():
-            print("-----------------------------")
-            print("Received Node Acknowledgement")
-            print("-----------------------------\n")
             try:
                 node_id = request.form.get("node_id")
                 enode = request.form.get("enode")
@@ -847,20 +766,19 @@ class NodeRegistry:
                 if not node_id or not enode:
                     return jsonify({"status": "error", "message": "Missing node_id or enode"}), 400
 
-                print(f"Acknowledgment received from node ID: {node_id}")
-                print(f"Enode received: {enode}")
+                logger.info("Acknowledgment received from node ID: %s with enode: %s", node_id, enode)
 
                 genesis_file = request.files.get("genesis_file")
                 if genesis_file:
                     os.makedirs(os.path.dirname(self.genesis_file_path), exist_ok=True)
                     genesis_file.save(self.genesis_file_path)
-                    print(f"\n file saved to {self.genesis_file_path}")
+                    logger.info("Genesis file saved to %s", self.genesis_file_path)
 
                 node_registry_file = request.files.get("node_registry_file")
                 if node_registry_file:
                     os.makedirs(os.path.dirname(self.data_path), exist_ok=True)
                     node_registry_file.save(self.node_registry_path)
-                    print(f"\nNode registry file saved to {self.node_registry_path}")
+                    logger.info("Node registry file saved to %s", self.node_registry_path)
 
                 prefunded_keys_file = request.files.get("prefunded_keys_file")
                 if prefunded_keys_file:
@@ -868,21 +786,21 @@ class NodeRegistry:
                     os.makedirs(os.path.dirname(self.root_path), exist_ok=True)
                     # Save the file
                     prefunded_keys_file.save(self.prefunded_keys_file)
-                    print(f"\nPrefunded keys file saved to {self.prefunded_keys_file}")
+                    logger.info("Prefunded keys file saved to %s", self.prefunded_keys_file)
 
                 with open(self.enode_file, "w") as enode_file:
                     enode_file.write(enode)
-                print(f"\nEnode saved to {self.enode_file}")
+                logger.info("Enode saved to %s", self.enode_file)
 
                 try:
                     script_path = os.path.join(self.root_path, "start_client_services.sh")
                     if os.path.exists(script_path):
                         subprocess.run(["bash", script_path, "start-chain-client"], check=True, cwd=self.root_path)
-                        print("Blockchain started successfully.")
+                        logger.info("Blockchain started successfully.")
                     else:
-                        print(f"Shell script not found at {script_path}.")
+                        logger.error("Shell script not found at %s.", script_path)
                 except subprocess.CalledProcessError as e:
-                    print(f"Error occurred while running the shell script: {e}")
+                    logger.error("Error occurred while running the shell script: %s", e)
 
                 return jsonify({
                     "status": "success",
@@ -898,14 +816,36 @@ class NodeRegistry:
         """Run the Flask application."""
         self.app.run(host=host, port=port)
 
+def create_app(besu_RPC_url=None, chain_backend=None, worker_dir=None, account_index=0):
+    """App factory for WSGI servers; the RPC URL defaults to the BESU_RPC_URL environment variable."""
+    logging_pipeline.setup_logging()
+    registry = NodeRegistry(besu_RPC_url or os.environ["BESU_RPC_URL"], chain_backend, worker_dir, account_index)
+    return registry.app
+
 if __name__ == "__main__":
     if len(sys.argv) != 3:
         print("Usage: python node_registry.py <besu_RPC_url> <registering_node_url>")
+        print("Set WORKERS (and THREADS) to serve from several processes instead of the development server.")
         sys.exit(1)
     besu_RPC_url = sys.argv[1]
     print("RPC URL:", besu_RPC_url)
     port = sys.argv[2]
     print("Port:", port)
-    registry = NodeRegistry(besu_RPC_url)
-    registry.run("0.0.0.0", port)
-
+    workers = int(os.environ.get("WORKERS", 0))
+    if workers > 0:
+        threads = int(os.environ.get("THREADS", 16))
+        # The keys arrive with the acknowledgement of the root node, so they may not be there yet.
+        keys_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prefunded_keys.json")
+        accounts = workers
+        if os.path.exists(keys_path):
+            with open(keys_path, "r") as keys_file:
+                accounts = len(json.load(keys_file)["prefunded_accounts"])
+        if workers > accounts:
+            print(f"WORKERS={workers}, but each worker needs its own prefunded account and there are {accounts}.")
+            sys.exit(1)
+        prefork_server.serve(lambda worker_dir, worker_index: create_app(besu_RPC_url, worker_dir=worker_dir, account_index=worker_index),
+                             "0.0.0.0", port, workers, threads)
+    else:
+        logging_pipeline.setup_logging()
+        registry = NodeRegistry(besu_RPC_url)
+        registry.run("0.0.0.0", port)
@@ -0,0 +1,57 @@
+import json
+import logging
+import os
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+
+class NodeIdentity:
+    """This node's own details (node-details.json), kept in memory.
+
+    The file is parsed again only when its mtime, inode or size changes, so request handlers
+    get the identity for the cost of one stat. Registration replaces the file atomically with
+    write_node_details, which also changes the inode.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: Path to node-details.json.
+        """
+        self.path = path
+        self._stat = None
+        self._details = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Returns the node details dict, or None while this node has not registered."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._stat = self._details = None
+            return None
+
+        stat_key = (stat.st_mtime_ns, stat.st_ino, stat.st_size)
+        if stat_key != self._stat:
+            with self._lock:
+                if stat_key != self._stat:
+                    try:
+                        with open(self.path, "r") as json_file:
+                            self._details = json.load(json_file)
+                        self._stat = stat_key
+                    except ValueError as e:
+                        # A writer that does not replace the file atomically is half-way through.
+                        logger.warning("Could not parse node details, keeping the previous ones: %s", e)
+        return self._details
+
+
+def write_node_details(path, data):
+    """Writes node-details.json atomically: readers see the old file or the new one, never a mix."""
+    directory = os.path.dirname(os.path.abspath(path))
+    temp_path = os.path.join(directory, f".{os.path.basename(path)}.{os.getpid()}.tmp")
+    with open(temp_path, "w") as json_file:
+        json.dump(data, json_file, indent=4)
+        json_file.flush()
+        os.fsync(json_file.fileno())
+    os.replace(temp_path, path)
@@ -0,0 +1,87 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenCache:
+    """Capability tokens per (from_signature, to_signature) pair.
+
+    Entries are dropped when a TokenIssued/TokenRevoked event names their pair, after `ttl`
+    seconds, or least recently used first once `max_entries` is reached, so memory stays flat
+    however many node pairs talk to this node. Expiry is evaluated locally from issuedAt.
+    """
+
+    def __init__(self, ttl=600, max_entries=100000):
+        """
+        :param ttl: Seconds an entry is trusted even if no event touches it.
+        :param max_entries: Upper bound on the number of cached pairs.
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._tokens = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, from_signature, to_signature):
+        """Returns the cached {policy, issuedAt, isIssued, isRevoked} of the pair, or None."""
+        key = (from_signature, to_signature)
+        with self._lock:
+            entry = self._tokens.get(key)
+            if entry is not None and time.monotonic() - entry["stored_at"] < self.ttl:
+                self._tokens.move_to_end(key)
+                self.hits += 1
+                return entry["token"]
+            if entry is not None:
+                del self._tokens[key]
+            self.misses += 1
+            return None
+
+    def put(self, from_signature, to_signature, token):
+        key = (from_signature, to_signature)
+        with self._lock:
+            self._tokens[key] = {"token": token, "stored_at": time.monotonic()}
+            self._tokens.move_to_end(key)
+            while len(self._tokens) > self.max_entries:
+                self._tokens.popitem(last=False)
+
+    def invalidate(self, from_signature, to_signature):
+        with self._lock:
+            if self._tokens.pop((from_signature, to_signature), None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+
+    def on_token_event(self, event):
+        """TokenIssued/TokenRevoked handler for ChainEventFollower."""
+        self.invalidate(event["args"]["fromNodeSignature"], event["args"]["toNodeSignature"])
+
+    @staticmethod
+    def from_issued_event(args):
+        """The token a TokenIssued event describes, shaped like getToken's result."""
+        return {"policy": args["policy"], "issuedAt": int(args["issuedAt"]), "isIssued": True, "isRevoked": False}
+
+    @staticmethod
+    def is_available(token):
+        """Same rule as the contract's checkToken."""
+        return bool(token["isIssued"]) and not token["isRevoked"]
+
+    @staticmethod
+    def is_expired(token, validity_period, now=None):
+        """Same rule as the contract's isTokenExpired, against the local clock."""
+        if not TokenCache.is_available(token):
+            return True
+        now = time.time() if now is None else now
+        return now > int(token["issuedAt"]) + int(validity_period)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "entries": len(self._tokens)
+            }
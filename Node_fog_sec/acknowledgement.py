@@ -1,6 +1,11 @@
+import logging
 import requests
 import re
 
+
+logger = logging.getLogger(__name__)
+
+
 class AcknowledgementSender:
 
     def __init__(self, registering_node_url, genesis_file, node_registry_file, besu_rpc_url, prefunded_keys_file, enode_file):
@@ -35,7 +40,7 @@ class AcknowledgementSender:
             return None
         
         except requests.exceptions.RequestException as e:
-            print(f"Error fetching enode: {e}")
+            logger.error("Error fetching enode: %s", e)
             return None
         # except FileNotFoundError as e:
         #     print(f"Error: {e}")
@@ -48,7 +53,7 @@ class AcknowledgementSender:
     def send_acknowledgment(self, node_id):        
         enode_id = self.get_enode()
         if not enode_id:
-            print("Error: Enode could not be retrieved!")
+            logger.error("Enode could not be retrieved!")
             return
 
         data = {
@@ -66,12 +71,12 @@ class AcknowledgementSender:
             response = requests.post(f"{self.registering_node_url}/acknowledgement", data=data, files=files)
 
             if response.status_code == 200:
-                print(f"Acknowledgment sent successfully to Node {node_id} with enode: {enode_id}")
+                logger.info("Acknowledgment sent successfully to Node %s with enode: %s", node_id, enode_id)
             else:
-                print(f"Failed to send acknowledgment: {response.json()}")
+                logger.error("Failed to send acknowledgment: %s", response.text)
 
         except Exception as e:
-            print(f"Error sending acknowledgment: {e}")
+            logger.error("Error sending acknowledgment: %s", e)
 
         finally:
             for file in files.values():
@@ -0,0 +1,289 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from permission_matrix import PermissionMatrix, parse_policy, permission_names
+from token_cache import TokenCache
+
+
+logger = logging.getLogger(__name__)
+
+
+class AuthorizationEngine:
+    """Decides whether a registered node may perform an action (READ, WRITE, ...) on this node.
+
+    The policy read from the capability token is cached per (from, to) pair, so a repeat request
+    from an already authorized node is answered from memory until the token expires or a
+    TokenIssued/TokenRevoked event for the pair calls invalidate(); all of them are dropped when
+    the artifact names another contract. Only policies backed by a valid token are cached;
+    every failure is re-checked on the chain.
+
+    Permissions are masks of the PermissionMatrix and a check is one AND with the bit of the
+    action. Once the matrix is verified against the deployed contract, a pair it gives no
+    permission for the action is refused from the node types alone, before any chain lookup
+    and without issuing a token.
+    """
+
+    STAGES = ("node_details", "snapshot", "token_renewal", "total_miss", "total_hit")
+
+    def __init__(self, registry, validity_period=360000, cache_ttl=300, max_entries=10000):
+        """
+        :param registry: The NodeRegistry whose chain helpers are used on a cache miss.
+        :param validity_period: Token validity in seconds, as passed to isTokenExpired.
+        :param cache_ttl: Upper bound in seconds on how long a cached policy is trusted.
+        :param max_entries: Least recently used entries are dropped beyond this size.
+        """
+        self.registry = registry
+        self.validity_period = validity_period
+        self.cache_ttl = cache_ttl
+        self.max_entries = max_entries
+        self.permissions = PermissionMatrix()
+        self._permissions_checked = False
+        self._decisions = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._latency = {stage: {"count": 0, "total": 0.0, "max": 0.0} for stage in self.STAGES}
+
+    # ----------------------------------DECISIONS----------------------------------
+
+    def authorize(self, from_signature, action):
+        """Returns a decision dict for `from_signature` performing `action` on this node.
+
+        The dict always carries `allowed`, `reason` and `http_status`; permission decisions also
+        carry the flow, the permissions and the name and id of this node, and errors a `message`.
+        """
+        started = time.perf_counter()
+        target = self._node_details()
+        if target is None:
+            return self._error("node_details_missing", 404, "Details of the connected node not found.")
+
+        # The memoized deployment check is an os.stat while the contract is known to be deployed. A
+        # changed artifact runs its change handlers, which drop every cached decision, so no hit
+        # outlives the contract it was decided on.
+        deployed = self.registry.check_smart_contract() and self.registry.check_smart_contract_deployment()
+
+        key = (from_signature, target["signature"])
+        with self._lock:
+            entry = self._decisions.get(key) if deployed else None
+            if entry is not None and entry["expires_at"] > time.time():
+                self._decisions.move_to_end(key)
+                self.hits += 1
+            else:
+                if entry is not None:
+                    del self._decisions[key]
+                entry = None
+                self.misses += 1
+
+        if entry is not None:
+            self._record("total_hit", started)
+            return self._permission(entry, target, action, cached=True)
+
+        decision = self._precheck(from_signature, target, action)
+        if decision is not None:
+            self._record("total_miss", started)
+            return decision
+
+        decision = self._authorize_on_chain(from_signature, target, action)
+        self._record("total_miss", started)
+        return decision
+
+    def _authorize_on_chain(self, from_signature, target, action):
+        if not self.registry.check_smart_contract():
+            logger.error("Deploy Smart Contract first")
+            return self._error("not_deployed", 500, "Smart contract not deployed... \nWait for admin to deploy Smart Contract...")
+        if not self._permissions_checked:
+            self.verify_permissions()
+
+        to_signature = target["signature"]
+        # Block up to which token events were applied before this read; see the caching rule below.
+        synced_block = self.registry.chain_events.last_block
+        stage = time.perf_counter()
+        snapshot = self.registry.authorization_snapshot(from_signature, to_signature, str(self.validity_period))
+        self._record("snapshot", stage)
+        if snapshot is None:
+            return self._error("chain_unreachable", 503, "Blockchain is not reachable. Try again later.")
+
+        if snapshot["deployed"]:
+            logger.debug("Smart Contract correctly deployed.")
+        else:
+            logger.error("Error with Smart Contract File. Redeploy or Check interact.js")
+            return self._error("outdated_contract", 500, "Older version of smart contract deployed. Update required by admin.")
+
+        if not snapshot["registered"]:
+            logger.info("Node is not registered on the blockchain. Go through the Registration process.")
+            return {"allowed": False, "reason": "not_registered", "http_status": 404, "cached": False}
+
+        if self.permissions.verified and snapshot.get("details"):
+            decision = self._refuse(snapshot["details"]["nodeType"], target, action)
+            if decision is not None:
+                return decision
+
+        logger.debug("Node is already registered on the blockchain. Checking if the Token is available.")
+        get_token = snapshot["token"]
+        if snapshot["tokenAvailable"]:
+            if snapshot["tokenExpired"]:
+                logger.info("Token is expired and needs to be renewed.")
+                stage = time.perf_counter()
+                issue_token = self.registry.renew_capability_token(from_signature, to_signature)
+                logger.debug("Renewed Capability Token: %s", issue_token)
+                get_token = self._issued_token(issue_token, from_signature, to_signature)
+                self._record("token_renewal", stage)
+            else:
+                logger.debug("Token is available. Not Expired. Token is valid.")
+        else:
+            logger.info("Token is not available. Issuing New Token...")
+            stage = time.perf_counter()
+            issue_token = self.registry.issue_capability_token(from_signature, to_signature)
+            logger.debug("New Capability Token: %s", issue_token)
+            get_token = self._issued_token(issue_token, from_signature, to_signature)
+            self._record("token_renewal", stage)
+
+        policy_data = get_token["policy"].strip() if get_token else None
+        logger.debug("Extracted Policy: %s", policy_data)
+        if not policy_data:
+            return self._error("no_policy", 500, "No capability token could be issued for this node.")
+        parsed = parse_policy(policy_data)
+        if parsed is None:
+            logger.warning("Invalid policy: %s", policy_data)
+            return self._error("invalid_policy", 400, policy_data)
+
+        entry = {"flow": parsed[0], "mask": parsed[1], "expires_at": self._expires_at(get_token)}
+        logger.debug("Flow: %s Permissions: %s", entry["flow"], permission_names(entry["mask"]))
+
+        # Only cache if no token event was handled while we were reading: that event's
+        # invalidation could have run before the entry was stored.
+        if get_token.get("isIssued") and not get_token.get("isRevoked") and self.registry.chain_events.is_current(synced_block):
+            with self._lock:
+                self._decisions[(from_signature, to_signature)] = entry
+                self._decisions.move_to_end((from_signature, to_signature))
+                while len(self._decisions) > self.max_entries:
+                    self._decisions.popitem(last=False)
+
+        return self._permission(entry, target, action, cached=False)
+
+    def _precheck(self, from_signature, target, action):
+        """Decides from the node directory alone, or returns None when the chain must be asked."""
+        if not self.permissions.verified:
+            return None
+        details = self.registry.node_directory.get(from_signature)
+        if details is not None:
+            return self._refuse(details["nodeType"], target, action)
+        if self.registry.node_directory.is_unregistered(from_signature):
+            return {"allowed": False, "reason": "not_registered", "http_status": 404, "cached": False}
+        return None
+
+    def _refuse(self, from_type, target, action):
+        """A not_permitted decision if the matrix gives the pair no permission for `action`, else None."""
+        mask = self.permissions.mask(from_type, target["node_type"])
+        if mask & self.permissions.action_bit(action):
+            return None
+        logger.debug("No %s permission for %s in the permission matrix.", action, self.permissions.flow(from_type, target["node_type"]))
+        entry = {"flow": self.permissions.flow(from_type, target["node_type"]), "mask": mask}
+        return self._permission(entry, target, action, cached=False)
+
+    def verify_permissions(self):
+        """Checks the permission matrix against the deployed contract; the matrix is only trusted if it matches."""
+        self._permissions_checked = True
+        get_code = getattr(self.registry.chain, "get_contract_code", None)
+        try:
+            problems = self.permissions.verify(self.registry.node_registry_path, get_code() if get_code else None)
+        except Exception as e:
+            problems = [str(e)]
+            self.permissions.verified = False
+        if problems:
+            logger.error("Permission matrix does not match the deployed contract; using token policies only: %s", "; ".join(problems))
+        else:
+            logger.info("Permission matrix verified against the deployed contract.")
+        return not problems
+
+    def reset_permissions(self):
+        """Re-verifies the permission matrix on the next chain lookup (the contract changed)."""
+        self.permissions.verified = False
+        self._permissions_checked = False
+
+    def _issued_token(self, issue_token, from_signature, to_signature):
+        """The token just issued, taken from its TokenIssued receipt log when there is one."""
+        if issue_token and issue_token.get("policy") is not None:
+            return TokenCache.from_issued_event(issue_token)
+        return self.registry.get_capability_token(from_signature, to_signature)
+
+    def _expires_at(self, token):
+        expires_at = time.time() + self.cache_ttl
+        issued_at = int(token.get("issuedAt") or 0)
+        if issued_at:
+            expires_at = min(expires_at, issued_at + int(self.validity_period))
+        return expires_at
+
+    def _node_details(self):
+        stage = time.perf_counter()
+        node_data = self.registry.identity.get()
+        self._record("node_details", stage)
+        if node_data is None:
+            logger.error("Details of this Node not found. Register First.")
+            return None
+        return {
+            "node_name": node_data.get("node_name"),
+            "node_id": node_data.get("node_id"),
+            "node_type": node_data.get("node_type"),
+            "signature": node_data.get("signature")
+        }
+
+    def _permission(self, entry, target, action, cached):
+        allowed = bool(entry["mask"] & self.permissions.action_bit(action))
+        return {
+            "allowed": allowed,
+            "reason": "permitted" if allowed else "not_permitted",
+            "http_status": 200,
+            "cached": cached,
+            "flow": entry["flow"],
+            "permissions": permission_names(entry["mask"]),
+            "to_node_name": target["node_name"],
+            "to_node_id": target["node_id"]
+        }
+
+    def _error(self, reason, http_status, message):
+        return {"allowed": False, "reason": reason, "http_status": http_status, "message": message, "cached": False}
+
+    # ----------------------------------CACHE----------------------------------
+
+    def invalidate(self, from_signature=None, to_signature=None):
+        """Drops cached policies, all of them or only those matching the given signatures."""
+        with self._lock:
+            if from_signature is None and to_signature is None:
+                self._decisions.clear()
+                return
+            for key in [key for key in self._decisions
+                        if from_signature in (None, key[0]) and to_signature in (None, key[1])]:
+                del self._decisions[key]
+
+    # ----------------------------------STATS----------------------------------
+
+    def _record(self, stage, started):
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            latency = self._latency[stage]
+            latency["count"] += 1
+            latency["total"] += elapsed
+            latency["max"] = max(latency["max"], elapsed)
+
+    def stats(self):
+        """Cache hit/miss counters and average/max latency per stage, in milliseconds."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "cache": {
+                    "hits": self.hits,
+                    "misses": self.misses,
+                    "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                    "entries": len(self._decisions)
+                },
+                "latency_ms": {
+                    stage: {
+                        "count": latency["count"],
+                        "avg": round(latency["total"] * 1000 / latency["count"], 3) if latency["count"] else 0.0,
+                        "max": round(latency["max"] * 1000, 3)
+                    }
+                    for stage, latency in self._latency.items()
+                }
+            }
@@ -0,0 +1,127 @@
+import atexit
+import contextvars
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+
+
+# Whether DEBUG records of the current request are kept; see RouteSampler.
+_debug_sampled = contextvars.ContextVar("debug_sampled", default=True)
+
+_lock = threading.Lock()
+_pid = None
+_handler = None
+_listener = None
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the writer thread; never blocks the caller.
+
+    When the writer falls behind and the queue is full, records are dropped and counted instead
+    of stalling the request that logs them.
+    """
+
+    def __init__(self, record_queue):
+        super().__init__(record_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class DebugSampleFilter(logging.Filter):
+    """Drops DEBUG records of requests that were not sampled by the RouteSampler."""
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or _debug_sampled.get()
+
+
+class RouteSampler:
+    """Keeps the DEBUG output of only a share of the requests of each Flask route.
+
+    Rates come from LOG_DEBUG_SAMPLE, e.g. "/read=0.01,/register-node=1,*=0.1": the route rule
+    (as declared, e.g. "/register-node/<job_id>") and the share of its requests whose DEBUG
+    records are written. "*" is the rate of routes not listed (1 by default).
+    """
+
+    def __init__(self, rates=None, default=1.0):
+        self.rates = dict(rates or {})
+        self.default = self.rates.pop("*", default)
+
+    @classmethod
+    def from_env(cls):
+        rates = {}
+        for item in os.environ.get("LOG_DEBUG_SAMPLE", "").split(","):
+            if "=" in item:
+                route, rate = item.rsplit("=", 1)
+                rates[route.strip()] = float(rate)
+        return cls(rates)
+
+    def rate(self, route):
+        return self.rates.get(route, self.default)
+
+    def install(self, app):
+        from flask import request
+
+        @app.before_request
+        def sample_debug_output():
+            route = request.url_rule.rule if request.url_rule is not None else request.path
+            rate = self.rate(route)
+            _debug_sampled.set(rate >= 1 or random.random() < rate)
+
+
+def setup_logging(level=None, queue_size=10000):
+    """Sends the records of this process through a queue to one writer thread.
+
+    Loggers write records to a bounded queue; a QueueListener thread formats them and writes
+    them to stdout. Request threads therefore never wait on the terminal, which under load
+    (and with the Besu output piped through the same stdout) would serialize them.
+
+    Safe to call more than once: a process forked from a configured one gets its own queue and
+    writer thread, the parent's thread does not exist in the child.
+
+    :param level: Root level; defaults to the LOG_LEVEL environment variable, else INFO.
+    :param queue_size: Records waiting for the writer before new ones are dropped.
+    """
+    global _pid, _handler, _listener
+    with _lock:
+        if _pid == os.getpid():
+            return _handler
+        root = logging.getLogger()
+        if _handler is not None:
+            root.removeHandler(_handler)
+
+        record_queue = queue.Queue(queue_size)
+        console = logging.StreamHandler(sys.stdout)
+        console.setFormatter(logging.Formatter("%(asctime)s %(process)d %(levelname)s %(name)s: %(message)s"))
+        _listener = logging.handlers.QueueListener(record_queue, console)
+        _listener.start()
+        # stop_logging, not _listener.stop: the listener may have been stopped already.
+        atexit.register(stop_logging)
+
+        _handler = DroppingQueueHandler(record_queue)
+        _handler.addFilter(DebugSampleFilter())
+        root.addHandler(_handler)
+        root.setLevel((level or os.environ.get("LOG_LEVEL", "INFO")).upper())
+        _pid = os.getpid()
+        return _handler
+
+
+def stop_logging():
+    """Writes out the queued records; for processes that leave through os._exit()."""
+    global _pid
+    with _lock:
+        if _listener is not None and _pid == os.getpid():
+            _listener.stop()
+            _pid = None
+
+
+def stats():
+    return {"level": logging.getLevelName(logging.getLogger().level), "dropped": _handler.dropped if _handler is not None else 0}
@@ -0,0 +1,304 @@
+import bisect
+import contextlib
+import functools
+import glob
+import json
+import os
+import threading
+import time
+
+
+# Upper bounds in seconds: from cached authorizations (sub-millisecond) to receipts (minutes).
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace("\"", "\\\"")
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class _Family:
+    """One metric name with its labelled series."""
+
+    def __init__(self, name, kind, help_text, labelnames):
+        self.name = name
+        self.kind = kind
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def header(self, kind=None):
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {kind or self.kind}"]
+
+    def snapshot(self):
+        """The series as [[labels...], value] pairs, JSON-serializable."""
+        with self.lock:
+            return [[list(labels), self._copy(value)] for labels, value in self.series.items()]
+
+    @staticmethod
+    def _copy(value):
+        return value
+
+    @staticmethod
+    def merge(values):
+        return sum(values)
+
+
+class Counter(_Family):
+
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, "counter", help_text, labelnames)
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.series[labels] = self.series.get(labels, 0) + amount
+
+    def render(self, series):
+        return self.header() + [f"{self.name}{_labels(self.labelnames, labels)} {value}" for labels, value in series]
+
+
+class Gauge(Counter):
+
+    def __init__(self, name, help_text, labelnames=()):
+        _Family.__init__(self, name, "gauge", help_text, labelnames)
+
+    def dec(self, *labels):
+        self.inc(*labels, amount=-1)
+
+
+class Histogram(_Family):
+    """Fixed-bucket histogram; p50/p95/p99 are interpolated from the buckets.
+
+    Observing is a bisect and three additions under a lock, cheap enough for every request.
+    The quantiles are as precise as the buckets around them, which is what Prometheus'
+    histogram_quantile() would compute from the same series.
+    """
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, "histogram", help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            series["counts"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    @staticmethod
+    def _copy(value):
+        return {"counts": list(value["counts"]), "sum": value["sum"], "count": value["count"]}
+
+    @staticmethod
+    def merge(values):
+        values = list(values)
+        return {
+            "counts": [sum(counts) for counts in zip(*(value["counts"] for value in values))],
+            "sum": sum(value["sum"] for value in values),
+            "count": sum(value["count"] for value in values)
+        }
+
+    def quantile(self, q, counts):
+        total = sum(counts)
+        if not total:
+            return 0.0
+        rank = q * total
+        cumulative = 0
+        for index, count in enumerate(counts):
+            if cumulative + count >= rank and count:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                if index == len(self.buckets):
+                    return lower  # Beyond the last bucket: its bound is all that is known.
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def render(self, series):
+        lines = self.header()
+        for labels, data in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), data["counts"]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {data['sum']:.6f}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {data['count']}")
+
+        # The quantiles as a gauge family of their own: a histogram cannot carry them.
+        lines += [f"# HELP {self.name}_quantile {self.help_text} (p50/p95/p99 estimated from the buckets)",
+                  f"# TYPE {self.name}_quantile gauge"]
+        for labels, data in series:
+            for q in QUANTILES:
+                value = self.quantile(q, data["counts"])
+                lines.append(f"{self.name}_quantile{_labels(self.labelnames, labels, [('quantile', q)])} {value:.6f}")
+        return lines
+
+
+class Metrics:
+    """Latency histograms, counters and in-flight gauges of one registry process.
+
+    Four layers are timed, so the latency of a request can be split up:
+    - http: every Flask route (see instrument_app), by route rule, method and status;
+    - stage: the NodeRegistry steps that reach the chain or verify signatures;
+    - contract: contract functions called or sent by the chain backend (for the interact.js
+      backend, each daemon request: this includes the round trip to the node process);
+    - rpc: JSON-RPC requests to the node, by method (ChainGateway only).
+
+    render() returns the Prometheus text exposition format served by /metrics. In a prefork
+    server each worker has its own Metrics; share() lets every worker answer with the sum of
+    all of them.
+    """
+
+    def __init__(self, namespace="node_registry"):
+        self.namespace = namespace
+        self.families = []
+        self.shared_dir = None
+        self.http_duration = self.histogram("http_request_duration_seconds", "Time to handle a request.", ("route", "method"))
+        self.http_requests = self.counter("http_requests_total", "Requests handled.", ("route", "method", "status"))
+        self.http_in_flight = self.gauge("http_requests_in_flight", "Requests being handled.", ("route",))
+        self.timers = {}
+        for layer, help_text in (("stage", "NodeRegistry step"), ("contract", "Contract function call"), ("rpc", "JSON-RPC request")):
+            self.timers[layer] = (
+                self.histogram(f"{layer}_duration_seconds", f"Time spent in a {help_text}.", (layer,)),
+                self.counter(f"{layer}_errors_total", f"{help_text}s that raised.", (layer,)),
+                self.gauge(f"{layer}_in_flight", f"{help_text}s running.", (layer,))
+            )
+
+    def _add(self, family):
+        self.families.append(family)
+        return family
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._add(Counter(f"{self.namespace}_{name}", help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._add(Gauge(f"{self.namespace}_{name}", help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(f"{self.namespace}_{name}", help_text, labelnames, buckets))
+
+    # ----------------------------------INSTRUMENTATION----------------------------------
+
+    def timed(self, layer, name, function):
+        """Wraps `function` so its calls are timed under `name` in `layer` ("stage", "contract" or "rpc")."""
+        duration, errors, in_flight = self.timers[layer]
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            in_flight.inc(name)
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            except Exception:
+                errors.inc(name)
+                raise
+            finally:
+                duration.observe(time.perf_counter() - started, name)
+                in_flight.dec(name)
+        return wrapper
+
+    def instrument(self, obj, method_names, layer="stage"):
+        """Replaces the named methods of `obj` (on the instance) with timed wrappers."""
+        for method_name in method_names:
+            setattr(obj, method_name, self.timed(layer, method_name, getattr(obj, method_name)))
+
+    def instrument_by_name(self, obj, method_name, layer):
+        """Times obj.method_name(name, ...) under its first argument, e.g. the RPC method it sends."""
+        function = getattr(obj, method_name)
+        timed = {}
+
+        @functools.wraps(function)
+        def wrapper(name, *args, **kwargs):
+            call = timed.get(name)
+            if call is None:
+                call = timed.setdefault(name, self.timed(layer, name, function))
+            return call(name, *args, **kwargs)
+        setattr(obj, method_name, wrapper)
+
+    def instrument_app(self, app):
+        """Times every request of a Flask app by route rule, so the label set stays bounded."""
+        from flask import g, request
+
+        @app.before_request
+        def start_request_timer():
+            g.metrics_route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+            g.metrics_started = time.perf_counter()
+            self.http_in_flight.inc(g.metrics_route)
+
+        @app.after_request
+        def count_response(response):
+            if "metrics_route" in g:
+                self.http_requests.inc(g.metrics_route, request.method, str(response.status_code))
+            return response
+
+        @app.teardown_request
+        def stop_request_timer(error=None):
+            if "metrics_started" in g:
+                self.http_duration.observe(time.perf_counter() - g.metrics_started, g.metrics_route, request.method)
+                self.http_in_flight.dec(g.metrics_route)
+                if error is not None:
+                    self.http_requests.inc(g.metrics_route, request.method, "500")
+
+    # ----------------------------------EXPOSITION----------------------------------
+
+    def snapshot(self):
+        return {family.name: family.snapshot() for family in self.families}
+
+    def share(self, directory, interval=5):
+        """Publishes this process's series in `directory` every `interval` seconds and merges
+        those of the other live processes into render()."""
+        self.shared_dir = directory
+        self._path = os.path.join(directory, f"metrics-{os.getpid()}.json")
+
+        def publish():
+            while True:
+                temp_path = self._path + ".tmp"
+                with open(temp_path, "w") as snapshot_file:
+                    json.dump(self.snapshot(), snapshot_file)
+                os.replace(temp_path, self._path)
+                time.sleep(interval)
+
+        thread = threading.Thread(target=publish)
+        thread.daemon = True
+        thread.start()
+
+    def _shared_snapshots(self):
+        snapshots = []
+        for path in glob.glob(os.path.join(self.shared_dir, "metrics-*.json")):
+            if path == self._path:
+                continue
+            try:
+                os.kill(int(path.rsplit("-", 1)[1].split(".")[0]), 0)
+                with open(path, "r") as snapshot_file:
+                    snapshots.append(json.load(snapshot_file))
+            except ProcessLookupError:
+                # A worker that is gone: its counters go with it. Another worker may have removed the file already.
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(path)
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    def render(self):
+        snapshots = [self.snapshot()]
+        if self.shared_dir is not None:
+            snapshots += self._shared_snapshots()
+        lines = []
+        for family in self.families:
+            merged = {}
+            for snapshot in snapshots:
+                for labels, value in snapshot.get(family.name, []):
+                    merged.setdefault(tuple(labels), []).append(value)
+            lines += family.render(sorted((labels, family.merge(values)) for labels, values in merged.items()))
+        return "\n".join(lines) + "\n"
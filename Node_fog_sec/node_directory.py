@@ -0,0 +1,122 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class NodeDirectory:
+    """In-memory directory of registered nodes, looked up by signature, node ID or address.
+
+    Positive entries hold the details returned by getNodeDetailsBySignature. A registration
+    never changes on-chain except by a newer NodeRegistered event for the same node ID or
+    address, so positive entries need no TTL; they are only bounded by `max_entries`.
+    Negative entries ("this signature is not registered") live `negative_ttl` seconds and
+    are dropped as soon as a NodeRegistered event names the signature.
+    """
+
+    def __init__(self, max_entries=100000, negative_ttl=5, max_negative_entries=10000):
+        """
+        :param max_entries: Upper bound on registered nodes kept, least recently used dropped first.
+        :param negative_ttl: Seconds a "not registered" answer is trusted.
+        :param max_negative_entries: Upper bound on "not registered" answers kept.
+        """
+        self.max_entries = max_entries
+        self.negative_ttl = negative_ttl
+        self.max_negative_entries = max_negative_entries
+        self._by_signature = OrderedDict()
+        self._by_node_id = {}
+        self._by_address = {}
+        self._unregistered = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    def get(self, signature):
+        """Returns the cached details of a registered node, or None."""
+        with self._lock:
+            details = self._by_signature.get(signature)
+            if details is not None:
+                self._by_signature.move_to_end(signature)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return details
+
+    def is_unregistered(self, signature):
+        """True if the chain recently answered that `signature` is not registered."""
+        with self._lock:
+            expires_at = self._unregistered.get(signature)
+            if expires_at is not None and expires_at > time.monotonic():
+                self.negative_hits += 1
+                return True
+            if expires_at is not None:
+                del self._unregistered[signature]
+            return False
+
+    def get_by_node_id(self, node_id):
+        with self._lock:
+            signature = self._by_node_id.get(node_id)
+        return self.get(signature) if signature is not None else None
+
+    def get_by_address(self, address):
+        with self._lock:
+            signature = self._by_address.get(address.lower())
+        return self.get(signature) if signature is not None else None
+
+    def put(self, details):
+        """Stores the details of a registered node, replacing an older registration of its ID or address."""
+        signature = details["nodeSignature"]
+        address = details["registeredBy"].lower()
+        with self._lock:
+            self._unregistered.pop(signature, None)
+            for index, key in ((self._by_node_id, details["nodeId"]), (self._by_address, address)):
+                previous = index.get(key)
+                if previous is not None and previous != signature:
+                    self._drop(previous)
+            self._by_signature[signature] = details
+            self._by_signature.move_to_end(signature)
+            self._by_node_id[details["nodeId"]] = signature
+            self._by_address[address] = signature
+            while len(self._by_signature) > self.max_entries:
+                self._drop(next(iter(self._by_signature)))
+
+    def put_unregistered(self, signature):
+        with self._lock:
+            self._unregistered[signature] = time.monotonic() + self.negative_ttl
+            self._unregistered.move_to_end(signature)
+            while len(self._unregistered) > self.max_negative_entries:
+                self._unregistered.popitem(last=False)
+
+    def forget(self, signature):
+        """Drops everything known about `signature`, positive or negative."""
+        with self._lock:
+            self._unregistered.pop(signature, None)
+            if signature in self._by_signature:
+                self._drop(signature)
+
+    def _drop(self, signature):
+        details = self._by_signature.pop(signature, None)
+        if details is None:
+            return
+        if self._by_node_id.get(details["nodeId"]) == signature:
+            del self._by_node_id[details["nodeId"]]
+        address = details["registeredBy"].lower()
+        if self._by_address.get(address) == signature:
+            del self._by_address[address]
+
+    def clear(self):
+        with self._lock:
+            self._by_signature.clear()
+            self._by_node_id.clear()
+            self._by_address.clear()
+            self._unregistered.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "entries": len(self._by_signature),
+                "negative_entries": len(self._unregistered)
+            }
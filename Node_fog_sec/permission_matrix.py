@@ -0,0 +1,144 @@
+import json
+import re
+
+
+NODE_TYPES = ("Unknown", "Cloud", "Fog", "Edge", "Sensor", "Actuator")
+
+# Permission name -> bit of a permission mask.
+PERMISSION_BITS = {"READ": 1, "WRITE": 2, "UPDATE": 4, "REMOVE": 8, "EXECUTE": 16}
+
+NO_POLICY = "NO POLICY"
+
+# getPolicyString of the NodeRegistry contract: (from type, to type) -> permissions. Any other pair has NO POLICY.
+POLICIES = {
+    ("Cloud", "Fog"): ("READ", "WRITE"),
+    ("Cloud", "Edge"): ("READ",),
+    ("Fog", "Cloud"): ("READ", "WRITE"),
+    ("Fog", "Edge"): ("READ", "UPDATE"),
+    ("Edge", "Cloud"): ("WRITE", "UPDATE"),
+    ("Edge", "Fog"): ("READ", "REMOVE"),
+    ("Sensor", "Edge"): ("WRITE", "REMOVE"),
+    ("Actuator", "Fog"): ("READ", "REMOVE"),
+}
+
+_POLICY_BRANCH = re.compile(r'from\s*==\s*NodeType\.(\w+)\s*&&\s*to\s*==\s*NodeType\.(\w+)\s*\)\s*\{\s*return\s*"([^"]*)"')
+
+
+def permission_mask(permissions):
+    """Mask of an iterable of permission names; unknown names are ignored."""
+    mask = 0
+    for permission in permissions:
+        mask |= PERMISSION_BITS.get(permission.strip().upper(), 0)
+    return mask
+
+
+def permission_names(mask):
+    return [name for name, bit in PERMISSION_BITS.items() if mask & bit]
+
+
+def node_type_index(node_type):
+    """Enum value of a node type given as its name, its value or the decimal string of its value."""
+    if isinstance(node_type, int):
+        return node_type if 0 <= node_type < len(NODE_TYPES) else 0
+    if node_type is None:
+        return 0
+    if node_type.isdigit():
+        return node_type_index(int(node_type))
+    return NODE_TYPES.index(node_type) if node_type in NODE_TYPES else 0
+
+
+def parse_policy(policy):
+    """Splits a policy string of the contract ("Edge->Fog:READ,REMOVE") into (flow, mask).
+
+    Returns None for NO POLICY and for anything that is not a policy string.
+    """
+    policy = (policy or "").strip()
+    if ":" not in policy:
+        return None
+    flow, permissions = policy.split(":", 1)
+    return flow, permission_mask(permissions.split(","))
+
+
+class PermissionMatrix:
+    """NodeType x NodeType -> permission mask, compiled once from POLICIES.
+
+    An access check is a lookup in a 6x6 table and one AND with the bit of the action, with no
+    policy string parsed per request. verify() checks the table against the getPolicyString of
+    the deployed contract; until it has passed, callers should fall back to the policy of the
+    capability token.
+    """
+
+    def __init__(self, policies=POLICIES):
+        size = len(NODE_TYPES)
+        self.masks = [[0] * size for _ in range(size)]
+        self.flows = [[f"{from_type}->{to_type}" for to_type in NODE_TYPES] for from_type in NODE_TYPES]
+        for (from_type, to_type), permissions in policies.items():
+            self.masks[NODE_TYPES.index(from_type)][NODE_TYPES.index(to_type)] = permission_mask(permissions)
+        self.verified = False
+
+    def mask(self, from_type, to_type):
+        """Permission mask of the pair; 0 when the contract defines NO POLICY for it."""
+        return self.masks[node_type_index(from_type)][node_type_index(to_type)]
+
+    def flow(self, from_type, to_type):
+        return self.flows[node_type_index(from_type)][node_type_index(to_type)]
+
+    def policy_string(self, from_type, to_type):
+        """The string getPolicyString returns for the pair."""
+        mask = self.mask(from_type, to_type)
+        if not mask:
+            return NO_POLICY
+        return f"{self.flow(from_type, to_type)}:{','.join(permission_names(mask))}"
+
+    @staticmethod
+    def action_bit(action):
+        return PERMISSION_BITS.get((action or "").upper(), 0)
+
+    def allows(self, from_type, to_type, action):
+        return bool(self.mask(from_type, to_type) & self.action_bit(action))
+
+    def grants(self, action):
+        """Whether any pair of node types has a policy with the permission for `action`."""
+        bit = self.action_bit(action)
+        return any(mask & bit for row in self.masks for mask in row)
+
+    def verify(self, artifact_path, deployed_code=None):
+        """Checks the table against the contract; returns the list of differences found (empty if none).
+
+        The getPolicyString branches are read from the artifact's source, and every policy
+        string they return must be compiled into the deployed code (the artifact's
+        deployedBytecode when `deployed_code` is not given).
+
+        :param artifact_path: Path to the Truffle artifact (data/NodeRegistry.json).
+        :param deployed_code: Hex runtime code read with eth_getCode, if the chain backend can.
+        """
+        with open(artifact_path, "r") as artifact_file:
+            artifact = json.load(artifact_file)
+        branches = _POLICY_BRANCH.findall(artifact.get("source", ""))
+        problems = []
+        if not branches:
+            problems.append("getPolicyString not found in the contract source")
+
+        contract_masks = {}
+        for from_type, to_type, policy in branches:
+            parsed = parse_policy(policy)
+            if from_type not in NODE_TYPES or to_type not in NODE_TYPES or parsed is None:
+                problems.append(f"unexpected policy {from_type}->{to_type}: {policy!r}")
+                continue
+            contract_masks[(from_type, to_type)] = parsed[1]
+            if parsed[0] != f"{from_type}->{to_type}":
+                problems.append(f"policy of {from_type}->{to_type} names flow {parsed[0]}")
+
+        for from_type in NODE_TYPES:
+            for to_type in NODE_TYPES:
+                expected = contract_masks.get((from_type, to_type), 0)
+                if branches and self.mask(from_type, to_type) != expected:
+                    problems.append(f"{from_type}->{to_type}: table has {permission_names(self.mask(from_type, to_type))}, contract has {permission_names(expected)}")
+
+        code = (deployed_code or artifact.get("deployedBytecode") or "").lower()
+        for _, _, policy in branches:
+            if policy.encode().hex() not in code:
+                problems.append(f"policy {policy!r} is not in the deployed code")
+
+        self.verified = not problems
+        return problems
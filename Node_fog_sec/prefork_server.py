@@ -0,0 +1,176 @@
+import logging
+import os
+import shutil
+import signal
+import socket
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.serving import BaseWSGIServer
+import logging_pipeline
+
+
+logger = logging.getLogger(__name__)
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug WSGI server that handles requests on a fixed pool of threads.
+
+    The development server started by app.run() opens one thread per connection and is meant
+    for a single process. This one serves an already bound socket (shared with the other
+    workers) and caps the threads of the worker.
+    """
+
+    multithread = True
+
+    def __init__(self, sock, app, threads=16):
+        """
+        :param sock: Listening socket, bound by the master process.
+        :param app: WSGI application.
+        :param threads: Requests handled at the same time.
+        """
+        self._pool = None
+        host, port = sock.getsockname()[:2]
+        super().__init__(host, port, app, fd=sock.fileno())
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="http")
+
+    def get_request(self):
+        request, client_address = super().get_request()
+        # The shared listening socket is non-blocking (see serve()); connections must not be.
+        request.setblocking(True)
+        return request, client_address
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        """Stops accepting and finishes the requests already being handled."""
+        super().server_close()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+
+
+def _run_worker(create_app, sock, threads, runtime_dir, worker_index):
+    logging_pipeline.setup_logging()
+    app = create_app(runtime_dir, worker_index)
+    server = PooledWSGIServer(sock, app, threads)
+
+    def stop(signum, frame):
+        # shutdown() waits for serve_forever() to return, so it cannot run on this thread.
+        threading.Thread(target=server.shutdown).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logger.info("Worker %s serving on %s:%s", os.getpid(), *sock.getsockname()[:2])
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        registry = app.extensions.get("node_registry")
+        if registry is not None:
+            registry.shutdown()
+    logger.info("Worker %s stopped.", os.getpid())
+
+
+def serve(create_app, host, port, workers=2, threads=16, graceful_timeout=30):
+    """Serves the app from `workers` forked processes sharing one listening socket.
+
+    The app is built in each worker, after the fork, by create_app(runtime_dir, worker_index): a
+    process that already runs threads (chain event follower, job timers) must not be forked.
+    `runtime_dir` is a directory the workers of this server share (locks, sockets, job states).
+    `worker_index`, from 0 to workers - 1, is unique among the running workers, so a worker can
+    own per-worker resources such as the account it sends transactions from. A worker that dies
+    is started again with its index. SIGTERM or SIGINT stop the workers gracefully: they finish
+    the requests they are handling, and are killed after `graceful_timeout` seconds.
+
+    :param create_app: create_app(runtime_dir, worker_index) -> Flask app; a NodeRegistry found in
+                       app.extensions["node_registry"] is shut down with its worker.
+    :param host: Address to listen on.
+    :param port: Port to listen on.
+    :param workers: Worker processes.
+    :param threads: Request threads per worker.
+    :param graceful_timeout: Seconds the workers get to finish before being killed.
+    """
+    logging_pipeline.setup_logging()
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, int(port)))
+    sock.listen(1024)
+    # Every worker waits on the socket; those that lose the race for a connection must not block in accept().
+    sock.setblocking(False)
+    sock.set_inheritable(True)
+    runtime_dir = tempfile.mkdtemp(prefix="node-registry-")
+
+    stopping = threading.Event()
+
+    def stop(signum, frame):
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    def spawn(worker_index):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                _run_worker(create_app, sock, threads, runtime_dir, worker_index)
+            except BaseException as e:
+                logger.exception("Worker %s failed: %s", os.getpid(), e)
+                code = 1
+            finally:
+                logging_pipeline.stop_logging()
+                os._exit(code)
+        return pid
+
+    logger.info("Starting %d workers with %d threads each on %s:%s", workers, threads, host, port)
+    # pid -> (worker index, start time)
+    children = {spawn(index): (index, time.monotonic()) for index in range(workers)}
+    try:
+        while not stopping.is_set():
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                pid = 0
+            if pid in children:
+                index, started = children.pop(pid)
+                logger.warning("Worker %s exited with status %s. Starting a new one.", pid, status)
+                # A worker that crashes right after start-up is not restarted in a tight loop.
+                if time.monotonic() - started < 1:
+                    stopping.wait(1)
+                if not stopping.is_set():
+                    children[spawn(index)] = (index, time.monotonic())
+                continue
+            stopping.wait(0.5)
+    finally:
+        logger.info("Stopping workers.")
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + graceful_timeout
+        while children and time.monotonic() < deadline:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+            if pid in children:
+                children.pop(pid)
+            else:
+                time.sleep(0.1)
+        for pid in children:
+            logger.warning("Worker %s did not stop in %ss. Killing it.", pid, graceful_timeout)
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+        sock.close()
+        shutil.rmtree(runtime_dir, ignore_errors=True)
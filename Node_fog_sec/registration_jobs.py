@@ -0,0 +1,228 @@
+import heapq
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+
+logger = logging.getLogger(__name__)
+
+
+VERIFYING = "verifying"
+ON_CHAIN = "on-chain"
+ACKED = "acked"
+PEERED = "peered"
+VALIDATOR = "validator"
+COMPLETED = "completed"
+FAILED = "failed"
+TERMINAL_STATES = (VALIDATOR, COMPLETED, FAILED)
+
+# Fields a registration request must carry (node_url may be empty for sensors and actuators).
+REQUIRED_FIELDS = ("node_id", "node_name", "node_type", "public_key", "address", "node_url", "rpcURL", "signature")
+
+
+class RegistrationJobs:
+    """Runs node registrations as background jobs so /register-node can answer at once.
+
+    A job is a small state machine (verifying -> on-chain -> acked -> peered -> validator, or
+    completed/failed). Its `step` function performs the work of the current state and returns
+    the number of seconds after which it wants to run again, or None once the job is finished.
+    Waiting states therefore hold no thread: they are re-run by a timer, on a bounded pool.
+
+    Jobs run in the process that accepted them. With `store_dir`, shared by the workers of a
+    prefork server, every state change is also written there, so any worker can answer
+    GET /register-node/<job_id>.
+    """
+
+    def __init__(self, step, max_workers=8, retention=3600, max_jobs=10000, store_dir=None):
+        """
+        :param step: step(job) -> seconds until the next step, or None when the job is finished.
+        :param max_workers: Jobs whose step runs at the same time.
+        :param retention: Seconds a finished job stays queryable.
+        :param max_jobs: Finished jobs beyond this number are dropped oldest first.
+        :param store_dir: Directory where job states are published for other processes, or None.
+        """
+        self.step = step
+        self.store_dir = store_dir
+        if store_dir:
+            os.makedirs(store_dir, exist_ok=True)
+        self.retention = retention
+        self.max_jobs = max_jobs
+        self.jobs = OrderedDict()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="registration")
+        self._timers = []
+        self._sequence = itertools.count()
+        self._changed = threading.Condition()
+        timer_thread = threading.Thread(target=self._run_timers)
+        timer_thread.daemon = True
+        timer_thread.start()
+
+    # ----------------------------------JOBS----------------------------------
+
+    def submit(self, data, callback_url=None, state=VERIFYING, context=None):
+        """Creates a job for a registration request and schedules its first step.
+
+        :param state: State to start in, e.g. ON_CHAIN for a node a bulk registration already put on chain.
+        :param context: Working data of the step function carried over from earlier states.
+        """
+        now = time.time()
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "state": state,
+            "status": "pending",
+            "message": "Registration accepted.",
+            "http_status": 202,
+            "node_id": data.get("node_id"),
+            "node_name": data.get("node_name"),
+            "node_type": data.get("node_type"),
+            "created_at": now,
+            "updated_at": now,
+            "history": [{"state": state, "at": now}],
+            "request": data,
+            "context": dict(context or {}),
+            "callback_url": callback_url,
+            "deadline": None
+        }
+        with self._changed:
+            self.jobs[job["job_id"]] = job
+            self._expire()
+            self._store(job)
+        self._schedule(job, 0)
+        return job
+
+    def get(self, job_id):
+        with self._changed:
+            job = self.jobs.get(job_id)
+        return job if job is not None else self._load(job_id)
+
+    def wait(self, job_id, timeout):
+        """Long-poll: returns the job once it is finished or has moved to another state, or after `timeout` seconds."""
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            job = self.jobs.get(job_id)
+        if job is None:
+            return self._wait_stored(job_id, deadline)
+
+        with self._changed:
+            state = job["state"]
+            while job["state"] == state and job["state"] not in TERMINAL_STATES:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._changed.wait(remaining)
+            return job
+
+    def set_state(self, job, state, message=None, timeout=None):
+        """Moves a job to `state`; `timeout` sets how long the job may stay there."""
+        with self._changed:
+            now = time.time()
+            job["state"] = state
+            job["updated_at"] = now
+            job["history"].append({"state": state, "at": now})
+            job["deadline"] = time.monotonic() + timeout if timeout is not None else None
+            if message is not None:
+                job["message"] = message
+            self._store(job)
+            self._changed.notify_all()
+
+    def finish(self, job, state, http_status, message):
+        """Ends a job as VALIDATOR/COMPLETED (success) or FAILED (error)."""
+        job["status"] = "error" if state == FAILED else "success"
+        job["http_status"] = http_status
+        self.set_state(job, state, message)
+        if job["callback_url"]:
+            try:
+                requests.post(job["callback_url"], json=self.public(job), timeout=10)
+            except requests.RequestException as e:
+                logger.warning("Registration callback to %s failed: %s", job["callback_url"], e)
+
+    @staticmethod
+    def timed_out(job):
+        return job["deadline"] is not None and time.monotonic() > job["deadline"]
+
+    @staticmethod
+    def public(job):
+        """The job as shown to clients, without the raw request and the step's working data."""
+        return {key: value for key, value in job.items() if key not in ("request", "context", "deadline", "callback_url")}
+
+    def _expire(self):
+        cutoff = time.time() - self.retention
+        finished = [job_id for job_id, job in self.jobs.items() if job["state"] in TERMINAL_STATES]
+        excess = len(self.jobs) - self.max_jobs
+        for job_id in finished:
+            if self.jobs[job_id]["updated_at"] < cutoff or excess > 0:
+                del self.jobs[job_id]
+                excess -= 1
+                if self.store_dir:
+                    try:
+                        os.unlink(self._path(job_id))
+                    except FileNotFoundError:
+                        pass
+
+    # ----------------------------------SHARED STORE----------------------------------
+
+    def _path(self, job_id):
+        # Job ids are hex uuids; anything else is not a job of ours.
+        if not job_id.isalnum():
+            return None
+        return os.path.join(self.store_dir, f"{job_id}.json")
+
+    def _store(self, job):
+        if not self.store_dir:
+            return
+        path = self._path(job["job_id"])
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as job_file:
+            json.dump(self.public(job), job_file)
+        os.replace(temp_path, path)
+
+    def _load(self, job_id):
+        if not self.store_dir or self._path(job_id) is None:
+            return None
+        try:
+            with open(self._path(job_id), "r") as job_file:
+                return json.load(job_file)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _wait_stored(self, job_id, deadline, poll_interval=0.25):
+        """wait() for a job run by another process: polls its published state."""
+        job = self._load(job_id)
+        if job is None:
+            return None
+        state = job["state"]
+        while job["state"] == state and job["state"] not in TERMINAL_STATES and time.monotonic() < deadline:
+            time.sleep(min(poll_interval, max(0, deadline - time.monotonic())))
+            job = self._load(job_id) or job
+        return job
+
+    # ----------------------------------SCHEDULING----------------------------------
+
+    def _schedule(self, job, delay):
+        with self._changed:
+            heapq.heappush(self._timers, (time.monotonic() + delay, next(self._sequence), job))
+            self._changed.notify_all()
+
+    def _run_timers(self):
+        while True:
+            with self._changed:
+                while not self._timers or self._timers[0][0] > time.monotonic():
+                    self._changed.wait(self._timers[0][0] - time.monotonic() if self._timers else None)
+                _, _, job = heapq.heappop(self._timers)
+            self._executor.submit(self._run_step, job)
+
+    def _run_step(self, job):
+        try:
+            delay = self.step(job)
+        except Exception as e:
+            logger.exception("Registration job %s failed: %s", job["job_id"], e)
+            self.finish(job, FAILED, 500, f"Exception occurred: {str(e)}")
+            return
+        if delay is not None and job["state"] not in TERMINAL_STATES:
+            self._schedule(job, delay)
@@ -0,0 +1,150 @@
+import json
+import logging
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from eth_keys import keys
+from eth_utils import keccak
+
+
+logger = logging.getLogger(__name__)
+
+
+def verify_identity(data):
+    """Checks a node's identity signature against its public key.
+
+    The signed message is the canonical JSON of node_id, node_name, node_type and public_key.
+    Module level so that worker processes can run it.
+    """
+    try:
+        signature_hex = data.get("signature")
+        public_key_hex = data.get("public_key")
+
+        message_dict = {
+            "node_id": data.get("node_id"),
+            "node_name": data.get("node_name"),
+            "node_type": data.get("node_type"),
+            "public_key": public_key_hex
+        }
+
+        message_json = json.dumps(message_dict, sort_keys=True)
+        message_hash = keccak(text=message_json)
+
+        if public_key_hex.startswith("0x"):
+            public_key_hex = public_key_hex[2:]
+        if signature_hex.startswith("0x"):
+            signature_hex = signature_hex[2:]
+
+        public_key = keys.PublicKey(bytes.fromhex(public_key_hex))
+        signature = keys.Signature(bytes.fromhex(signature_hex))
+
+        return public_key.verify_msg_hash(message_hash, signature)
+
+    except Exception as e:
+        logger.info("Signature verification failed: %s", e)
+        return False
+
+
+class SignatureVerifier:
+    """Verifies node identity signatures with an LRU memo and a pool of worker processes.
+
+    A node's identity signature never changes, so the outcome for a given (message, signature,
+    public key) is remembered; a node registering again, or listed in several bulk requests,
+    is not verified twice. The misses of a batch (/register-nodes) run in worker processes:
+    secp256k1 verification in the pure-Python eth_keys backend holds the GIL for milliseconds,
+    which would otherwise stall every other request of the server during a registration burst.
+    A single miss is verified in the calling thread, since handing it to a spawned worker costs
+    more than verifying it.
+    """
+
+    def __init__(self, max_entries=10000, processes=None):
+        """
+        :param max_entries: Verification outcomes kept, least recently used dropped first.
+        :param processes: Worker processes; None uses one per CPU, 0 verifies in the calling thread.
+        """
+        self.max_entries = max_entries
+        self.processes = (os.cpu_count() or 1) if processes is None else processes
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(data):
+        return (data.get("node_id"), data.get("node_name"), data.get("node_type"), data.get("public_key"), data.get("signature"))
+
+    def verify(self, data):
+        return self.verify_many([data])[0]
+
+    def verify_many(self, nodes):
+        """Returns True/False per node, verifying the ones not seen before in parallel."""
+        results = [None] * len(nodes)
+        missing = {}
+        with self._lock:
+            for index, data in enumerate(nodes):
+                key = self._key(data)
+                if key in self._results:
+                    self._results.move_to_end(key)
+                    results[index] = self._results[key]
+                    self.hits += 1
+                else:
+                    missing.setdefault(key, []).append(index)
+                    self.misses += 1
+
+        if missing:
+            keys_ = list(missing)
+            verified = self._run([nodes[missing[key][0]] for key in keys_])
+            with self._lock:
+                for key, is_valid in zip(keys_, verified):
+                    for index in missing[key]:
+                        results[index] = is_valid
+                    self._results[key] = is_valid
+                    self._results.move_to_end(key)
+                while len(self._results) > self.max_entries:
+                    self._results.popitem(last=False)
+        return results
+
+    def _run(self, nodes):
+        if self.processes <= 0 or len(nodes) == 1:
+            return [verify_identity(data) for data in nodes]
+        chunk_size = max(1, len(nodes) // (self.processes * 4))
+        try:
+            return list(self._executor().map(verify_identity, nodes, chunksize=chunk_size))
+        except BrokenProcessPool:
+            # E.g. the main module cannot be re-imported by spawned workers.
+            logger.error("Signature verification workers died. Verifying in the server process from now on.")
+            with self._lock:
+                self._pool = None
+                self.processes = 0
+            return [verify_identity(data) for data in nodes]
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                # spawn: forking a process that runs server threads can copy held locks.
+                self._pool = ProcessPoolExecutor(max_workers=self.processes, mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            # Wait for the workers to take their stop sentinels: when this process exits right after,
+            # multiprocessing's exit handler can close the call queue before they are sent, and a
+            # multiprocessing parent would then wait for the workers forever.
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+                "entries": len(self._results),
+                "processes": self.processes
+            }
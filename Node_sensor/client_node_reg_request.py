@@ -8,6 +8,7 @@ import time
 import json  # <-- Added for signing
 from eth_keys import keys  # <-- Added for signing
 from eth_utils import keccak
+from node_identity import write_node_details
 
 class Node:
     def __init__(self, node_id, node_name, node_type, registration_url, key_path, node_url, rpc_url):
@@ -51,20 +52,36 @@ class Node:
             "node_type": self.node_type,
             "public_key": self.public_key
         }
-        message_json = json.dumps(message_dict, sort_keys=True)
-        message_hash = keccak(text=message_json)
-
-        with open(self.private_key, "r") as f:
-            private_key_hex = f.read().strip()
-
-        if private_key_hex.startswith("0x"):
-            private_key_hex = private_key_hex[2:]
-
-        private_key = keys.PrivateKey(bytes.fromhex(private_key_hex))
-        signature = private_key.sign_msg_hash(message_hash)
-        return signature.to_hex()
+        return sign_message(message_dict, load_private_key(self.private_key))
     
     
+    def wait_for_registration(self, response, timeout=600):
+        """
+        Follows an accepted (202) registration job until it finishes; returns (status_code, body).
+        :param timeout: Seconds to wait for the job in total before giving up with a 504.
+        """
+        if response.status_code != 202:
+            return response.status_code, response.json()
+
+        job = response.json()
+        status_url = f"{self.registration_url}{job['status_url']}"
+        print(f"Registration accepted (job {job['job_id']}). Waiting for it to finish...")
+        deadline = time.monotonic() + timeout
+        state = None
+        while time.monotonic() < deadline:
+            wait = max(1, min(30, int(deadline - time.monotonic())))
+            response = requests.get(status_url, params={"wait": wait}, timeout=wait + 30)
+            job = response.json()
+            if response.status_code != 200:
+                # The job is unknown (404) or the status request failed: no state to follow.
+                return response.status_code, job
+            if job.get("state") != state:
+                state = job.get("state")
+                print(f"Registration state: {state} - {job.get('message')}")
+            if job.get("status") != "pending":
+                return job.get("http_status", response.status_code), job
+        return 504, {"status": "error", "message": f"Registration job did not finish within {timeout} seconds; its state is {state}."}
+
     def register_node(self):
 
         data = {
@@ -79,16 +96,16 @@ class Node:
         }
 
         response = requests.post(f"{self.registration_url}/register-node", json=data)
-        if response.status_code == 200:
+        status_code, result = self.wait_for_registration(response)
+        if status_code == 200:
             print(f"{self.node_type.capitalize()} Node {self.node_id} Registered Successfully as '{self.node_name}'!")
             print(f"Public Key Sent: {self.public_key}")
             print(f"Node Address: {self.address}")
-            with open("node-details.json", "w") as json_file:
-                json.dump(data, json_file, indent=4)
-            print(response.json())
+            write_node_details("node-details.json", data)
+            print(result)
         else:
 
-            print(f"\nError Registering {self.node_type.capitalize()} \nNode {self.node_id}: {response.json()}")
+            print(f"\nError Registering {self.node_type.capitalize()} \nNode {self.node_id}: {result}")
 
     def read_data(self):
 
@@ -118,6 +135,7 @@ class Node:
             return None
         
     def transmit_data(self):
+        """Transmit data to the Registering Node; it is checked as a WRITE, the permission the contract grants sensors."""
         data = {
             "node_id": self.node_id,
             "node_name": self.node_name,
@@ -126,7 +144,6 @@ class Node:
             "address": self.address,
             "signature": self.sign_identity()
         }
-        """Transmit data to the Cloud Node."""
         response = requests.post(f"{self.registration_url}/transmit", params=data)
 
         try:
@@ -168,6 +185,11 @@ class Node:
             return None
         
     def execute_command(self):
+        """Execute a command on the Registering Node.
+
+        No policy of the deployed contract grants EXECUTE, so the node answers 400 without a
+        chain lookup until one does.
+        """
         data = {
             "node_id": self.node_id,
             "node_name": self.node_name,
@@ -176,13 +198,15 @@ class Node:
             "address": self.address,
             "signature": self.sign_identity()
         }
-        """Execute a command on the Registering Node."""
         response = requests.post(f"{self.registration_url}/execute", params=data)
 
         try:
             if response.status_code == 200:
                 print("Data:", response.json())
                 return response.json()
+            elif response.status_code == 400:
+                print(f"Execute is not supported by the Registering Node: {response.json().get('message')}")
+                return None
             else:
                 print(f"Error Executing Command (Status {response.status_code}): {response.text}")
                 return None
@@ -193,6 +217,59 @@ class Node:
             return None
         
 
+def load_private_key(private_key_path):
+    with open(private_key_path, "r") as f:
+        private_key_hex = f.read().strip()
+
+    if private_key_hex.startswith("0x"):
+        private_key_hex = private_key_hex[2:]
+
+    return keys.PrivateKey(bytes.fromhex(private_key_hex))
+
+
+def sign_message(message_dict, private_key):
+    message_json = json.dumps(message_dict, sort_keys=True)
+    message_hash = keccak(text=message_json)
+    return private_key.sign_msg_hash(message_hash).to_hex()
+
+
+def register_nodes(registration_url, nodes_file):
+    """Registers every node listed in `nodes_file` with one /register-nodes request.
+
+    nodes_file is a JSON list of {"node_id", "node_name", "node_type", "private_key_path",
+    "node_url", "rpc_url"}. Each identity is signed with the node's own private key; the public
+    key and address are derived from it (as besu public-key export does).
+    """
+    with open(nodes_file, "r") as json_file:
+        entries = json.load(json_file)
+
+    nodes = []
+    for entry in entries:
+        private_key = load_private_key(entry["private_key_path"])
+        data = {
+            "node_id": entry["node_id"],
+            "node_name": entry["node_name"],
+            "node_type": entry["node_type"],
+            "public_key": private_key.public_key.to_hex()
+        }
+        data["signature"] = sign_message(data, private_key)
+        data["address"] = private_key.public_key.to_address()
+        data["node_url"] = entry.get("node_url", "")
+        data["rpcURL"] = entry.get("rpc_url", "")
+        nodes.append(data)
+
+    response = requests.post(f"{registration_url}/register-nodes", json={"nodes": nodes})
+    if response.status_code != 200:
+        print(f"\nError Registering Nodes: {response.json()}")
+        return None
+
+    result = response.json()
+    for node_result in result["results"]:
+        print(f"{node_result['node_id']}: {node_result['status']} ({node_result['http_status']}) - {node_result['message']}")
+    print(f"\n{result['registered']} of {len(nodes)} nodes registered on the blockchain. Follow-up jobs: /register-node/<job_id>")
+    return result
+
+
 if __name__ == "__main__":
     if len(sys.argv) > 1:
         command = sys.argv[1]
@@ -207,6 +284,14 @@ if __name__ == "__main__":
                         # "$node_id" "$node_name" "$node_type" "$root_url" "$key_path" "$NODE_URL" "$rpc_url"
             node.register_node()
 
+        elif command == "register-batch":
+            if len(sys.argv) != 4:
+                print("Usage: python client_node_reg_request.py register-batch <registration_url> <nodes_file>")
+                sys.exit(1)
+
+            registration_url, nodes_file = sys.argv[2:]
+            register_nodes(registration_url, nodes_file)
+
         elif command == "read":
             if len(sys.argv) != 7:
                 print("Usage: python client_node_reg_request.py read <node_id>, <node_name>, <node_type>, <registration_url>, <key_path>")
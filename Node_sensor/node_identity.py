@@ -0,0 +1,13 @@
+import json
+import os
+
+
+def write_node_details(path, data):
+    """Writes node-details.json atomically: readers see the old file or the new one, never a mix."""
+    directory = os.path.dirname(os.path.abspath(path))
+    temp_path = os.path.join(directory, f".{os.path.basename(path)}.{os.getpid()}.tmp")
+    with open(temp_path, "w") as json_file:
+        json.dump(data, json_file, indent=4)
+        json_file.flush()
+        os.fsync(json_file.fileno())
+    os.replace(temp_path, path)
@@ -0,0 +1,51 @@
+"""Fixtures for the tests that drive the registry of Node_cloud on a StubChain."""
+import json
+import os
+import sys
+import pytest
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TEST_DIR)
+CLOUD_DIR = os.path.join(REPO_DIR, "Node_cloud")
+sys.path.insert(0, TEST_DIR)
+sys.path.insert(0, CLOUD_DIR)
+
+
+def node(index, node_type):
+    """registerNode arguments of a test node."""
+    return (f"N-{index}", f"node-{index}", node_type, f"0xpub{index}", "0x" + f"{index + 1:040x}",
+            f"http://10.0.0.{index}:8545", "Cloud", f"0xsig{index}")
+
+
+@pytest.fixture
+def chain():
+    from stub_chain import StubChain
+    return StubChain()
+
+
+@pytest.fixture
+def registry(chain, monkeypatch):
+    """The root NodeRegistry, registered on `chain`; the tests poll its event follower themselves."""
+    pytest.importorskip("flask")
+    from root_node_registration import NodeRegistry
+
+    monkeypatch.setattr(NodeRegistry, "start_background_tasks", lambda self: None)
+    registry = NodeRegistry("http://127.0.0.1:9", chain_backend=chain)
+    with open(os.path.join(CLOUD_DIR, "node-details.json"), "r") as details_file:
+        details = json.load(details_file)
+    chain.register_node(details["node_id"], details["node_name"], details["node_type"], details["public_key"],
+                        details["address"], details["rpcURL"], details["node_type"], details["signature"])
+    registry.chain_events.poll()
+    try:
+        yield registry
+    finally:
+        registry.shutdown()
+
+
+@pytest.fixture
+def register(chain):
+    """register(index, node_type) puts a test node on `chain` and returns its signature."""
+    def register(index, node_type):
+        chain.register_node(*node(index, node_type))
+        return f"0xsig{index}"
+    return register
@@ -0,0 +1,171 @@
+"""Gas used by the NodeRegistry contract versions, measured in py-evm (eth-tester).
+
+Each contract is deployed on a fresh chain and driven through the same scenario: node
+registrations with real 64-byte public keys and 65-byte signatures (hex strings, or bytes
+where the ABI takes bytes), capability tokens issued, revoked and reissued, and the views the
+registry reads. Prints the gas used per operation as JSON:
+
+    python test/contract_gas.py                     # the deployed artifact, plus every
+                                                    # Smart_contracts/*.sol solc can compile
+    python test/contract_gas.py --solc-version 0.8.0 --install-solc
+    python test/contract_gas.py --artifact other/NodeRegistry.json --source Smart_contracts/v3_NodeRegistry.sol
+
+Sources are compiled with py-solc-x, with the compiler version of truffle-config.js by default;
+without a solc binary only the artifacts are measured. Views are measured with eth_estimateGas.
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import warnings
+from eth_abi import encode
+from eth_utils import keccak, to_checksum_address
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TEST_DIR)
+sys.path.insert(0, TEST_DIR)
+
+from load_test import make_identity
+
+DEFAULT_ARTIFACT = os.path.join(REPO_DIR, "Node_cloud", "data", "NodeRegistry.json")
+DEFAULT_SOURCES = sorted(glob.glob(os.path.join(REPO_DIR, "Smart_contracts", "*.sol")))
+NODE_TYPES = ("Cloud", "Fog", "Edge", "Sensor", "Actuator")
+
+
+class Contract:
+    """A deployed contract version, called by function name with arguments bound by parameter name."""
+
+    def __init__(self, tester, abi, bytecode):
+        self.tester = tester
+        self.sender = tester.get_accounts()[0]
+        self.functions = {entry["name"]: entry for entry in abi if entry["type"] == "function"}
+        tx_hash = tester.send_transaction({"from": self.sender, "data": bytecode, "gas": 10000000})
+        receipt = tester.get_transaction_receipt(tx_hash)
+        self.address = receipt["contract_address"]
+        self.deployment_gas = receipt["gas_used"]
+
+    def has(self, name):
+        return name in self.functions
+
+    def calldata(self, name, **values):
+        entry = self.functions[name]
+        types = [param["type"] for param in entry["inputs"]]
+        args = []
+        for param in entry["inputs"]:
+            value = values[param["name"]]
+            if param["type"] == "bytes" and isinstance(value, str):
+                value = bytes.fromhex(value[2:])
+            args.append(value)
+        selector = keccak(text=f"{name}({','.join(types)})")[:4]
+        return "0x" + (selector + encode(types, args)).hex()
+
+    def transact(self, name, **values):
+        """Sends a transaction; returns its gas used, or None if it reverted."""
+        tx_hash = self.tester.send_transaction({"from": self.sender, "to": self.address, "data": self.calldata(name, **values), "gas": 5000000})
+        receipt = self.tester.get_transaction_receipt(tx_hash)
+        return receipt["gas_used"] if receipt["status"] else None
+
+    def view_gas(self, name, **values):
+        return self.tester.estimate_gas({"from": self.sender, "to": self.address, "data": self.calldata(name, **values)})
+
+
+def summary(values):
+    values = [value for value in values if value is not None]
+    if not values:
+        return None
+    return {"count": len(values), "mean": round(statistics.mean(values)), "min": min(values), "max": max(values)}
+
+
+def measure(abi, bytecode, nodes):
+    """Runs the scenario on a fresh chain; returns gas per operation."""
+    import eth_tester
+    warnings.filterwarnings("ignore", module="eth_tester")
+    tester = eth_tester.EthereumTester(eth_tester.PyEVMBackend())
+    contract = Contract(tester, abi, bytecode)
+    cloud = make_identity(0, "Cloud", "gas")
+    identities = [cloud] + [make_identity(index, NODE_TYPES[1 + index % 4], "gas") for index in range(1, nodes)]
+
+    def node_values(identity):
+        return {
+            "nodeId": identity["node_id"],
+            "nodeName": identity["node_name"],
+            "nodeTypeStr": identity["node_type"],
+            "publicKey": identity["public_key"],
+            "registeredBy": to_checksum_address(identity["address"]),
+            "rpcURL": f"http://10.0.{identity['node_id'][-2:]}.1:8545",
+            "registeredByNodeTypeStr": "Cloud",
+            "nodeSignature": identity["signature"]
+        }
+
+    results = {"deployment": contract.deployment_gas}
+    results["registerNode"] = summary([contract.transact("registerNode", **node_values(identity)) for identity in identities])
+    first = node_values(identities[1])
+    results["isNodeRegistered"] = contract.view_gas("isNodeRegistered", nodeSignature=first["nodeSignature"])
+    results["getNodeDetailsBySignature"] = contract.view_gas("getNodeDetailsBySignature", nodeSignature=first["nodeSignature"])
+    if contract.has("getNodeDetailsByAddress"):
+        results["getNodeDetailsByAddress"] = contract.view_gas("getNodeDetailsByAddress", nodeAddress=first["registeredBy"])
+    results["isValidator"] = contract.view_gas("isValidator", nodeSignature=cloud["signature"])
+
+    if contract.has("issueToken"):
+        pairs = [{"fromNodeSignature": identity["signature"], "toNodeSignature": cloud["signature"]} for identity in identities[1:]]
+        results["issueToken"] = summary([contract.transact("issueToken", **pair) for pair in pairs])
+        results["getToken"] = contract.view_gas("getToken", **pairs[0])
+        if contract.has("checkToken"):
+            results["checkToken"] = contract.view_gas("checkToken", **pairs[0])
+        results["isTokenExpired"] = contract.view_gas("isTokenExpired", validityPeriodInSeconds=3600, **pairs[0])
+        results["revokeToken"] = summary([contract.transact("revokeToken", **pair) for pair in pairs])
+        results["issueToken:after-revoke"] = summary([contract.transact("issueToken", **pair) for pair in pairs])
+    return results
+
+
+def compile_source(path, solc_version):
+    import solcx
+    with open(path, "r") as source_file:
+        source = source_file.read()
+    compiled = solcx.compile_source(source, output_values=["abi", "bin"], solc_version=solc_version)
+    contract = next(value for key, value in compiled.items() if key.endswith(":NodeRegistry"))
+    return contract["abi"], "0x" + contract["bin"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gas used by the NodeRegistry contract versions, measured in py-evm.")
+    parser.add_argument("--artifact", action="append", help="Truffle artifact measured as built (default the deployed one; repeatable).")
+    parser.add_argument("--source", action="append", help="Solidity source compiled and measured (default Smart_contracts/*.sol; repeatable).")
+    parser.add_argument("--solc-version", default="0.8.0", help="solc version used by py-solc-x (default 0.8.0, as truffle-config.js).")
+    parser.add_argument("--install-solc", action="store_true", help="Download that solc version if it is not installed.")
+    parser.add_argument("--nodes", type=int, default=20, help="Nodes registered (and tokens issued) per contract (default 20).")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout.")
+    args = parser.parse_args()
+
+    report = {"nodes": args.nodes, "solc_version": args.solc_version, "contracts": {}, "skipped": {}}
+    for path in args.artifact or [DEFAULT_ARTIFACT]:
+        with open(path, "r") as artifact_file:
+            artifact = json.load(artifact_file)
+        name = f"artifact:{os.path.relpath(path, REPO_DIR)}"
+        report["contracts"][name] = measure(artifact["abi"], artifact["bytecode"], args.nodes)
+
+    for path in args.source or DEFAULT_SOURCES:
+        name = os.path.relpath(path, REPO_DIR)
+        try:
+            if args.install_solc:
+                import solcx
+                solcx.install_solc(args.solc_version)
+            abi, bytecode = compile_source(path, args.solc_version)
+        except Exception as e:
+            report["skipped"][name] = f"{type(e).__name__}: {e}"
+            print(f"Skipping {name}: {type(e).__name__}: {e}", file=sys.stderr)
+            continue
+        report["contracts"][name] = measure(abi, bytecode, args.nodes)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
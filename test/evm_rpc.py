@@ -0,0 +1,235 @@
+"""Besu's JSON-RPC methods answered by py-evm (eth-tester) running the compiled NodeRegistry.
+
+Where test/node_registry_emulator.py re-implements the contract in Python, this serves the
+bytecode of a Truffle artifact, so ChainGateway can be checked against what the deployed
+contract actually returns:
+
+    rpc = EvmRPC(ARTIFACT, tmp_dir)
+    server = rpc.serve(port=0)
+    gateway = ChainGateway(f"http://127.0.0.1:{server.server_address[1]}", rpc.artifact_path, keys_file)
+
+The chain runs the Berlin rules, so transactions with a gas price of 0 are accepted as on the
+free-gas Besu network. Every transaction is mined at once in its own block, and receipts of
+reverted transactions carry the revert reason, as Besu with --revert-reason-enabled.
+"""
+import ast
+import json
+import os
+import threading
+import warnings
+from eth_abi import encode
+from eth_tester import EthereumTester, PyEVMBackend
+from eth_tester.exceptions import BlockNotFound, TransactionFailed, TransactionNotFound, ValidationError
+from eth.vm.forks import BerlinVM
+from hexbytes import HexBytes
+
+from node_registry_emulator import ERROR_SELECTOR, ZERO_ADDRESS, ChainRejected, EmulatorRPC, Revert, _hex
+
+
+def revert_data(error):
+    """Revert payload of a TransactionFailed: eth-tester gives the reason of an Error(string), the repr of anything else."""
+    message = str(error.args[0]) if error.args else ""
+    if message.startswith("b'") or message.startswith('b"'):
+        return ast.literal_eval(message)
+    return ERROR_SELECTOR + encode(["string"], [message])
+
+
+class EvmRPC(EmulatorRPC):
+    """EmulatorRPC's methods, answered from an EthereumTester with the artifact's contract deployed."""
+
+    def __init__(self, artifact_path, directory):
+        """
+        :param artifact_path: Truffle artifact whose bytecode is deployed.
+        :param directory: Where the copy of the artifact naming the deployed address is written.
+        """
+        warnings.filterwarnings("ignore", module="eth_tester")
+        with open(artifact_path, "r") as artifact_file:
+            artifact = json.load(artifact_file)
+        self.tester = EthereumTester(PyEVMBackend(vm_configuration=((0, BerlinVM),)))
+        deployer = self.tester.get_accounts()[0]
+        tx_hash = self.tester.send_transaction({"from": deployer, "data": artifact["bytecode"], "gas": 6000000, "gas_price": 0})
+        self.contract_address = self.tester.get_transaction_receipt(tx_hash)["contract_address"]
+        network_id = next(iter(artifact["networks"]), "1337")
+        artifact["networks"] = {network_id: {"address": self.contract_address}}
+        self.artifact_path = os.path.join(directory, "NodeRegistry.json")
+        with open(self.artifact_path, "w") as artifact_file:
+            json.dump(artifact, artifact_file)
+        self.lock = threading.RLock()
+        self.revert_reasons = {}
+        self.enode = "enode://" + "00" * 64 + "@127.0.0.1:30303"
+
+    def handle(self, payload):
+        # eth-tester is not thread safe; a batch is answered at one block as well.
+        with self.lock:
+            if isinstance(payload, list):
+                return [self._answer(request) for request in payload]
+            return self._answer(payload)
+
+    def _answer(self, request):
+        try:
+            return super()._answer(request)
+        except ValidationError as e:
+            return {"jsonrpc": "2.0", "id": request.get("id"), "error": {"code": -32000, "message": str(e)}}
+
+    @staticmethod
+    def _tag(tag):
+        if tag in ("latest", "pending", "safe", "finalized"):
+            return "latest"
+        return int(tag, 16) if isinstance(tag, str) and tag.startswith("0x") else tag
+
+    # Formatting.
+
+    def _block(self, block, full=False):
+        return {
+            "number": hex(block["number"]),
+            "hash": block["hash"],
+            "parentHash": block["parent_hash"],
+            "timestamp": hex(block["timestamp"]),
+            "gasLimit": hex(block["gas_limit"]),
+            "gasUsed": hex(block["gas_used"]),
+            "transactions": list(block["transactions"]),
+        }
+
+    def _log(self, log):
+        return {
+            "address": log["address"],
+            "topics": list(log["topics"]),
+            "data": log["data"],
+            "blockNumber": hex(log["block_number"]),
+            "blockHash": log["block_hash"],
+            "transactionHash": log["transaction_hash"],
+            "transactionIndex": hex(log["transaction_index"]),
+            "logIndex": hex(log["log_index"]),
+            "removed": False
+        }
+
+    # Methods.
+
+    def rpc_web3_clientVersion(self):
+        return "EvmRPC/v1/py-evm"
+
+    def rpc_net_version(self):
+        return str(self.tester.backend.chain.chain_id)
+
+    def rpc_net_peerCount(self):
+        return "0x0"
+
+    def rpc_eth_chainId(self):
+        return hex(self.tester.backend.chain.chain_id)
+
+    def rpc_eth_blockNumber(self):
+        return hex(self.tester.get_block_by_number("latest")["number"])
+
+    def rpc_eth_getBlockByNumber(self, tag, full=False):
+        try:
+            return self._block(self.tester.get_block_by_number(self._tag(tag)), full)
+        except BlockNotFound:
+            return None
+
+    def rpc_eth_getBlockByHash(self, block_hash, full=False):
+        try:
+            return self._block(self.tester.get_block_by_hash(block_hash), full)
+        except BlockNotFound:
+            return None
+
+    def rpc_eth_getBalance(self, address, tag="latest"):
+        return hex(self.tester.get_balance(address, self._tag(tag)))
+
+    def rpc_eth_getCode(self, address, tag="latest"):
+        return self.tester.get_code(address, self._tag(tag))
+
+    def rpc_eth_getTransactionCount(self, address, tag="latest"):
+        return hex(self.tester.get_nonce(address, self._tag(tag)))
+
+    def rpc_eth_call(self, transaction, tag="latest"):
+        # eth-tester builds an EIP-1559 call unless it is given a gas price, which Berlin has no rules for.
+        call = {"from": transaction.get("from") or ZERO_ADDRESS, "to": transaction["to"],
+                "data": transaction.get("data") or transaction.get("input") or "0x", "gas_price": 0}
+        try:
+            return self.tester.call(call, self._tag(tag))
+        except TransactionFailed as e:
+            raise Revert(data=revert_data(e))
+
+    def rpc_eth_estimateGas(self, transaction, tag="latest"):
+        self.rpc_eth_call(transaction, tag)  # A call that would revert is refused.
+        return hex(1000000)
+
+    def rpc_eth_sendRawTransaction(self, raw_transaction):
+        tx = self.tester.backend.chain.get_vm().get_transaction_builder().decode(HexBytes(raw_transaction))
+        # Executed first as a call for the revert reason, which eth-tester does not keep in the receipt.
+        try:
+            self.tester.call({"from": _hex(tx.sender), "to": _hex(tx.to), "data": _hex(tx.data), "gas_price": 0}, "latest")
+            reason = None
+        except TransactionFailed as e:
+            reason = revert_data(e)
+        try:
+            tx_hash = self.tester.send_raw_transaction(raw_transaction)
+        except ValidationError as e:
+            raise ChainRejected(str(e))
+        if reason is not None:
+            self.revert_reasons[tx_hash] = reason
+        return tx_hash
+
+    def rpc_eth_getTransactionByHash(self, tx_hash):
+        try:
+            tx = self.tester.get_transaction_by_hash(tx_hash)
+        except TransactionNotFound:
+            return None
+        return {"hash": tx["hash"], "nonce": hex(tx["nonce"]), "blockNumber": hex(tx["block_number"]), "from": tx["from"], "to": tx["to"]}
+
+    def rpc_eth_getTransactionReceipt(self, tx_hash):
+        try:
+            receipt = self.tester.get_transaction_receipt(tx_hash)
+        except TransactionNotFound:
+            return None
+        formatted = {
+            "transactionHash": receipt["transaction_hash"],
+            "transactionIndex": hex(receipt["transaction_index"]),
+            "blockHash": receipt["block_hash"],
+            "blockNumber": hex(receipt["block_number"]),
+            "from": receipt["from"],
+            "to": receipt["to"],
+            "gasUsed": hex(receipt["gas_used"]),
+            "cumulativeGasUsed": hex(receipt["cumulative_gas_used"]),
+            "contractAddress": receipt["contract_address"],
+            "logs": [self._log(log) for log in receipt["logs"]],
+            "status": hex(receipt["status"])
+        }
+        if not receipt["status"] and tx_hash in self.revert_reasons:
+            formatted["revertReason"] = _hex(self.revert_reasons[tx_hash])
+        return formatted
+
+    def rpc_eth_getLogs(self, log_filter):
+        from_block = self._tag(log_filter.get("fromBlock", "latest"))
+        to_block = self._tag(log_filter.get("toBlock", "latest"))
+        if from_block == "latest":
+            from_block = self.tester.get_block_by_number("latest")["number"]
+        logs = self.tester.get_logs(from_block, to_block, log_filter.get("address"))
+        topics = log_filter.get("topics") or []
+        matched = []
+        for log in logs:
+            if all(wanted is None or (log["topics"][index] if index < len(log["topics"]) else None) in (wanted if isinstance(wanted, list) else [wanted])
+                   for index, wanted in enumerate(topics)):
+                matched.append(self._log(log))
+        return matched
+
+    def rpc_qbft_getValidatorsByBlockNumber(self, tag="latest"):
+        return []
+
+    def rpc_qbft_proposeValidatorVote(self, address, add):
+        return True
+
+    def rpc_qbft_getPendingVotes(self):
+        return {}
+
+    def rpc_evm_mine(self, timestamp=None):
+        if timestamp is not None:
+            self.tester.time_travel(int(timestamp, 16) if isinstance(timestamp, str) else timestamp)
+        else:
+            self.tester.mine_blocks(1)
+        return "0x0"
+
+    def rpc_evm_increaseTime(self, seconds):
+        seconds = int(seconds, 16) if isinstance(seconds, str) else int(seconds)
+        self.tester.time_travel(self.tester.get_block_by_number("latest")["timestamp"] + seconds)
+        return seconds
@@ -0,0 +1,359 @@
+"""Load test of the registry HTTP API.
+
+Starts a NodeRegistry (by default the one in Node_cloud) in a child process, against a
+StubChain instead of Besu, registers many synthetic signed identities through /register-node
+and then drives the access routes with them at a fixed concurrency. Prints throughput and
+latency percentiles per route as JSON, and compares them with an earlier run if asked to:
+
+    python test/load_test.py --identities 200 --concurrency 16 --output run.json
+    python test/load_test.py --baseline run.json --tolerance 0.2
+
+With --chain emulator the registry runs ChainGateway against test/node_registry_emulator.py
+over JSON-RPC instead, so the chain round trips (ABI coding, nonces, receipts) are measured
+too. With --url it drives an already running server instead (any chain backend); the
+identities must then be able to register on that chain.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from eth_keys import keys
+from eth_utils import keccak
+
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TEST_DIR)
+
+# Route name -> (HTTP method, path) of the access routes.
+ACCESS_ROUTES = {
+    "read": ("GET", "/read"),
+    "write": ("POST", "/write"),
+    "update": ("PUT", "/update"),
+    "remove": ("DELETE", "/remove"),
+}
+
+
+# ----------------------------------IDENTITIES----------------------------------
+
+def make_identity(index, node_type, seed):
+    """A deterministic node identity, signed like client_node_reg_request.sign_message."""
+    private_key = keys.PrivateKey(keccak(text=f"load-test:{seed}:{index}"))
+    data = {
+        "node_id": f"LT-{index:05d}",
+        "node_name": f"Load_Test_{node_type}_{index}",
+        "node_type": node_type,
+        "public_key": private_key.public_key.to_hex()
+    }
+    message_hash = keccak(text=json.dumps(data, sort_keys=True))
+    data["signature"] = private_key.sign_msg_hash(message_hash).to_hex()
+    data["address"] = private_key.public_key.to_address()
+    data["node_url"] = ""
+    data["rpcURL"] = ""
+    return data
+
+
+# ----------------------------------SERVER----------------------------------
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _serve(tree, port, chain_kind, call_latency, tx_latency, log_level):
+    """Child process: the registry of `tree` on a StubChain or the emulator, served by the threaded werkzeug server."""
+    os.environ["LOG_LEVEL"] = log_level
+    sys.path.insert(0, TEST_DIR)
+    sys.path.insert(0, tree)
+    import logging
+    from werkzeug.serving import make_server
+    from node_registry_emulator import EmulatorRPC, from_artifact
+    from stub_chain import StubChain
+    import logging_pipeline
+
+    if os.path.exists(os.path.join(tree, "root_node_registration.py")):
+        from root_node_registration import NodeRegistry
+    else:
+        from client_node_registration import NodeRegistry
+    logging_pipeline.setup_logging()
+
+    if chain_kind == "emulator":
+        # A block every tx_latency seconds, as QBFT; reads are real JSON-RPC round trips.
+        emulated = from_artifact(os.path.join(tree, "data", "NodeRegistry.json"), block_time=tx_latency)
+        emulated.start()
+        rpc_server = EmulatorRPC(emulated).serve(port=0)
+        registry = NodeRegistry(f"http://127.0.0.1:{rpc_server.server_address[1]}", chain_backend="gateway")
+    else:
+        # Nothing listens on the discard port: acknowledgements to the synthetic nodes fail at once.
+        registry = NodeRegistry("http://127.0.0.1:9", chain_backend=StubChain(call_latency=call_latency, tx_latency=tx_latency))
+    with open(os.path.join(tree, "node-details.json"), "r") as details_file:
+        node = json.load(details_file)
+    registry.chain.register_node(node["node_id"], node["node_name"], node["node_type"], node["public_key"],
+                                 node["address"], node["rpcURL"], node["node_type"], node["signature"])
+
+    # The access log of the werkzeug server would cost more than most requests.
+    logging.getLogger("werkzeug").setLevel(log_level)
+    server = make_server("127.0.0.1", port, registry.app, threaded=True)
+    # shutdown() waits for serve_forever() to return, so it cannot run on this thread.
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+    server.serve_forever()
+    registry.shutdown()
+
+
+def start_server(args):
+    """Copies the registry tree (its data/ is written to) and serves it; returns (url, process, copy)."""
+    copy = tempfile.mkdtemp(prefix="load-test-")
+    tree = os.path.join(copy, os.path.basename(os.path.normpath(args.tree)))
+    shutil.copytree(args.tree, tree, ignore=shutil.ignore_patterns("__pycache__"))
+    port = _free_port()
+    process = multiprocessing.get_context("spawn").Process(
+        target=_serve, args=(tree, port, args.chain, args.call_latency, args.tx_latency, args.log_level))
+    process.start()
+
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if not process.is_alive():
+            raise RuntimeError(f"Registry server exited with code {process.exitcode}")
+        try:
+            requests.get(f"{url}/authorization-stats", timeout=1)
+            return url, process, copy
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Registry server did not start in 60s")
+
+
+# ----------------------------------MEASURING----------------------------------
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples, duration):
+    """Throughput and latency percentiles of (latency_seconds, status_code, outcome) samples."""
+    latencies = sorted(latency * 1000 for latency, _, _ in samples)
+    status_codes = {}
+    outcomes = {}
+    for _, status_code, outcome in samples:
+        status_codes[str(status_code)] = status_codes.get(str(status_code), 0) + 1
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    errors = sum(count for code, count in status_codes.items() if not code.startswith("2"))
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "status_codes": status_codes,
+        "outcomes": outcomes,
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(len(samples) / duration, 1) if duration > 0 else 0.0,
+        "latency_ms": {
+            "min": round(latencies[0], 3) if latencies else 0.0,
+            "mean": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50), 3),
+            "p90": round(percentile(latencies, 90), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(latencies[-1], 3) if latencies else 0.0
+        }
+    }
+
+
+def run_phase(tasks, concurrency):
+    """Runs task() callables on `concurrency` threads; returns (samples, wall-clock seconds)."""
+    samples = []
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for sample in executor.map(lambda task: task(), tasks):
+            samples.append(sample)
+    return samples, time.perf_counter() - started
+
+
+class Client:
+    """HTTP calls to the registry, one keep-alive session per thread."""
+
+    def __init__(self, url, timeout):
+        self.url = url
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def request(self, method, path, **kwargs):
+        """Returns (latency_seconds, status_code, body); status 0 for a connection failure."""
+        started = time.perf_counter()
+        try:
+            response = self.session().request(method, f"{self.url}{path}", timeout=self.timeout, **kwargs)
+            latency = time.perf_counter() - started
+            try:
+                body = response.json()
+            except ValueError:
+                body = {}
+            return latency, response.status_code, body
+        except requests.RequestException as e:
+            return time.perf_counter() - started, 0, {"message": str(e)}
+
+    def register(self, identity):
+        """POST /register-node; returns the sample of the request (time to acceptance) and
+        one for the job (time until it left "verifying"), or None if it was not accepted."""
+        started = time.perf_counter()
+        latency, status_code, body = self.request("POST", "/register-node", json=identity)
+        on_chain = None
+        if status_code == 202:
+            job = {"state": "verifying"}
+            while job.get("state") == "verifying":
+                _, job_status, job = self.request("GET", body["status_url"], params={"wait": 30})
+                if job_status != 200:
+                    job = {"state": "no-response", "http_status": job_status}
+            # A job that failed reports the status its synchronous request would have had.
+            on_chain = (time.perf_counter() - started, job.get("http_status", 200), job["state"])
+        return (latency, status_code, body.get("status", "no-response")), on_chain
+
+    def access(self, route, identity):
+        method, path = ACCESS_ROUTES[route]
+        params = {"signature": identity["signature"], "node_id": identity["node_id"], "node_name": identity["node_name"]}
+        latency, status_code, body = self.request(method, path, params=params)
+        # "success": allowed, "failure": denied by the token's policy.
+        return latency, status_code, body.get("status", "no-response")
+
+
+# ----------------------------------RUN----------------------------------
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    node_types = [node_type.strip() for node_type in args.node_types.split(",") if node_type.strip()]
+    routes = [route.strip() for route in args.routes.split(",") if route.strip()]
+    for route in routes:
+        if route not in ACCESS_ROUTES:
+            raise SystemExit(f"Unknown route {route}; expected some of {', '.join(ACCESS_ROUTES)}")
+    identities = [make_identity(index, node_types[index % len(node_types)], args.seed) for index in range(args.identities)]
+
+    process = copy = None
+    if args.url:
+        url = args.url.rstrip("/")
+    else:
+        url, process, copy = start_server(args)
+    client = Client(url, args.timeout)
+    report = {
+        "config": {
+            "identities": args.identities,
+            "concurrency": args.concurrency,
+            "requests_per_route": args.requests,
+            "node_types": node_types,
+            "routes": routes,
+            "chain": "external" if args.url else args.chain,
+            "call_latency_s": args.call_latency,
+            "tx_latency_s": args.tx_latency
+        },
+        "server": {"url": url, "tree": None if args.url else os.path.relpath(args.tree, REPO_DIR), "commit": git_commit()},
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "results": {}
+    }
+
+    try:
+        on_chain = []
+
+        def register(identity):
+            sample, on_chain_sample = client.register(identity)
+            if on_chain_sample is not None:
+                on_chain.append(on_chain_sample)
+            return sample
+
+        samples, duration = run_phase([lambda identity=identity: register(identity) for identity in identities], args.concurrency)
+        report["results"]["register-node"] = summarize(samples, duration)
+        report["results"]["register-node:on-chain"] = summarize(on_chain, duration)
+
+        for route in routes:
+            tasks = [lambda index=index: client.access(route, identities[index % len(identities)]) for index in range(args.requests)]
+            samples, duration = run_phase(tasks, args.concurrency)
+            report["results"][route] = summarize(samples, duration)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.join(10)
+            shutil.rmtree(copy, ignore_errors=True)
+    return report
+
+
+def compare(report, baseline, tolerance):
+    """Regressions of `report` against `baseline`: throughput down or p95 up by more than `tolerance`."""
+    regressions = []
+    for route, result in report["results"].items():
+        before = baseline.get("results", {}).get(route)
+        if not before or not result["requests"]:
+            continue
+        if result["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{route}: throughput {result['throughput_rps']} req/s, baseline {before['throughput_rps']} req/s")
+        if result["latency_ms"]["p95"] > before["latency_ms"]["p95"] * (1 + tolerance):
+            regressions.append(f"{route}: p95 {result['latency_ms']['p95']} ms, baseline {before['latency_ms']['p95']} ms")
+        if result["errors"] > before["errors"]:
+            regressions.append(f"{route}: {result['errors']} errors, baseline {before['errors']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test of the registry HTTP API against a stub or emulated chain.")
+    parser.add_argument("--identities", type=int, default=200, help="Synthetic nodes registered (default 200).")
+    parser.add_argument("--concurrency", type=int, default=16, help="Requests in flight (default 16).")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per access route (default 2000).")
+    parser.add_argument("--routes", default="read,write,update,remove", help="Access routes driven, in order.")
+    parser.add_argument("--node-types", default="Fog,Edge", help="Node types of the identities, assigned in turn.")
+    parser.add_argument("--seed", default="0", help="Seed of the identity keys.")
+    parser.add_argument("--tree", default=os.path.join(REPO_DIR, "Node_cloud"), help="Registry tree served (default Node_cloud).")
+    parser.add_argument("--url", help="Drive this running server instead of starting one.")
+    parser.add_argument("--chain", choices=("stub", "emulator"), default="stub", help="Chain of the started server (default stub).")
+    parser.add_argument("--call-latency", type=float, default=0.0, help="Seconds each stub chain read takes.")
+    parser.add_argument("--tx-latency", type=float, default=0.0, help="Seconds each transaction takes to be mined (the emulator's block time).")
+    # The acknowledgements sent to the synthetic nodes fail and are logged as errors, by design.
+    parser.add_argument("--log-level", default="CRITICAL", help="LOG_LEVEL of the started server (default CRITICAL).")
+    parser.add_argument("--timeout", type=float, default=60, help="Seconds a request may take.")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout.")
+    parser.add_argument("--baseline", help="JSON report of an earlier run to compare with.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression (default 0.2).")
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.baseline:
+        with open(args.baseline, "r") as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline.get("config") != report["config"]:
+            print("Warning: the baseline was run with another configuration.", file=sys.stderr)
+        report["regressions"] = compare(report, baseline, args.tolerance)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(output + "\n")
+    else:
+        print(output)
+    if report.get("regressions"):
+        for regression in report["regressions"]:
+            print(f"Regression: {regression}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,864 @@
+"""In-memory emulator of the NodeRegistry contract behind a Besu-like JSON-RPC endpoint.
+
+    python test/node_registry_emulator.py --port 8545
+
+serves the contract of Node_cloud/data/NodeRegistry.json at the address the artifact names,
+so the registry (ChainGateway, or interact.js, which talks to 127.0.0.1:8545) runs against
+it as against Besu with the Truffle-deployed contract, with no chain and no EVM:
+
+    BESU_RPC_URL=http://127.0.0.1:8545 python Node_cloud/root_node_registration.py
+
+Transactions are mined as they arrive, one block each, or every --block-time seconds as
+QBFT would. Gas is not metered: receipts report 0 gas used. Contract state is only kept for
+the head block; eth_call at an older block reads the head state with that block's timestamp.
+test/test_node_registry_emulator.py checks the emulator against the compiled contract.
+"""
+import argparse
+import copy
+import itertools
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import rlp
+from eth_abi import decode, encode
+from eth_account import Account
+from eth_account.typed_transactions import TypedTransaction
+from eth_bloom import BloomFilter
+from eth_utils import keccak, to_checksum_address
+from hexbytes import HexBytes
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_ARTIFACT = os.path.join(REPO_DIR, "Node_cloud", "data", "NodeRegistry.json")
+
+NODE_TYPES = ("Unknown", "Cloud", "Fog", "Edge", "Sensor", "Actuator")
+ZERO_ADDRESS = "0x" + "00" * 20
+ERROR_SELECTOR = keccak(text="Error(string)")[:4]
+PANIC_SELECTOR = keccak(text="Panic(uint256)")[:4]
+PANIC_OVERFLOW = 0x11
+# Transactions further ahead of the sender's nonce than this are refused, as by Besu's pool.
+MAX_FUTURE_NONCES = 1000
+
+
+class Revert(Exception):
+    """A reverted contract call; `data` is its revert payload (Error(string), Panic(uint256) or empty)."""
+
+    def __init__(self, reason=None, data=None):
+        super().__init__(reason or "execution reverted")
+        self.reason = reason
+        if data is None:
+            data = ERROR_SELECTOR + encode(["string"], [reason]) if reason is not None else b""
+        self.data = data
+
+    @classmethod
+    def panic(cls, code):
+        return cls(None, PANIC_SELECTOR + encode(["uint256"], [code]))
+
+
+def require(condition, reason):
+    if not condition:
+        raise Revert(reason)
+
+
+class Message:
+    """msg.sender, the block a call runs in and the events it emits."""
+
+    def __init__(self, sender=ZERO_ADDRESS, timestamp=None, block_number=0):
+        self.sender = to_checksum_address(sender)
+        self.timestamp = int(time.time()) if timestamp is None else timestamp
+        self.block_number = block_number
+        self.events = []
+
+    def emit(self, name, **args):
+        self.events.append((name, args))
+
+
+# ----------------------------------CONTRACT----------------------------------
+
+class NodeRegistryContract:
+    """Python port of the deployed NodeRegistry contract (the source in data/NodeRegistry.json).
+
+    Functions keep the contract's names and arguments, after the Message they run in. They
+    return their outputs as a tuple in ABI order, emit the contract's events and raise Revert
+    with its reasons. Every require runs before the first write, in the contract's order, so a
+    revert never leaves partial state behind.
+    """
+
+    EMPTY_NODE = {"nodeName": "", "nodeType": 0, "publicKey": "", "isRegistered": False,
+                  "registeredBy": ZERO_ADDRESS, "registeredByNodeType": 0, "nodeSignature": ""}
+    EMPTY_TOKEN = {"policy": "", "issuedAt": 0, "isIssued": False, "isRevoked": False}
+
+    def __init__(self):
+        self.iot_nodes = {}
+        self.node_signature_to_node_id = {}
+        self.address_to_node_id = {}
+        self.capability_tokens = {}
+        self.node_rpc_urls = {}
+
+    @staticmethod
+    def node_type(node_type_str):
+        return NODE_TYPES.index(node_type_str) if node_type_str in NODE_TYPES[1:] else 0
+
+    @staticmethod
+    def token_id(from_node_signature, to_node_signature):
+        """keccak256(abi.encodePacked(from, to)): ("ab", "c") and ("a", "bc") share a token."""
+        return keccak(from_node_signature.encode() + to_node_signature.encode())
+
+    @staticmethod
+    def policy_string(from_type, to_type):
+        from_name, to_name = NODE_TYPES[from_type], NODE_TYPES[to_type]
+        policies = {
+            ("Cloud", "Fog"): "Cloud->Fog:READ,WRITE",
+            ("Cloud", "Edge"): "Cloud->Edge:READ",
+            ("Fog", "Cloud"): "Fog->Cloud:READ,WRITE",
+            ("Fog", "Edge"): "Fog->Edge:READ,UPDATE",
+            ("Edge", "Cloud"): "Edge->Cloud:WRITE,UPDATE",
+            ("Edge", "Fog"): "Edge->Fog:READ,REMOVE",
+            ("Sensor", "Edge"): "Sensor->Edge:WRITE,REMOVE",
+            ("Actuator", "Fog"): "Actuator->Fog:READ,REMOVE",
+        }
+        return policies.get((from_name, to_name), "NO POLICY")
+
+    def _node(self, node_id):
+        return self.iot_nodes.get(node_id, self.EMPTY_NODE)
+
+    def _token(self, from_node_signature, to_node_signature):
+        return self.capability_tokens.get(self.token_id(from_node_signature, to_node_signature), self.EMPTY_TOKEN)
+
+    def _registered(self, node_signature):
+        node_id = self.node_signature_to_node_id.get(node_signature, "")
+        node = self._node(node_id)
+        return node_id, node, node["isRegistered"] and node["nodeSignature"] == node_signature
+
+    def _details(self, node_id, node):
+        return (node_id, node["nodeName"], node["nodeType"], node["publicKey"], node["isRegistered"],
+                node["registeredBy"], node["nodeSignature"], node["registeredByNodeType"])
+
+    # Transactions.
+
+    def registerNode(self, message, nodeId, nodeName, nodeTypeStr, publicKey, registeredBy, rpcURL, registeredByNodeTypeStr, nodeSignature):
+        require(not self.node_signature_to_node_id.get(nodeSignature), "Node already registered!")
+        node_type = self.node_type(nodeTypeStr)
+        registered_by_node_type = self.node_type(registeredByNodeTypeStr)
+        require(node_type != 0, "Invalid node type!")
+        require(registered_by_node_type != 0, "Invalid registered-by node type!")
+
+        registered_by = to_checksum_address(registeredBy)
+        self.node_signature_to_node_id[nodeSignature] = nodeId
+        self.iot_nodes[nodeId] = {
+            "nodeName": nodeName,
+            "nodeType": node_type,
+            "publicKey": publicKey,
+            "isRegistered": True,
+            "registeredBy": registered_by,
+            "registeredByNodeType": registered_by_node_type,
+            "nodeSignature": nodeSignature
+        }
+        self.address_to_node_id[registered_by] = nodeId
+        self.node_rpc_urls[registered_by] = rpcURL
+        message.emit("RpcUrlMapped", nodeAddress=registered_by, rpcURL=rpcURL)
+        message.emit("NodeRegistered", nodeId=nodeId, nodeName=nodeName, nodeType=node_type, publicKey=publicKey,
+                     registeredBy=registered_by, registeredByNodeType=registered_by_node_type, nodeSignature=nodeSignature)
+        return ()
+
+    def proposeValidator(self, message, validator):
+        require(int(validator, 16) != 0, "Invalid validator address")
+        message.emit("ValidatorProposed", proposedBy=message.sender, validator=to_checksum_address(validator))
+        return ()
+
+    def issueToken(self, message, fromNodeSignature, toNodeSignature):
+        from_type = self._node(self.node_signature_to_node_id.get(fromNodeSignature, ""))["nodeType"]
+        to_type = self._node(self.node_signature_to_node_id.get(toNodeSignature, ""))["nodeType"]
+        policy = self.policy_string(from_type, to_type)
+        token = self._token(fromNodeSignature, toNodeSignature)
+        if token["isIssued"] and not token["isRevoked"]:
+            raise Revert("Token already issued and active")
+
+        self.capability_tokens[self.token_id(fromNodeSignature, toNodeSignature)] = {
+            "policy": policy, "issuedAt": message.timestamp, "isIssued": True, "isRevoked": False
+        }
+        message.emit("TokenIssued", fromNodeSignature=fromNodeSignature, toNodeSignature=toNodeSignature, policy=policy, issuedAt=message.timestamp)
+        return ()
+
+    def revokeToken(self, message, fromNodeSignature, toNodeSignature):
+        token = self._token(fromNodeSignature, toNodeSignature)
+        require(token["isIssued"], "Token not issued")
+        require(not token["isRevoked"], "Token already revoked")
+        self.capability_tokens[self.token_id(fromNodeSignature, toNodeSignature)] = dict(token, isRevoked=True)
+        message.emit("TokenRevoked", fromNodeSignature=fromNodeSignature, toNodeSignature=toNodeSignature)
+        return ()
+
+    # Views.
+
+    def isNodeRegistered(self, message, nodeSignature):
+        return (self._registered(nodeSignature)[2],)
+
+    def getNodeDetailsBySignature(self, message, nodeSignature):
+        node_id, node, registered = self._registered(nodeSignature)
+        require(registered, "No matching node registered with this signature")
+        return self._details(node_id, node)
+
+    def getNodeDetailsByAddress(self, message, nodeAddress):
+        node_id = self.address_to_node_id.get(to_checksum_address(nodeAddress), "")
+        require(len(node_id) > 0, "Address not registered")
+        return self._details(node_id, self._node(node_id))
+
+    def getToken(self, message, fromNodeSignature, toNodeSignature):
+        token = self._token(fromNodeSignature, toNodeSignature)
+        return (token["policy"], token["issuedAt"], token["isIssued"], token["isRevoked"])
+
+    def checkToken(self, message, fromNodeSignature, toNodeSignature):
+        token = self._token(fromNodeSignature, toNodeSignature)
+        return (token["isIssued"] and not token["isRevoked"],)
+
+    def isTokenExpired(self, message, fromNodeSignature, toNodeSignature, validityPeriodInSeconds):
+        token = self._token(fromNodeSignature, toNodeSignature)
+        if not token["isIssued"] or token["isRevoked"]:
+            return (True,)
+        expires_at = token["issuedAt"] + validityPeriodInSeconds
+        if expires_at >= 2 ** 256:
+            raise Revert.panic(PANIC_OVERFLOW)  # Checked arithmetic of Solidity 0.8.
+        return (message.timestamp > expires_at,)
+
+    def isValidator(self, message, nodeSignature):
+        node_id, node, registered = self._registered(nodeSignature)
+        require(registered, "Node not found or invalid signature")
+        return (NODE_TYPES[node["nodeType"]] in ("Cloud", "Fog"),)
+
+    # Getters of the public mappings.
+
+    def iotNodes(self, message, nodeId):
+        node = self._node(nodeId)
+        return (node["nodeName"], node["nodeType"], node["publicKey"], node["isRegistered"],
+                node["registeredBy"], node["registeredByNodeType"], node["nodeSignature"])
+
+    def nodeSignatureToNodeId(self, message, nodeSignature):
+        return (self.node_signature_to_node_id.get(nodeSignature, ""),)
+
+    def addressToNodeId(self, message, address):
+        return (self.address_to_node_id.get(to_checksum_address(address), ""),)
+
+    def capabilityTokens(self, message, tokenId):
+        token = self.capability_tokens.get(bytes(tokenId), self.EMPTY_TOKEN)
+        return (token["policy"], token["issuedAt"], token["isIssued"], token["isRevoked"])
+
+    def nodeRpcUrls(self, message, address):
+        return (self.node_rpc_urls.get(to_checksum_address(address), ""),)
+
+
+class ContractABI:
+    """Runs contract functions from calldata and encodes what they return and emit, per the ABI."""
+
+    def __init__(self, abi):
+        self.functions = {}
+        self.events = {}
+        for entry in abi:
+            if entry["type"] == "function":
+                signature = f"{entry['name']}({','.join(param['type'] for param in entry['inputs'])})"
+                self.functions[keccak(text=signature)[:4]] = entry
+            elif entry["type"] == "event":
+                signature = f"{entry['name']}({','.join(param['type'] for param in entry['inputs'])})"
+                self.events[entry["name"]] = dict(entry, topic=keccak(text=signature))
+
+    def execute(self, contract, message, calldata, value=0):
+        """Runs the function `calldata` selects and returns its ABI-encoded outputs; raises Revert."""
+        entry = self.functions.get(bytes(calldata[:4]))
+        if entry is None or (value and entry["stateMutability"] != "payable"):
+            raise Revert()  # No fallback function, nothing payable.
+        try:
+            args = decode([param["type"] for param in entry["inputs"]], bytes(calldata[4:]))
+        except Exception:
+            raise Revert()
+        outputs = getattr(contract, entry["name"])(message, *args)
+        return encode([param["type"] for param in entry["outputs"]], list(outputs))
+
+    def is_view(self, calldata):
+        entry = self.functions.get(bytes(calldata[:4]))
+        return entry is not None and entry["stateMutability"] in ("view", "pure")
+
+    def log(self, name, args):
+        """(topics, data) of an emitted event; indexed strings are logged as their hash."""
+        event = self.events[name]
+        topics = [event["topic"]]
+        not_indexed = []
+        for param in event["inputs"]:
+            if param.get("indexed"):
+                if param["type"] in ("string", "bytes"):
+                    value = args[param["name"]]
+                    topics.append(keccak(value.encode() if isinstance(value, str) else value))
+                else:
+                    topics.append(encode([param["type"]], [args[param["name"]]]))
+            else:
+                not_indexed.append(param)
+        data = encode([param["type"] for param in not_indexed], [args[param["name"]] for param in not_indexed])
+        return topics, data
+
+    def decoded_args(self, name, args):
+        """The event arguments as ChainGateway.decode_log returns them."""
+        decoded = {}
+        for param in self.events[name]["inputs"]:
+            value = args[param["name"]]
+            if param.get("indexed") and param["type"] in ("string", "bytes"):
+                value = "0x" + keccak(value.encode() if isinstance(value, str) else value).hex()
+            decoded[param["name"]] = value
+        return decoded
+
+
+# ----------------------------------CHAIN----------------------------------
+
+def _hex(value):
+    return hex(value) if isinstance(value, int) else "0x" + bytes(value).hex()
+
+
+def decode_raw_transaction(raw_transaction):
+    """Sender, nonce, recipient, data, value, gas and chain id of a signed legacy or typed transaction."""
+    raw = HexBytes(raw_transaction)
+    sender = Account.recover_transaction(raw)
+    if raw[0] <= 0x7f:
+        fields = TypedTransaction.from_bytes(raw).as_dict()
+        to, data, chain_id = fields.get("to") or b"", fields.get("data") or b"", fields.get("chainId")
+        nonce, value, gas = fields["nonce"], fields["value"], fields["gas"]
+    else:
+        nonce, _, gas, to, value, data, v, _, _ = rlp.decode(bytes(raw))
+        nonce, gas, value, v = (int.from_bytes(field, "big") for field in (nonce, gas, value, v))
+        chain_id = (v - 35) // 2 if v >= 35 else None
+    return {
+        "hash": keccak(bytes(raw)),
+        "from": sender,
+        "nonce": nonce,
+        "to": to_checksum_address(bytes(to)) if to else None,
+        "data": bytes(data),
+        "value": value,
+        "gas": gas,
+        "chainId": chain_id,
+        "type": raw[0] if raw[0] <= 0x7f else 0
+    }
+
+
+class ChainRejected(Exception):
+    """A transaction or request the emulated node refuses, like Besu would (nonce, chain id...)."""
+
+
+class EmulatedChain:
+    """Blocks, a transaction pool, receipts and logs around one NodeRegistryContract.
+
+    Transactions from one sender run in nonce order; one sent ahead of its predecessors waits
+    in the pool until the gap is filled. With `block_time` 0 each transaction is mined as soon
+    as it can run, in a block of its own; otherwise a block of every runnable transaction is
+    mined every `block_time` seconds (start() runs the miner). QBFT validator votes take effect
+    in the next block.
+    """
+
+    def __init__(self, contract_address, abi, deployed_code="0x", chain_id=1337, block_time=0, validators=(), peer_count=0):
+        """
+        :param contract_address: Address the contract is served at.
+        :param abi: ABI of the contract, e.g. the "abi" of data/NodeRegistry.json.
+        :param deployed_code: Returned by eth_getCode for the contract address.
+        :param chain_id: Transactions signed for another chain are refused.
+        :param block_time: Seconds between blocks; 0 mines each transaction at once.
+        :param validators: QBFT validator addresses.
+        :param peer_count: Returned by net_peerCount.
+        """
+        self.contract_address = to_checksum_address(contract_address)
+        self.abi = ContractABI(abi)
+        self.contract = NodeRegistryContract()
+        self.deployed_code = deployed_code
+        self.chain_id = chain_id
+        self.block_time = block_time
+        self.validators = [to_checksum_address(address) for address in validators]
+        self.votes = {}
+        self.peer_count = peer_count
+        self.time_offset = 0
+        self.blocks = []
+        self.transactions = {}
+        self.nonces = {}
+        self.pool = {}
+        self.lock = threading.RLock()
+        self._sequence = itertools.count()
+        self._stop = threading.Event()
+        self._append_block([], int(time.time()))
+
+    def now(self):
+        return max(int(time.time()) + self.time_offset, self.blocks[-1]["timestamp"] if self.blocks else 0)
+
+    # Blocks.
+
+    def head(self):
+        return len(self.blocks) - 1
+
+    def block_number(self, tag):
+        if tag in (None, "latest", "pending", "safe", "finalized"):
+            return self.head()
+        if tag == "earliest":
+            return 0
+        return int(tag, 16) if isinstance(tag, str) else int(tag)
+
+    def block(self, tag):
+        number = self.block_number(tag)
+        return self.blocks[number] if 0 <= number < len(self.blocks) else None
+
+    def block_by_hash(self, block_hash):
+        for block in reversed(self.blocks):
+            if _hex(block["hash"]) == block_hash.lower():
+                return block
+        return None
+
+    def _append_block(self, transactions, timestamp):
+        number = len(self.blocks)
+        parent_hash = self.blocks[-1]["hash"] if self.blocks else b"\x00" * 32
+        block_hash = keccak(parent_hash + number.to_bytes(32, "big") + timestamp.to_bytes(32, "big") + b"".join(tx["hash"] for tx in transactions))
+        bloom = BloomFilter()
+        for index, tx in enumerate(transactions):
+            tx["blockNumber"] = number
+            tx["blockHash"] = block_hash
+            tx["transactionIndex"] = index
+            for log in tx["logs"]:
+                bloom.add(bytes.fromhex(log["address"][2:]))
+                for topic in log["topics"]:
+                    bloom.add(topic)
+        self.blocks.append({"number": number, "hash": block_hash, "parentHash": parent_hash, "timestamp": timestamp,
+                            "transactions": transactions, "logsBloom": int(bloom).to_bytes(256, "big")})
+        for address, add in self.votes.items():
+            if add and address not in self.validators:
+                self.validators.append(address)
+            elif not add and address in self.validators and len(self.validators) > 1:
+                self.validators.remove(address)
+        self.votes = {}
+
+    def mine(self, timestamp=None):
+        """Mines a block of every runnable transaction (possibly none) and returns its number."""
+        with self.lock:
+            return self._mine_block(self._runnable(), timestamp)
+
+    def _mine_block(self, transactions, timestamp=None):
+        timestamp = self.now() if timestamp is None else max(int(timestamp), self.blocks[-1]["timestamp"])
+        for tx in transactions:
+            self._execute(tx, timestamp, len(self.blocks))
+        self._append_block(transactions, timestamp)
+        return self.head()
+
+    def start(self):
+        """Mines every `block_time` seconds on a daemon thread (nothing to do when block_time is 0)."""
+        if not self.block_time:
+            return
+
+        def run():
+            while not self._stop.wait(self.block_time):
+                self.mine()
+
+        thread = threading.Thread(target=run)
+        thread.daemon = True
+        thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    # Transactions.
+
+    def transaction_count(self, address, tag="latest"):
+        address = to_checksum_address(address)
+        with self.lock:
+            count = self.nonces.get(address, 0)
+            if tag == "pending":
+                while count in self.pool.get(address, {}):
+                    count += 1
+            return count
+
+    def send_raw_transaction(self, raw_transaction):
+        tx = decode_raw_transaction(raw_transaction)
+        if tx["chainId"] is not None and tx["chainId"] != self.chain_id:
+            raise ChainRejected(f"Invalid chain id {tx['chainId']}, expected {self.chain_id}")
+        if tx["to"] is None:
+            raise ChainRejected("Contract creation is not supported by the emulator")
+        with self.lock:
+            expected = self.nonces.get(tx["from"], 0)
+            pending = self.pool.setdefault(tx["from"], {})
+            if tx["hash"] in self.transactions:
+                raise ChainRejected("Known transaction")
+            if tx["nonce"] < expected:
+                raise ChainRejected("Nonce too low")
+            if tx["nonce"] in pending:
+                raise ChainRejected("Replacement transaction underpriced")
+            if tx["nonce"] > expected + MAX_FUTURE_NONCES:
+                raise ChainRejected("Nonce too far in the future")
+            tx.update({"sequence": next(self._sequence), "blockNumber": None, "status": None, "logs": [], "revertReason": None})
+            pending[tx["nonce"]] = tx
+            self.transactions[tx["hash"]] = tx
+            if not self.block_time:
+                for runnable in self._runnable():
+                    self._mine_block([runnable])
+        return tx["hash"]
+
+    def _runnable(self):
+        """Takes the transactions that can run now out of the pool: per sender, the nonces following the mined ones."""
+        runnable = []
+        for sender, pending in self.pool.items():
+            nonce = self.nonces.get(sender, 0)
+            chain = []
+            while nonce in pending:
+                chain.append(pending.pop(nonce))
+                nonce += 1
+            if chain:
+                runnable.append(chain)
+        runnable.sort(key=lambda chain: chain[0]["sequence"])
+        return [tx for chain in runnable for tx in chain]
+
+    def _execute(self, tx, timestamp, block_number):
+        self.nonces[tx["from"]] = tx["nonce"] + 1
+        if tx["to"] != self.contract_address:
+            tx["status"] = 1  # A plain transfer: nothing to run.
+            return
+        message = Message(tx["from"], timestamp, block_number)
+        try:
+            # The contract writes only after its last require: a revert leaves nothing to undo.
+            self.abi.execute(self.contract, message, tx["data"], tx["value"])
+        except Revert as e:
+            tx["status"] = 0
+            tx["revertReason"] = e.data
+            return
+        tx["status"] = 1
+        for log_index, (name, args) in enumerate(message.events):
+            topics, data = self.abi.log(name, args)
+            tx["logs"].append({"address": self.contract_address, "topics": topics, "data": data, "logIndex": log_index})
+
+    def call(self, to, data, sender=ZERO_ADDRESS, block="latest", value=0):
+        """eth_call: runs the function without keeping its writes; returns the output or raises Revert."""
+        with self.lock:
+            if to is None or to_checksum_address(to) != self.contract_address:
+                return b""
+            block = self.block(block)
+            if block is None:
+                raise ChainRejected("Unknown block")
+            # Views cannot write: only a call to a transaction needs its own copy of the state.
+            contract = self.contract if self.abi.is_view(data) else copy.deepcopy(self.contract)
+            return self.abi.execute(contract, Message(sender, block["timestamp"], block["number"]), data, value)
+
+    def logs(self, address=None, topics=None, from_block="latest", to_block="latest", block_hash=None):
+        """eth_getLogs: `topics` holds, per position, None or one topic or a list of alternatives."""
+        addresses = address if isinstance(address, list) else [address] if address else None
+        addresses = [to_checksum_address(item) for item in addresses] if addresses else None
+        with self.lock:
+            if block_hash is not None:
+                block = self.block_by_hash(block_hash)
+                blocks = [block] if block is not None else []
+            else:
+                blocks = self.blocks[self.block_number(from_block):self.block_number(to_block) + 1]
+            matched = []
+            for block in blocks:
+                for tx in block["transactions"]:
+                    for log in tx["logs"]:
+                        if addresses and log["address"] not in addresses:
+                            continue
+                        if not self._topics_match(log["topics"], topics or []):
+                            continue
+                        matched.append((tx, log))
+            return matched
+
+    @staticmethod
+    def _topics_match(log_topics, wanted):
+        for position, alternatives in enumerate(wanted):
+            if alternatives is None:
+                continue
+            if not isinstance(alternatives, list):
+                alternatives = [alternatives]
+            if position >= len(log_topics) or _hex(log_topics[position]) not in [topic.lower() for topic in alternatives]:
+                return False
+        return True
+
+
+# ----------------------------------JSON-RPC----------------------------------
+
+class RPCError(Exception):
+
+    def __init__(self, code, message, data=None):
+        super().__init__(message)
+        self.code = code
+        self.data = data
+
+
+class EmulatorRPC:
+    """The JSON-RPC methods of Besu the registry and interact.js use, served from an EmulatedChain.
+
+    Also answers the Hardhat/Ganache development methods evm_mine([timestamp]) and
+    evm_increaseTime(seconds), so tests can let tokens expire.
+    """
+
+    def __init__(self, chain, enode=None):
+        self.chain = chain
+        self.enode = enode or "enode://" + keccak(text=chain.contract_address).hex() * 2 + "@127.0.0.1:30303"
+
+    def handle(self, payload):
+        """Answers a request or a batch; a batch is answered at one block."""
+        if isinstance(payload, list):
+            with self.chain.lock:
+                return [self._answer(request) for request in payload]
+        return self._answer(payload)
+
+    def _answer(self, request):
+        response = {"jsonrpc": "2.0", "id": request.get("id") if isinstance(request, dict) else None}
+        try:
+            if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+                raise RPCError(-32600, "Invalid Request")
+            method = getattr(self, "rpc_" + request["method"], None)
+            if method is None:
+                raise RPCError(-32601, "Method not found")
+            response["result"] = method(*(request.get("params") or []))
+        except Revert as e:
+            response["error"] = {"code": -32000, "message": "Execution reverted", "data": _hex(e.data)}
+        except ChainRejected as e:
+            response["error"] = {"code": -32000, "message": str(e)}
+        except RPCError as e:
+            response["error"] = {"code": e.code, "message": str(e)}
+        except (TypeError, ValueError, KeyError) as e:
+            response["error"] = {"code": -32602, "message": f"Invalid params: {e}"}
+        return response
+
+    # Formatting.
+
+    def _block(self, block, full=False):
+        transactions = [self._transaction(tx) for tx in block["transactions"]] if full else [_hex(tx["hash"]) for tx in block["transactions"]]
+        return {
+            "number": hex(block["number"]),
+            "hash": _hex(block["hash"]),
+            "parentHash": _hex(block["parentHash"]),
+            "nonce": "0x0000000000000000",
+            "mixHash": "0x" + "00" * 32,
+            "sha3Uncles": "0x" + keccak(rlp.encode([])).hex(),
+            "logsBloom": _hex(block["logsBloom"]),
+            "transactionsRoot": "0x" + keccak(b"".join(tx["hash"] for tx in block["transactions"])).hex(),
+            "stateRoot": "0x" + "00" * 32,
+            "receiptsRoot": "0x" + "00" * 32,
+            "miner": self.chain.validators[0] if self.chain.validators else ZERO_ADDRESS,
+            "difficulty": "0x1",
+            "totalDifficulty": hex(block["number"] + 1),
+            "extraData": "0x",
+            "size": hex(512 + 128 * len(block["transactions"])),
+            "gasLimit": hex(30000000),
+            "gasUsed": "0x0",
+            "timestamp": hex(block["timestamp"]),
+            "transactions": transactions,
+            "uncles": []
+        }
+
+    def _transaction(self, tx):
+        return {
+            "hash": _hex(tx["hash"]),
+            "nonce": hex(tx["nonce"]),
+            "blockHash": _hex(tx["blockHash"]) if tx["blockNumber"] is not None else None,
+            "blockNumber": hex(tx["blockNumber"]) if tx["blockNumber"] is not None else None,
+            "transactionIndex": hex(tx["transactionIndex"]) if tx["blockNumber"] is not None else None,
+            "from": tx["from"],
+            "to": tx["to"],
+            "value": hex(tx["value"]),
+            "gas": hex(tx["gas"]),
+            "gasPrice": "0x0",
+            "input": _hex(tx["data"]),
+            "type": hex(tx["type"]),
+            "chainId": hex(self.chain.chain_id)
+        }
+
+    def _log(self, tx, log):
+        return {
+            "address": log["address"],
+            "topics": [_hex(topic) for topic in log["topics"]],
+            "data": _hex(log["data"]),
+            "blockNumber": hex(tx["blockNumber"]),
+            "blockHash": _hex(tx["blockHash"]),
+            "transactionHash": _hex(tx["hash"]),
+            "transactionIndex": hex(tx["transactionIndex"]),
+            "logIndex": hex(log["logIndex"]),
+            "removed": False
+        }
+
+    def _receipt(self, tx):
+        bloom = BloomFilter()
+        for log in tx["logs"]:
+            bloom.add(bytes.fromhex(log["address"][2:]))
+            for topic in log["topics"]:
+                bloom.add(topic)
+        receipt = {
+            "transactionHash": _hex(tx["hash"]),
+            "transactionIndex": hex(tx["transactionIndex"]),
+            "blockHash": _hex(tx["blockHash"]),
+            "blockNumber": hex(tx["blockNumber"]),
+            "from": tx["from"],
+            "to": tx["to"],
+            "cumulativeGasUsed": "0x0",
+            "gasUsed": "0x0",
+            "effectiveGasPrice": "0x0",
+            "contractAddress": None,
+            "logs": [self._log(tx, log) for log in tx["logs"]],
+            "logsBloom": _hex(int(bloom).to_bytes(256, "big")),
+            "status": hex(tx["status"]),
+            "type": hex(tx["type"])
+        }
+        if tx["revertReason"] is not None:
+            receipt["revertReason"] = _hex(tx["revertReason"])  # As Besu with --revert-reason-enabled.
+        return receipt
+
+    # Methods.
+
+    def rpc_web3_clientVersion(self):
+        return "NodeRegistryEmulator/v1/python"
+
+    def rpc_net_version(self):
+        return str(self.chain.chain_id)
+
+    def rpc_net_listening(self):
+        return True
+
+    def rpc_net_peerCount(self):
+        return hex(self.chain.peer_count)
+
+    def rpc_eth_chainId(self):
+        return hex(self.chain.chain_id)
+
+    def rpc_eth_syncing(self):
+        return False
+
+    def rpc_eth_accounts(self):
+        return []
+
+    def rpc_eth_gasPrice(self):
+        return "0x0"
+
+    def rpc_eth_blockNumber(self):
+        return hex(self.chain.head())
+
+    def rpc_eth_getBlockByNumber(self, tag, full=False):
+        block = self.chain.block(tag)
+        return self._block(block, full) if block is not None else None
+
+    def rpc_eth_getBlockByHash(self, block_hash, full=False):
+        block = self.chain.block_by_hash(block_hash)
+        return self._block(block, full) if block is not None else None
+
+    def rpc_eth_getBalance(self, address, tag="latest"):
+        return "0x0"
+
+    def rpc_eth_getCode(self, address, tag="latest"):
+        return self.chain.deployed_code if to_checksum_address(address) == self.chain.contract_address else "0x"
+
+    def rpc_eth_getTransactionCount(self, address, tag="latest"):
+        return hex(self.chain.transaction_count(address, tag))
+
+    def rpc_eth_call(self, transaction, tag="latest"):
+        data = HexBytes(transaction.get("data") or transaction.get("input") or "0x")
+        output = self.chain.call(transaction.get("to"), data, transaction.get("from") or ZERO_ADDRESS, tag, int(transaction.get("value") or "0x0", 16))
+        return _hex(output)
+
+    def rpc_eth_estimateGas(self, transaction, tag="latest"):
+        self.rpc_eth_call(transaction, tag)  # A call that would revert is refused.
+        return hex(1000000)
+
+    def rpc_eth_sendRawTransaction(self, raw_transaction):
+        return _hex(self.chain.send_raw_transaction(raw_transaction))
+
+    def rpc_eth_getTransactionByHash(self, tx_hash):
+        tx = self.chain.transactions.get(HexBytes(tx_hash))
+        return self._transaction(tx) if tx is not None else None
+
+    def rpc_eth_getTransactionReceipt(self, tx_hash):
+        with self.chain.lock:
+            tx = self.chain.transactions.get(HexBytes(tx_hash))
+            return self._receipt(tx) if tx is not None and tx["blockNumber"] is not None else None
+
+    def rpc_eth_getLogs(self, log_filter):
+        matched = self.chain.logs(log_filter.get("address"), log_filter.get("topics"), log_filter.get("fromBlock", "latest"),
+                                  log_filter.get("toBlock", "latest"), log_filter.get("blockHash"))
+        return [self._log(tx, log) for tx, log in matched]
+
+    def rpc_qbft_getValidatorsByBlockNumber(self, tag="latest"):
+        return [address.lower() for address in self.chain.validators]
+
+    def rpc_qbft_proposeValidatorVote(self, address, add):
+        with self.chain.lock:
+            self.chain.votes[to_checksum_address(address)] = add in (True, "true")
+        return True
+
+    def rpc_qbft_getPendingVotes(self):
+        return {address.lower(): add for address, add in self.chain.votes.items()}
+
+    def rpc_admin_nodeInfo(self):
+        return {"enode": self.enode, "name": self.rpc_web3_clientVersion(), "ports": {"discovery": 30303, "listener": 30303}}
+
+    def rpc_admin_peers(self):
+        return []
+
+    def rpc_evm_mine(self, timestamp=None):
+        self.chain.mine(int(timestamp, 16) if isinstance(timestamp, str) else timestamp)
+        return "0x0"
+
+    def rpc_evm_increaseTime(self, seconds):
+        with self.chain.lock:
+            self.chain.time_offset += int(seconds, 16) if isinstance(seconds, str) else int(seconds)
+            return self.chain.time_offset
+
+    # Serving.
+
+    def serve(self, host="127.0.0.1", port=8545):
+        """Serves JSON-RPC over HTTP (keep-alive) on a daemon thread; returns the server."""
+        rpc = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately; with Nagle each response would wait for a delayed ACK.
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                try:
+                    payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                    body = json.dumps(rpc.handle(payload)).encode()
+                except ValueError:
+                    body = json.dumps({"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": "Parse error"}}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return server
+
+
+def from_artifact(artifact_path=DEFAULT_ARTIFACT, **options):
+    """An EmulatedChain serving the contract of a Truffle artifact at the address it names."""
+    with open(artifact_path, "r") as artifact_file:
+        artifact = json.load(artifact_file)
+    address = next(iter(artifact["networks"].values()))["address"]
+    return EmulatedChain(address, artifact["abi"], artifact.get("deployedBytecode") or "0x", **options)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-memory NodeRegistry contract behind a Besu-like JSON-RPC endpoint.")
+    parser.add_argument("--artifact", default=DEFAULT_ARTIFACT, help="Truffle artifact naming the ABI and address (default Node_cloud's).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8545)
+    parser.add_argument("--chain-id", type=int, default=1337)
+    parser.add_argument("--block-time", type=float, default=0, help="Seconds between blocks; 0 mines each transaction at once.")
+    parser.add_argument("--validator", action="append", default=[], help="QBFT validator address (repeatable).")
+    parser.add_argument("--peers", type=int, default=0, help="Answer of net_peerCount.")
+    args = parser.parse_args()
+
+    chain = from_artifact(args.artifact, chain_id=args.chain_id, block_time=args.block_time, validators=args.validator, peer_count=args.peers)
+    chain.start()
+    server = EmulatorRPC(chain).serve(args.host, args.port)
+    print(f"NodeRegistry emulator at http://{args.host}:{args.port}, contract {chain.contract_address}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
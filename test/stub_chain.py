@@ -0,0 +1,273 @@
+import itertools
+import threading
+import time
+from eth_utils import keccak, to_checksum_address
+
+
+NODE_TYPES = ("Unknown", "Cloud", "Fog", "Edge", "Sensor", "Actuator")
+
+# getPolicyString of the deployed contract (Node_cloud/data/NodeRegistry.json).
+POLICIES = {
+    ("Cloud", "Fog"): "Cloud->Fog:READ,WRITE",
+    ("Cloud", "Edge"): "Cloud->Edge:READ",
+    ("Fog", "Cloud"): "Fog->Cloud:READ,WRITE",
+    ("Fog", "Edge"): "Fog->Edge:READ,UPDATE",
+    ("Edge", "Cloud"): "Edge->Cloud:WRITE,UPDATE",
+    ("Edge", "Fog"): "Edge->Fog:READ,REMOVE",
+    ("Sensor", "Edge"): "Sensor->Edge:WRITE,REMOVE",
+    ("Actuator", "Fog"): "Actuator->Fog:READ,REMOVE",
+}
+
+
+class ChainError(Exception):
+    """Stands in for chain_gateway.ChainError: a reverted transaction or call."""
+
+
+class StubChain:
+    """In-memory stand-in for the chain backend of NodeRegistry (ChainGateway, InteractDaemon).
+
+    It has the methods NodeRegistry and ChainEventFollower call on a backend and keeps the
+    contract state in dicts, with the rules and revert reasons of the deployed NodeRegistry
+    contract. Every transaction is mined in a block of its own, so the event follower and the
+    caches built on it behave as against Besu; reorg() replaces the newest blocks by another fork. Optional sleeps model the latency of calls and
+    of transactions (the block time), so a load test can tell server costs from chain costs.
+    """
+
+    def __init__(self, call_latency=0.0, tx_latency=0.0, validators=()):
+        """
+        :param call_latency: Seconds each read (eth_call) takes.
+        :param tx_latency: Seconds each transaction takes to be mined.
+        :param validators: Addresses returned by get_validators().
+        """
+        self.call_latency = call_latency
+        self.tx_latency = tx_latency
+        self.validators = [address.lower() for address in validators]
+        self.nodes = {}
+        self.signature_to_node_id = {}
+        self.address_to_node_id = {}
+        self.rpc_urls = {}
+        self.tokens = {}
+        self._hashes = itertools.count(1)
+        self._block_hashes = itertools.count(1)
+        self.blocks = [{"timestamp": int(time.time()), "events": [], "hash": self._block_hash()}]
+        self.transactions = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    # ----------------------------------BLOCKS----------------------------------
+
+    def _read(self):
+        self.calls += 1
+        if self.call_latency:
+            time.sleep(self.call_latency)
+
+    def _transact(self, apply):
+        """Runs apply(timestamp) -> events as one transaction mined in a new block."""
+        if self.tx_latency:
+            time.sleep(self.tx_latency)
+        with self._lock:
+            timestamp = int(time.time())
+            events = apply(timestamp)
+            block_number = len(self.blocks)
+            transaction_hash = "0x%064x" % next(self._hashes)
+            for event in events:
+                event["blockNumber"] = block_number
+                event["transactionHash"] = transaction_hash
+            self.blocks.append({"timestamp": timestamp, "events": events, "hash": self._block_hash()})
+            self.transactions += 1
+        return {"transactionHash": transaction_hash, "blockNumber": block_number, "events": events}
+
+    def _block_hash(self):
+        return "0x%064x" % next(self._block_hashes)
+
+    def reorg(self, block_number, undo=None):
+        """Drops the blocks from `block_number` on, as a fork without them that wins would.
+
+        The contract state is not rolled back; `undo()` may do that for the dropped transactions.
+        Blocks mined afterwards get hashes the dropped ones never had.
+        """
+        with self._lock:
+            del self.blocks[block_number:]
+            if undo is not None:
+                undo()
+
+    def head_block(self):
+        return len(self.blocks) - 1
+
+    def block_hash(self, block_number):
+        if block_number < 0 or block_number >= len(self.blocks):
+            return None
+        return self.blocks[block_number]["hash"]
+
+    def get_contract_logs(self, event_names, from_block, to_block):
+        events = []
+        for block in self.blocks[from_block:to_block + 1]:
+            events += [event for event in block["events"] if event["event"] in event_names]
+        return events
+
+    def check_if_deployed(self):
+        return True
+
+    # ----------------------------------CONTRACT----------------------------------
+
+    @staticmethod
+    def _token_id(from_signature, to_signature):
+        return (from_signature, to_signature)
+
+    def _node(self, node_signature):
+        node = self.nodes.get(self.signature_to_node_id.get(node_signature, ""))
+        if node is not None and node["isRegistered"] and node["nodeSignature"] == node_signature:
+            return node
+        return None
+
+    def register_node(self, node_id, node_name, node_type, public_key, address, rpc_url, receiver_node_type, node_signature, reg_by_signature=None):
+        def apply(timestamp):
+            if self.signature_to_node_id.get(node_signature):
+                raise ChainError("Node already registered!")
+            if node_type not in NODE_TYPES[1:]:
+                raise ChainError("Invalid node type!")
+            if receiver_node_type not in NODE_TYPES[1:]:
+                raise ChainError("Invalid registered-by node type!")
+            registered_by = to_checksum_address(address)
+            self.signature_to_node_id[node_signature] = node_id
+            self.nodes[node_id] = {
+                "nodeId": node_id,
+                "nodeName": node_name,
+                "nodeType": str(NODE_TYPES.index(node_type)),
+                "publicKey": public_key,
+                "isRegistered": True,
+                "registeredBy": registered_by,
+                "nodeSignature": node_signature,
+                "registeredByNodeType": str(NODE_TYPES.index(receiver_node_type)),
+            }
+            self.address_to_node_id[registered_by] = node_id
+            self.rpc_urls[registered_by] = rpc_url
+            return [
+                {"event": "RpcUrlMapped", "args": {"nodeAddress": registered_by, "rpcURL": rpc_url}},
+                {"event": "NodeRegistered", "args": {
+                    "nodeId": "0x" + keccak(text=node_id).hex(),  # Indexed string: only its hash is logged.
+                    "nodeName": node_name,
+                    "nodeType": NODE_TYPES.index(node_type),
+                    "publicKey": public_key,
+                    "registeredBy": registered_by,
+                    "registeredByNodeType": NODE_TYPES.index(receiver_node_type),
+                    "nodeSignature": node_signature
+                }}
+            ]
+        receipt = self._transact(apply)
+        return {"transactionHash": receipt["transactionHash"], "event": receipt["events"][1]["args"]}
+
+    def is_node_registered(self, node_signature):
+        self._read()
+        return self._node(node_signature) is not None
+
+    def are_nodes_registered(self, node_signatures):
+        self._read()
+        return [self._node(signature) is not None for signature in node_signatures]
+
+    def get_node_details(self, node_signature):
+        self._read()
+        node = self._node(node_signature)
+        if node is None:
+            raise ChainError("No matching node registered with this signature")
+        return dict(node)
+
+    def _policy(self, from_signature, to_signature):
+        from_node = self.nodes.get(self.signature_to_node_id.get(from_signature, ""))
+        to_node = self.nodes.get(self.signature_to_node_id.get(to_signature, ""))
+        from_type = NODE_TYPES[int(from_node["nodeType"])] if from_node else "Unknown"
+        to_type = NODE_TYPES[int(to_node["nodeType"])] if to_node else "Unknown"
+        return POLICIES.get((from_type, to_type), "NO POLICY")
+
+    def issue_token(self, from_signature, to_signature, route_signature=None):
+        def apply(timestamp):
+            token = self.tokens.get(self._token_id(from_signature, to_signature))
+            if token is not None and token["isIssued"] and not token["isRevoked"]:
+                raise ChainError("Token already issued and active")
+            policy = self._policy(from_signature, to_signature)
+            self.tokens[self._token_id(from_signature, to_signature)] = {"policy": policy, "issuedAt": timestamp, "isIssued": True, "isRevoked": False}
+            return [{"event": "TokenIssued", "args": {"fromNodeSignature": from_signature, "toNodeSignature": to_signature, "policy": policy, "issuedAt": timestamp}}]
+        receipt = self._transact(apply)
+        return {"transactionHash": receipt["transactionHash"], "blockNumber": receipt["blockNumber"], "event": receipt["events"][0]["args"]}
+
+    def revoke_token(self, from_signature, to_signature, route_signature=None):
+        def apply(timestamp):
+            token = self.tokens.get(self._token_id(from_signature, to_signature))
+            if token is None or not token["isIssued"]:
+                raise ChainError("Token not issued")
+            if token["isRevoked"]:
+                raise ChainError("Token already revoked")
+            token["isRevoked"] = True
+            return [{"event": "TokenRevoked", "args": {"fromNodeSignature": from_signature, "toNodeSignature": to_signature}}]
+        receipt = self._transact(apply)
+        return {"transactionHash": receipt["transactionHash"], "event": receipt["events"][0]["args"]}
+
+    def get_token(self, from_signature, to_signature):
+        self._read()
+        token = self.tokens.get(self._token_id(from_signature, to_signature))
+        return dict(token) if token else {"policy": "", "issuedAt": 0, "isIssued": False, "isRevoked": False}
+
+    def renew_token(self, from_signature, to_signature, route_signature=None):
+        """Revoke, then reissue, as ChainGateway does; only an already revoked token is not an error."""
+        try:
+            self.revoke_token(from_signature, to_signature)
+        except ChainError as e:
+            if str(e) != "Token already revoked":
+                raise
+        return self.issue_token(from_signature, to_signature)
+
+    def get_tokens(self, pairs):
+        self._read()
+        tokens = []
+        for from_signature, to_signature in pairs:
+            token = self.tokens.get(self._token_id(from_signature, to_signature))
+            tokens.append(dict(token) if token else {"policy": "", "issuedAt": 0, "isIssued": False, "isRevoked": False})
+        return tokens
+
+    def check_token(self, from_signature, to_signature):
+        token = self.get_token(from_signature, to_signature)
+        return token["isIssued"] and not token["isRevoked"]
+
+    def is_token_expired(self, from_signature, to_signature, validity_period):
+        token = self.get_token(from_signature, to_signature)
+        if not token["isIssued"] or token["isRevoked"]:
+            return True
+        return self.blocks[-1]["timestamp"] > token["issuedAt"] + int(validity_period)
+
+    def authorization_snapshot(self, from_signature, to_signature, validity_period):
+        """Same shape as ChainGateway.authorization_snapshot, read in one (simulated) round trip."""
+        self._read()
+        with self._lock:
+            block = self.head_block()
+            node = self._node(from_signature)
+            token = self.tokens.get(self._token_id(from_signature, to_signature))
+            token = dict(token) if token else {"policy": "", "issuedAt": 0, "isIssued": False, "isRevoked": False}
+            available = token["isIssued"] and not token["isRevoked"]
+            return {
+                "block": block,
+                "deployed": True,
+                "registered": node is not None,
+                "details": dict(node) if node is not None else None,
+                "tokenAvailable": available,
+                "tokenExpired": not available or self.blocks[-1]["timestamp"] > token["issuedAt"] + int(validity_period),
+                "token": token
+            }
+
+    # ----------------------------------VALIDATORS----------------------------------
+
+    def is_validator(self, node_signature):
+        node = self._node(node_signature)
+        return node is not None and NODE_TYPES[int(node["nodeType"])] in ("Cloud", "Fog")
+
+    def get_validators(self, block="latest"):
+        return list(self.validators)
+
+    def propose_validator_vote(self, validator_address, add):
+        return True
+
+    def emit_validator_proposal(self, validator_address):
+        receipt = self._transact(lambda timestamp: [{"event": "ValidatorProposed", "args": {"proposedBy": to_checksum_address("0x" + "00" * 20), "validator": to_checksum_address(validator_address)}}])
+        return receipt["events"][0]["args"]["validator"]
+
+    def get_peer_count(self):
+        return 0
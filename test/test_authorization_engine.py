@@ -0,0 +1,127 @@
+"""AuthorizationEngine and the access routes of the root registry, on a StubChain."""
+import json
+import os
+
+
+def authorize(registry, signature, action):
+    return registry.authorization.authorize(signature, action)
+
+
+def test_repeat_request_is_answered_from_the_cache(registry, chain, register):
+    edge = register(0, "Edge")
+    cloud = registry.identity.get()["signature"]
+    chain.issue_token(edge, cloud)
+    registry.chain_events.poll()
+
+    decision = authorize(registry, edge, "WRITE")
+    assert decision["allowed"] and not decision["cached"] and decision["flow"] == "Edge->Cloud"
+
+    calls, transactions = chain.calls, chain.transactions
+    decision = authorize(registry, edge, "WRITE")
+    assert decision["allowed"] and decision["cached"]
+    decision = authorize(registry, edge, "READ")
+    assert not decision["allowed"] and decision["reason"] == "not_permitted" and decision["cached"]
+    assert (chain.calls, chain.transactions) == (calls, transactions)
+    assert registry.authorization.stats()["cache"]["hits"] == 2
+
+
+def test_cached_decision_expires_after_the_ttl(registry, chain, register):
+    edge = register(0, "Edge")
+    chain.issue_token(edge, registry.identity.get()["signature"])
+    registry.chain_events.poll()
+    registry.authorization.cache_ttl = 0
+
+    assert not authorize(registry, edge, "WRITE")["cached"]
+    decision = authorize(registry, edge, "WRITE")
+    assert decision["allowed"] and not decision["cached"]
+    assert registry.authorization.stats()["cache"]["misses"] == 2
+
+
+def test_token_events_invalidate_the_cached_decision(registry, chain, register):
+    edge = register(0, "Edge")
+    cloud = registry.identity.get()["signature"]
+    chain.issue_token(edge, cloud)
+    registry.chain_events.poll()
+    authorize(registry, edge, "WRITE")
+
+    # Revoked by another registry: trusted until the follower handles the TokenRevoked event.
+    chain.revoke_token(edge, cloud)
+    assert authorize(registry, edge, "WRITE")["cached"]
+    registry.chain_events.poll()
+
+    transactions = chain.transactions
+    decision = authorize(registry, edge, "WRITE")
+    assert decision["allowed"] and not decision["cached"]
+    assert chain.transactions == transactions + 1 and chain.check_token(edge, cloud)
+
+    # The TokenIssued event of the new token drops the entry stored from its receipt, once.
+    registry.chain_events.poll()
+    assert not authorize(registry, edge, "WRITE")["cached"]
+    assert authorize(registry, edge, "WRITE")["cached"]
+
+
+def test_changed_artifact_clears_the_cache(registry, chain, register, tmp_path):
+    edge = register(0, "Edge")
+    chain.issue_token(edge, registry.identity.get()["signature"])
+    registry.chain_events.poll()
+    artifact_path = str(tmp_path / "NodeRegistry.json")
+    with open(registry.node_registry_path, "r") as artifact_file:
+        artifact = json.load(artifact_file)
+    with open(artifact_path, "w") as artifact_file:
+        json.dump(artifact, artifact_file)
+    registry.deployment.artifact_path = artifact_path
+
+    authorize(registry, edge, "WRITE")
+    assert authorize(registry, edge, "WRITE")["cached"]
+
+    network_id = next(iter(artifact["networks"]))
+    artifact["networks"][network_id]["address"] = "0x" + "11" * 20
+    with open(artifact_path + ".tmp", "w") as artifact_file:
+        json.dump(artifact, artifact_file)
+    os.replace(artifact_path + ".tmp", artifact_path)
+
+    decision = authorize(registry, edge, "WRITE")
+    assert decision["allowed"] and not decision["cached"]
+    # The follower starts over on the new contract; decisions are cached again once it has.
+    assert not authorize(registry, edge, "WRITE")["cached"]
+    registry.chain_events.poll()
+    authorize(registry, edge, "WRITE")
+    assert authorize(registry, edge, "WRITE")["cached"]
+
+
+def test_unregistered_node_is_not_cached(registry, chain):
+    assert authorize(registry, "0xsig9", "READ")["reason"] == "not_registered"
+    assert authorize(registry, "0xsig9", "READ")["reason"] == "not_registered"
+    assert registry.authorization.stats()["cache"]["entries"] == 0
+
+
+def test_access_routes(registry, chain, register):
+    client = registry.app.test_client()
+    edge = register(0, "Edge")
+    sensor = register(1, "Sensor")
+    query = {"signature": edge, "node_id": "N-0", "node_name": "node-0"}
+
+    response = client.post("/write", query_string=query)
+    assert response.status_code == 200 and response.get_json()["status"] == "success"
+    response = client.get("/read", query_string=query)
+    assert response.status_code == 200 and response.get_json()["status"] == "failure"
+
+    # /transmit is checked as WRITE.
+    response = client.post("/transmit", query_string=query)
+    assert response.status_code == 200 and response.get_json()["status"] == "success"
+    # Sensor->Cloud has no policy: refused from the permission matrix, no token is issued.
+    transactions = chain.transactions
+    response = client.post("/transmit", query_string={"signature": sensor, "node_id": "N-1", "node_name": "node-1"})
+    assert response.status_code == 200 and response.get_json()["status"] == "failure"
+    assert chain.transactions == transactions
+
+    # No policy of the contract grants EXECUTE: refused before any chain lookup.
+    calls = chain.calls
+    response = client.post("/execute", query_string=query)
+    assert response.status_code == 400 and "EXECUTE" in response.get_json()["message"]
+    assert (chain.calls, chain.transactions) == (calls, transactions)
+
+    response = client.get("/read", query_string={"node_id": "N-0"})
+    assert response.status_code == 400
+    response = client.get("/read", query_string={"signature": "0xsig9", "node_id": "N-9", "node_name": "node-9"})
+    assert response.status_code == 404
@@ -0,0 +1,111 @@
+"""register_nodes_bulk and the /register-nodes route of the root registry on a StubChain."""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from registration_jobs import COMPLETED, ON_CHAIN
+from load_test import make_identity
+from stub_chain import ChainError
+
+
+def identities(count):
+    return [make_identity(index, "Sensor", "bulk-registration") for index in range(count)]
+
+
+def finished_job(client, job_id):
+    for _ in range(20):
+        job = client.get(f"/register-node/{job_id}", query_string={"wait": 5}).get_json()
+        if job["status"] != "pending":
+            return job
+    raise AssertionError(f"registration job {job_id} did not finish")
+
+
+def test_partial_failures_keep_the_request_order(registry, chain, monkeypatch):
+    client = registry.app.test_client()
+    nodes = identities(6)
+    tampered = dict(nodes[2], node_name="Renamed")
+    incomplete = dict(nodes[3])
+    del incomplete["public_key"]
+    chain.register_node(nodes[4]["node_id"], nodes[4]["node_name"], "Sensor", nodes[4]["public_key"],
+                        nodes[4]["address"], "", "Cloud", nodes[4]["signature"])
+    register_node = chain.register_node
+
+    def reject_one(*args, **kwargs):
+        if args[7] == nodes[5]["signature"]:
+            raise ChainError("Transaction reverted")
+        return register_node(*args, **kwargs)
+    monkeypatch.setattr(chain, "register_node", reject_one)
+
+    request = [nodes[0], nodes[1], tampered, incomplete, nodes[4], nodes[5], nodes[0]]
+    response = client.post("/register-nodes", json={"nodes": request})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body["status"], body["registered"], body["failed"]) == ("partial", 2, 5)
+
+    results = body["results"]
+    assert [result["node_id"] for result in results] == [data["node_id"] for data in request]
+    assert [result["http_status"] for result in results] == [200, 200, 400, 400, 409, 500, 409]
+    assert results[2]["message"] == "Signature verification failed"
+    assert results[3]["message"].startswith("Missing node details")
+    assert results[4]["message"] == "Node already registered on the blockchain"
+    assert "Transaction reverted" in results[5]["message"]
+    assert results[6]["message"] == "Node listed more than once in the request"
+
+    assert [chain.is_node_registered(data["signature"]) for data in nodes] == [True, True, False, False, True, False]
+
+
+def test_registered_nodes_continue_as_jobs(registry, chain):
+    client = registry.app.test_client()
+    results = registry.register_nodes_bulk(identities(3))
+    assert [result["status"] for result in results] == ["success"] * 3
+    assert len({result["job_id"] for result in results}) == 3
+
+    for result in results:
+        assert result["status_url"] == f"/register-node/{result['job_id']}"
+        job = finished_job(client, result["job_id"])
+        # The job starts from the on-chain state: signature and registration are not checked again.
+        assert job["history"][0]["state"] == ON_CHAIN
+        assert (job["state"], job["http_status"], job["node_id"]) == (COMPLETED, 200, result["node_id"])
+
+
+def test_batch_size_limit(registry, chain):
+    client = registry.app.test_client()
+    registry.bulk_registration_limit = 2
+    transactions = chain.transactions
+
+    response = client.post("/register-nodes", json={"nodes": identities(3)})
+    assert response.status_code == 413 and "At most 2 nodes" in response.get_json()["message"]
+    for body in ({"nodes": []}, {"nodes": "LT-00000"}, {}):
+        assert client.post("/register-nodes", json=body).status_code == 400
+    assert chain.transactions == transactions and registry.registration_jobs.jobs == {}
+
+    response = client.post("/register-nodes", json={"nodes": identities(2)})
+    assert response.status_code == 200 and response.get_json()["status"] == "success"
+
+
+def test_callback_for_every_registered_node(registry):
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            received.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        nodes = identities(3)
+        request = [nodes[0], dict(nodes[1], node_name="Renamed"), nodes[2]]
+        results = registry.register_nodes_bulk(request, callback_url=f"http://127.0.0.1:{server.server_address[1]}/done")
+        deadline = time.monotonic() + 5
+        while len(received) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        server.shutdown()
+    # Nodes refused before a job exists get their error in the response only.
+    assert sorted(job["job_id"] for job in received) == sorted(results[index]["job_id"] for index in (0, 2))
+    assert all(job["state"] == COMPLETED for job in received)
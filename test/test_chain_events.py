@@ -0,0 +1,104 @@
+"""ChainEventFollower on a StubChain: incremental reads, reorgs and the resets of the caches built on it."""
+from chain_events import ChainEventFollower
+
+
+def follow(chain, **kwargs):
+    """A follower of `chain`, the (from, to) pairs of the TokenIssued events it handled and its resets."""
+    follower = ChainEventFollower(chain, **kwargs)
+    issued, resets = [], []
+    follower.subscribe("TokenIssued", lambda event: issued.append((event["args"]["fromNodeSignature"], event["args"]["toNodeSignature"])))
+    follower.on_reset(lambda: resets.append(follower.last_block))
+    return follower, issued, resets
+
+
+def test_reads_only_the_new_blocks(chain, register, monkeypatch):
+    edge, fog, cloud = register(0, "Edge"), register(1, "Fog"), register(2, "Cloud")
+    follower, issued, resets = follow(chain, max_range=2)
+    follower.poll()
+    assert follower.last_block == chain.head_block() == 3 and issued == [] and len(resets) == 1
+
+    ranges = []
+    get_contract_logs = chain.get_contract_logs
+    monkeypatch.setattr(chain, "get_contract_logs", lambda names, from_block, to_block: ranges.append((from_block, to_block)) or get_contract_logs(names, from_block, to_block))
+    chain.issue_token(edge, fog)
+    chain.issue_token(fog, cloud)
+    chain.issue_token(cloud, edge)
+    follower.poll()
+    assert issued == [(edge, fog), (fog, cloud), (cloud, edge)]
+    assert ranges == [(4, 5), (6, 6)]
+
+    follower.poll()
+    assert ranges == [(4, 5), (6, 6)] and len(resets) == 1
+
+
+def test_reorg_rewinds_to_the_last_common_block(chain, register):
+    edge, fog, cloud = register(0, "Edge"), register(1, "Fog"), register(2, "Cloud")
+    follower, issued, resets = follow(chain)
+    follower.poll()
+    chain.issue_token(edge, fog)
+    chain.issue_token(fog, cloud)
+    follower.poll()
+    assert issued == [(edge, fog), (fog, cloud)] and follower.last_block == 5
+
+    # Block 5 is replaced: the fork that wins has other transactions from there on.
+    chain.reorg(5, undo=lambda: chain.tokens.pop((fog, cloud)))
+    chain.issue_token(cloud, edge)
+    chain.issue_token(edge, cloud)
+    follower.poll()
+    assert len(resets) == 2 and resets[-1] == 3
+    assert issued[2:] == [(edge, fog), (cloud, edge), (edge, cloud)]
+    assert follower.last_block == 6 and follower.cursor()["hash"] == chain.block_hash(6)
+
+
+def test_shorter_fork_is_a_reorg(chain, register):
+    edge, fog = register(0, "Edge"), register(1, "Fog")
+    follower, issued, resets = follow(chain)
+    follower.poll()
+    chain.issue_token(edge, fog)
+    follower.poll()
+
+    chain.reorg(3)
+    follower.poll()
+    assert len(resets) == 2 and follower.last_block == 2 and issued == [(edge, fog)]
+
+
+def test_reorg_deeper_than_the_known_hashes(chain, register):
+    edge, fog = register(0, "Edge"), register(1, "Fog")
+
+    # With a start block, the events are read again from there.
+    follower, issued, resets = follow(chain, start_block=0, reorg_depth=1)
+    follower.poll()
+    chain.issue_token(edge, fog)
+    follower.poll()
+    chain.reorg(1, undo=lambda: chain.tokens.clear())
+    for index in range(4):
+        chain.register_node(f"M-{index}", f"other-{index}", "Fog", "0xpub", "0x" + f"{index + 100:040x}", "", "Cloud", f"0xother{index}")
+    chain.issue_token("0xother0", edge)
+    follower.poll()
+    assert len(resets) == 1 and issued == [(edge, fog), ("0xother0", edge)]
+
+    # Without one, the follower starts over at the head.
+    follower, issued, resets = follow(chain, reorg_depth=1)
+    follower.poll()
+    chain.reorg(2)
+    follower.poll()
+    assert len(resets) == 2 and follower.last_block is None
+    follower.poll()
+    assert len(resets) == 3 and follower.last_block == chain.head_block()
+
+
+def test_reorg_resets_the_registry_caches(registry, chain, register):
+    edge = register(0, "Edge")
+    cloud = registry.identity.get()["signature"]
+    issue_block = chain.issue_token(edge, cloud)["blockNumber"]
+    registry.chain_events.poll()
+    assert registry.get_capability_token(edge, cloud)["isIssued"]
+    assert registry.authorization.authorize(edge, "WRITE")["allowed"]
+
+    chain.reorg(issue_block, undo=lambda: chain.tokens.clear())
+    chain.register_node("M-0", "other-0", "Fog", "0xpub", "0x" + "ff" * 20, "", "Cloud", "0xother0")
+    chain.register_node("M-1", "other-1", "Fog", "0xpub", "0x" + "fe" * 20, "", "Cloud", "0xother1")
+    registry.chain_events.poll()
+    assert registry.token_cache.stats()["entries"] == 0
+    assert registry.authorization.stats()["cache"]["entries"] == 0
+    assert not registry.get_capability_token(edge, cloud)["isIssued"]
@@ -0,0 +1,151 @@
+"""ChainGateway against the compiled NodeRegistry contract.
+
+The bytecode of Node_cloud/data/NodeRegistry.json runs in py-evm (test/evm_rpc.py), so what is
+checked here is what the deployed contract returns, not what the emulator or the ABI promise.
+"""
+import os
+import sys
+import pytest
+
+pytest.importorskip("eth")
+pytest.importorskip("eth_tester")
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TEST_DIR)
+ARTIFACT = os.path.join(REPO_DIR, "Node_cloud", "data", "NodeRegistry.json")
+KEYS_FILE = os.path.join(REPO_DIR, "Node_cloud", "prefunded_keys.json")
+sys.path.insert(0, TEST_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "Node_cloud"))
+
+from evm_rpc import EvmRPC
+from chain_gateway import ChainError, ChainGateway
+from permission_matrix import NODE_TYPES, PermissionMatrix, parse_policy
+
+
+def node(index, node_type):
+    """registerNode arguments of a test node."""
+    return (f"N-{index}", f"node-{index}", node_type, f"0xpub{index}", "0x" + f"{index + 1:040x}",
+            f"http://10.0.0.{index}:8545", "Cloud", f"0xsig{index}")
+
+
+@pytest.fixture
+def gateway(tmp_path):
+    rpc = EvmRPC(ARTIFACT, str(tmp_path))
+    server = rpc.serve(port=0)
+    try:
+        # head_max_age=0: every read sees the block of the transaction just sent.
+        yield ChainGateway(f"http://127.0.0.1:{server.server_address[1]}", rpc.artifact_path, KEYS_FILE, head_max_age=0)
+    finally:
+        server.shutdown()
+
+
+def test_token_policies_match_the_permission_matrix(gateway):
+    node_types = NODE_TYPES[1:]
+    for index, node_type in enumerate(node_types):
+        gateway.register_node(*node(index, node_type))
+    pairs = [(f"0xsig{i}", f"0xsig{j}") for i in range(len(node_types)) for j in range(len(node_types)) if i != j]
+    events = {pair: gateway.issue_token(*pair)["event"] for pair in pairs}
+
+    matrix = PermissionMatrix()
+    for (from_signature, to_signature), token in zip(pairs, gateway.get_tokens(pairs)):
+        from_type, to_type = node_types[int(from_signature[5:])], node_types[int(to_signature[5:])]
+        assert token["isIssued"] and token["policy"] == events[(from_signature, to_signature)]["policy"]
+        parsed = parse_policy(token["policy"])
+        expected = matrix.mask(from_type, to_type)
+        if parsed is None:
+            assert expected == 0, f"{from_type}->{to_type}: {token['policy']!r}"
+        else:
+            assert parsed == (matrix.flow(from_type, to_type), expected), f"{from_type}->{to_type}: {token['policy']!r}"
+
+
+def separate_calls(gateway, from_signature, to_signature, validity_period):
+    """The state authorization_snapshot reads, read with one call per view as before the batch."""
+    try:
+        details = gateway.get_node_details(from_signature)
+    except ChainError:
+        details = None
+    return {
+        "registered": gateway.is_node_registered(from_signature),
+        "details": details,
+        "tokenAvailable": gateway.check_token(from_signature, to_signature),
+        "tokenExpired": gateway.is_token_expired(from_signature, to_signature, validity_period),
+        "token": gateway.get_token(from_signature, to_signature),
+    }
+
+
+def test_authorization_snapshot_matches_separate_calls(gateway):
+    def assert_snapshot(from_signature, to_signature, validity_period=60):
+        snapshot = gateway.authorization_snapshot(from_signature, to_signature, validity_period)
+        assert snapshot["deployed"]
+        assert {key: snapshot[key] for key in ("registered", "details", "tokenAvailable", "tokenExpired", "token")} == \
+            separate_calls(gateway, from_signature, to_signature, validity_period)
+        return snapshot
+
+    gateway.register_node(*node(0, "Edge"))
+    gateway.register_node(*node(1, "Fog"))
+
+    snapshot = assert_snapshot("0xsig9", "0xsig1")  # Unregistered.
+    assert not snapshot["registered"] and snapshot["details"] is None
+
+    snapshot = assert_snapshot("0xsig0", "0xsig1")  # Registered, no token.
+    assert snapshot["registered"] and snapshot["details"]["nodeType"] == str(NODE_TYPES.index("Edge"))
+    assert not snapshot["tokenAvailable"] and snapshot["tokenExpired"]
+
+    gateway.issue_token("0xsig0", "0xsig1")
+    snapshot = assert_snapshot("0xsig0", "0xsig1")
+    assert snapshot["tokenAvailable"] and not snapshot["tokenExpired"] and snapshot["token"]["policy"] == "Edge->Fog:READ,REMOVE"
+
+    gateway.rpc("evm_increaseTime", [120])
+    snapshot = assert_snapshot("0xsig0", "0xsig1")
+    assert snapshot["tokenAvailable"] and snapshot["tokenExpired"]
+
+    gateway.revoke_token("0xsig0", "0xsig1")
+    snapshot = assert_snapshot("0xsig0", "0xsig1")
+    assert not snapshot["tokenAvailable"] and snapshot["token"]["isRevoked"]
+
+
+def test_many_registrations_and_tokens(gateway):
+    assert gateway.are_nodes_registered([]) == []
+    assert gateway.get_tokens([]) == []
+
+    for index, node_type in enumerate(("Edge", "Fog", "Cloud")):
+        gateway.register_node(*node(index, node_type))
+    gateway.issue_token("0xsig0", "0xsig1")
+    gateway.issue_token("0xsig1", "0xsig2")
+    gateway.revoke_token("0xsig1", "0xsig2")
+
+    signatures = ["0xsig7", "0xsig0", "0xsig8", "0xsig2", "0xsig1", "0xsig0"]
+    assert gateway.are_nodes_registered(signatures) == [gateway.is_node_registered(signature) for signature in signatures]
+    assert gateway.are_nodes_registered(signatures, chunk_size=4) == [False, True, False, True, True, True]
+
+    pairs = [("0xsig0", "0xsig1"), ("0xsig7", "0xsig1"), ("0xsig1", "0xsig2"), ("0xsig0", "0xsig8"), ("0xsig2", "0xsig0")]
+    tokens = gateway.get_tokens(pairs, chunk_size=2)
+    assert tokens == [gateway.get_token(*pair) for pair in pairs]
+    assert [(token["isIssued"], token["isRevoked"]) for token in tokens] == [(True, False), (False, False), (True, True), (False, False), (False, False)]
+
+
+def test_renew_token(gateway):
+    gateway.register_node(*node(0, "Edge"))
+    gateway.register_node(*node(1, "Fog"))
+    first = gateway.issue_token("0xsig0", "0xsig1")["event"]
+
+    # Expired and active: revoked, then reissued.
+    gateway.rpc("evm_increaseTime", [120])
+    assert gateway.is_token_expired("0xsig0", "0xsig1", 60)
+    renewed = gateway.renew_token("0xsig0", "0xsig1")
+    assert renewed["event"]["policy"] == "Edge->Fog:READ,REMOVE" and renewed["event"]["issuedAt"] > first["issuedAt"]
+    assert not gateway.is_token_expired("0xsig0", "0xsig1", 60)
+    revoked = gateway.get_contract_logs(["TokenRevoked"], 0, gateway.head_block())
+    assert [event["args"]["fromNodeSignature"] for event in revoked] == ["0xsig0"]
+
+    # Already revoked (as by a concurrent renewal): the revert is ignored and the token reissued.
+    gateway.revoke_token("0xsig0", "0xsig1")
+    assert gateway.revert_reason("revokeToken", "0xsig0", "0xsig1") == "Token already revoked"
+    renewed = gateway.renew_token("0xsig0", "0xsig1")
+    assert gateway.check_token("0xsig0", "0xsig1") and renewed["event"]["toNodeSignature"] == "0xsig1"
+
+    # Any other revert is raised and nothing is issued.
+    assert gateway.revert_reason("revokeToken", "0xsig1", "0xsig0") == "Token not issued"
+    with pytest.raises(ChainError, match="reverted"):
+        gateway.renew_token("0xsig1", "0xsig0")
+    assert not gateway.get_token("0xsig1", "0xsig0")["isIssued"]
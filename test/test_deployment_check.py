@@ -0,0 +1,82 @@
+"""DeploymentCheck on a StubChain: the memoized answer and the artifact changes that drop it."""
+import json
+import os
+import pytest
+from deployment_check import DeploymentCheck
+
+from conftest import CLOUD_DIR
+
+
+@pytest.fixture
+def artifact(tmp_path):
+    """A copy of the deployed artifact and a write(address) that replaces it."""
+    with open(os.path.join(CLOUD_DIR, "data", "NodeRegistry.json"), "r") as artifact_file:
+        content = json.load(artifact_file)
+    path = str(tmp_path / "NodeRegistry.json")
+
+    def write(address=None):
+        if address is not None:
+            content["networks"][next(iter(content["networks"]))]["address"] = address
+        with open(path + ".tmp", "w") as artifact_file:
+            json.dump(content, artifact_file)
+        os.replace(path + ".tmp", path)
+    write()
+    return path, write
+
+
+def counted(chain, monkeypatch, answers=None):
+    """Counts check_if_deployed calls; `answers` (a list) gives their results in turn."""
+    checks = []
+    monkeypatch.setattr(chain, "check_if_deployed", lambda: checks.append(1) or (answers.pop(0) if answers else True))
+    return checks
+
+
+def test_positive_answer_is_memoized(chain, monkeypatch, artifact):
+    checks = counted(chain, monkeypatch)
+    deployment = DeploymentCheck(chain, artifact[0])
+    assert deployment.is_deployed() and deployment.is_deployed()
+    assert len(checks) == 1
+
+    deployment.invalidate()
+    assert deployment.is_deployed() and len(checks) == 2
+
+
+def test_negative_answer_is_not_memoized(chain, monkeypatch, artifact):
+    checks = counted(chain, monkeypatch, answers=[False, False, True])
+    deployment = DeploymentCheck(chain, artifact[0])
+    assert not deployment.is_deployed() and not deployment.is_deployed()
+    assert deployment.is_deployed() and deployment.is_deployed()
+    assert len(checks) == 3
+
+
+def test_changed_artifact(chain, monkeypatch, artifact):
+    path, write = artifact
+    checks = counted(chain, monkeypatch)
+    deployment = DeploymentCheck(chain, path)
+    changes = []
+    deployment.on_change(lambda: changes.append(1))
+    deployment.is_deployed()
+
+    # Rewritten with the same content: a new stat, but still the same contract.
+    write()
+    assert deployment.is_deployed() and len(checks) == 1 and changes == []
+
+    write("0x" + "11" * 20)
+    assert deployment.is_deployed() and len(checks) == 2 and changes == [1]
+
+
+def test_missing_artifact(chain, monkeypatch, artifact):
+    path, write = artifact
+    checks = counted(chain, monkeypatch)
+    deployment = DeploymentCheck(chain, path)
+    changes = []
+    deployment.on_change(lambda: changes.append(1))
+    deployment.is_deployed()
+
+    os.unlink(path)
+    assert not deployment.is_deployed() and changes == [1]
+    assert not deployment.is_deployed() and len(checks) == 1
+
+    # The redeployed artifact is checked again; it is the first contract seen since the removal.
+    write("0x" + "22" * 20)
+    assert deployment.is_deployed() and len(checks) == 2 and changes == [1]
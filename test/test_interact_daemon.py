@@ -0,0 +1,160 @@
+"""InteractDaemon against a stand-in for `node interact.js daemon` that answers from a StubChain.
+
+The stand-in speaks the daemon protocol of interact.js (one JSON request per stdin line, one
+JSON response per stdout line, matched by id) and forwards every request to the StubChain of
+the test over HTTP, so the tests need Node.js but not web3 or a Besu node.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from chain_gateway import ChainError
+from interact_daemon import InteractDaemon
+
+from conftest import CLOUD_DIR, node
+
+if shutil.which("node") is None:
+    pytest.skip("Node.js is not installed", allow_module_level=True)
+
+STAND_IN = r"""
+const http = require("http");
+const readline = require("readline");
+const respond = (response) => process.stdout.write(JSON.stringify(response) + "\n");
+console.log("Human-readable output the client skips.");
+readline.createInterface({ input: process.stdin, terminal: false }).on("line", (line) => {
+    const request = JSON.parse(line);
+    if (request.method === "crash") {
+        process.exit(1);
+    }
+    const body = JSON.stringify({ method: request.method, params: request.params, account: process.env.PREFUNDED_ACCOUNT_INDEX });
+    http.request(process.env.STUB_CHAIN_URL, { method: "POST" }, (response) => {
+        let data = "";
+        response.on("data", chunk => data += chunk);
+        response.on("end", () => respond(Object.assign({ id: request.id }, JSON.parse(data))));
+    }).end(body);
+}).on("close", () => process.exit(0));
+respond({ id: null, event: "ready" });
+"""
+
+
+@pytest.fixture
+def daemon(chain, tmp_path, monkeypatch):
+    """An InteractDaemon on the stand-in, and the list of (method, account index) it received."""
+    methods = {
+        "registerNode": chain.register_node,
+        "isNodeRegistered": chain.is_node_registered,
+        "getCapabilityToken": chain.get_token,
+        "issueCapabilityToken": chain.issue_token,
+        "revokeCapabilityToken": chain.revoke_token,
+        "getBlockNumber": chain.head_block,
+        "sleep": lambda seconds, value: time.sleep(seconds) or value,
+    }
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            received.append((request["method"], request["account"]))
+            try:
+                response = {"result": methods[request["method"]](*request["params"])}
+            except Exception as e:
+                response = {"error": {"message": str(e)}}
+            body = json.dumps(response).encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv("STUB_CHAIN_URL", f"http://127.0.0.1:{server.server_address[1]}/")
+    (tmp_path / "interact.js").write_text(STAND_IN)
+    (tmp_path / "data").mkdir()
+    shutil.copy(os.path.join(CLOUD_DIR, "data", "NodeRegistry.json"), tmp_path / "data" / "NodeRegistry.json")
+
+    interact = InteractDaemon(str(tmp_path / "interact.js"), timeout=10, account_index=2)
+    try:
+        yield interact, received
+    finally:
+        interact.close()
+        server.shutdown()
+
+
+def test_calls_reach_the_chain(daemon, chain):
+    interact, received = daemon
+    interact.register_node(*node(0, "Edge"))
+    interact.register_node(*node(1, "Fog"))
+    assert interact.is_node_registered("0xsig0") and not interact.is_node_registered("0xsig9")
+
+    result = interact.issue_token("0xsig0", "0xsig1")
+    assert result["event"]["policy"] == "Edge->Fog:READ,REMOVE"
+    assert interact.get_token("0xsig0", "0xsig1")["isIssued"]
+    # One warm process for all calls, sending from the account it was given.
+    assert {account for _, account in received} == {"2"}
+
+
+def test_concurrent_requests_are_matched_by_id(daemon):
+    interact, received = daemon
+    results = {}
+    # The first request sent is answered last.
+    threads = [threading.Thread(target=lambda index=index: results.update({index: interact.request("sleep", 0.5 - index * 0.05, index)}))
+               for index in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == {index: index for index in range(10)}
+
+
+def test_errors_are_raised_as_chain_errors(daemon, chain):
+    interact, _ = daemon
+    interact.register_node(*node(0, "Edge"))
+    interact.register_node(*node(1, "Fog"))
+    with pytest.raises(ChainError, match="Token not issued"):
+        interact.revoke_token("0xsig0", "0xsig1")
+    with pytest.raises(ChainError, match="unknown"):
+        interact.request("unknown")
+
+
+def test_crashed_daemon_is_restarted(daemon):
+    interact, _ = daemon
+    interact.is_node_registered("0xsig0")
+    first = interact.process
+    with pytest.raises(ChainError, match="exited"):
+        interact.request("crash")
+    assert not interact.is_node_registered("0xsig0")
+    assert interact.process is not first and interact.process.poll() is None
+
+
+def test_changed_artifact_restarts_the_daemon(daemon):
+    interact, _ = daemon
+    interact.is_node_registered("0xsig0")
+    first = interact.process
+    stat = os.stat(interact.artifact_path)
+    os.utime(interact.artifact_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+    interact.is_node_registered("0xsig0")
+    assert interact.process is not first
+    first.wait(5)
+
+
+def test_transaction_waits_for_its_confirmations(daemon, chain):
+    interact, _ = daemon
+    interact.register_node(*node(0, "Edge"))
+    interact.register_node(*node(1, "Fog"))
+    interact.confirmations = 2
+
+    def mine():
+        for address in ("0x" + "aa" * 20, "0x" + "bb" * 20):
+            time.sleep(0.3)
+            chain.emit_validator_proposal(address)
+    miner = threading.Thread(target=mine)
+    miner.start()
+    result = interact.issue_token("0xsig0", "0xsig1")
+    miner.join()
+    assert chain.head_block() >= result["blockNumber"] + 2
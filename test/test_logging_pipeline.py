@@ -0,0 +1,95 @@
+"""logging_pipeline: the queue handler, the writer thread and the per-route DEBUG sampling."""
+import logging
+import queue
+import pytest
+import logging_pipeline
+from logging_pipeline import DebugSampleFilter, DroppingQueueHandler, RouteSampler
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """Runs setup_logging() against a clean module state and takes its handler off the root logger afterwards."""
+    root = logging.getLogger()
+    level = root.level
+    for name in ("_pid", "_handler", "_listener"):
+        monkeypatch.setattr(logging_pipeline, name, None)
+    yield
+    logging_pipeline.stop_logging()
+    root.removeHandler(logging_pipeline._handler)
+    root.setLevel(level)
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = DroppingQueueHandler(queue.Queue(2))
+    logger = logging.getLogger("test_logging_pipeline.full")
+    logger.propagate = False
+    logger.addHandler(handler)
+    try:
+        for index in range(5):
+            logger.warning("record %d", index)
+    finally:
+        logger.removeHandler(handler)
+    assert handler.queue.qsize() == 2 and handler.dropped == 3
+
+
+def test_records_are_written_by_the_listener(pipeline, capsys):
+    handler = logging_pipeline.setup_logging("debug")
+    assert logging_pipeline.setup_logging() is handler
+    logging.getLogger("test_logging_pipeline").debug("through the queue")
+    logging_pipeline.stop_logging()
+    out = capsys.readouterr().out
+    assert "DEBUG test_logging_pipeline: through the queue" in out
+    assert logging_pipeline.stats() == {"level": "DEBUG", "dropped": 0}
+
+
+def test_sample_rates_from_the_environment(monkeypatch):
+    monkeypatch.setenv("LOG_DEBUG_SAMPLE", "/read=0.01, /register-node/<job_id>=1,*=0.1,malformed")
+    sampler = RouteSampler.from_env()
+    assert sampler.rate("/read") == 0.01 and sampler.rate("/register-node/<job_id>") == 1
+    assert sampler.rate("/write") == 0.1
+    monkeypatch.delenv("LOG_DEBUG_SAMPLE")
+    assert RouteSampler.from_env().rate("/read") == 1
+
+
+def test_debug_records_of_unsampled_routes_are_dropped():
+    flask = pytest.importorskip("flask")
+    app = flask.Flask(__name__)
+    RouteSampler({"/quiet/<item>": 0, "/sampled": 0.5}).install(app)
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    handler.addFilter(DebugSampleFilter())
+    logger = logging.getLogger("test_logging_pipeline.routes")
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    logger.addHandler(handler)
+
+    @app.route("/quiet/<item>")
+    def quiet(item):
+        logger.debug("quiet debug")
+        logger.info("quiet info")
+        return ""
+
+    @app.route("/loud")
+    def loud():
+        logger.debug("loud debug")
+        return ""
+
+    @app.route("/sampled")
+    def sampled():
+        logger.debug("sampled debug")
+        return ""
+
+    client = app.test_client()
+    try:
+        client.get("/quiet/1")
+        client.get("/loud")
+        client.get("/quiet/2")
+        for _ in range(200):
+            client.get("/sampled")
+    finally:
+        logger.removeHandler(handler)
+    messages = [record.getMessage() for record in records]
+    # Only DEBUG is sampled: INFO and above are always written.
+    assert messages[:3] == ["quiet info", "loud debug", "quiet info"]
+    assert 50 < messages.count("sampled debug") < 150
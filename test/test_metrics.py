@@ -0,0 +1,110 @@
+"""Metrics: the Prometheus text output, the timed wrappers and the /metrics route of the registry."""
+import json
+import os
+import pytest
+from metrics import Metrics
+
+
+def family_lines(text, name):
+    """The lines of the metric families whose names start with `name`, comments included."""
+    return [line for line in text.splitlines() if line.split(" ")[2 if line.startswith("#") else 0].startswith(name)]
+
+
+def test_histogram_text():
+    metrics = Metrics("t")
+    latency = metrics.histogram("latency_seconds", "Latency.", ("stage",), buckets=(1, 2, 4))
+    for value in (0.5, 1.5, 3, 3):
+        latency.observe(value, "x")
+    assert family_lines(metrics.render(), "t_latency_seconds") == [
+        "# HELP t_latency_seconds Latency.",
+        "# TYPE t_latency_seconds histogram",
+        't_latency_seconds_bucket{stage="x",le="1"} 1',
+        't_latency_seconds_bucket{stage="x",le="2"} 2',
+        't_latency_seconds_bucket{stage="x",le="4"} 4',
+        't_latency_seconds_bucket{stage="x",le="+Inf"} 4',
+        't_latency_seconds_sum{stage="x"} 8.000000',
+        't_latency_seconds_count{stage="x"} 4',
+        "# HELP t_latency_seconds_quantile Latency. (p50/p95/p99 estimated from the buckets)",
+        "# TYPE t_latency_seconds_quantile gauge",
+        't_latency_seconds_quantile{stage="x",quantile="0.5"} 2.000000',
+        't_latency_seconds_quantile{stage="x",quantile="0.95"} 3.800000',
+        't_latency_seconds_quantile{stage="x",quantile="0.99"} 3.960000',
+    ]
+
+
+def test_counter_text_and_label_escaping():
+    metrics = Metrics("t")
+    requests = metrics.counter("requests_total", "Requests.", ("route",))
+    requests.inc('/a"b\\c')
+    requests.inc('/a"b\\c', amount=2)
+    assert family_lines(metrics.render(), "t_requests_total") == [
+        "# HELP t_requests_total Requests.",
+        "# TYPE t_requests_total counter",
+        't_requests_total{route="/a\\"b\\\\c"} 3',
+    ]
+
+
+def test_timed_counts_errors_and_in_flight():
+    metrics = Metrics("t")
+
+    def fail():
+        raise ValueError("boom")
+
+    timed_fail = metrics.timed("stage", "fail", fail)
+    with pytest.raises(ValueError):
+        timed_fail()
+    assert metrics.timed("stage", "ok", lambda: 42)() == 42
+    text = metrics.render()
+    assert 't_stage_errors_total{stage="fail"} 1' in text
+    assert 't_stage_duration_seconds_count{stage="fail"} 1' in text
+    assert 't_stage_duration_seconds_count{stage="ok"} 1' in text
+    assert 't_stage_in_flight{stage="fail"} 0' in text and 't_stage_in_flight{stage="ok"} 0' in text
+
+
+def test_shared_series_are_summed(tmp_path):
+    metrics = Metrics("t")
+    requests = metrics.counter("requests_total", "Requests.", ("route",))
+    requests.inc("/read")
+    metrics.share(str(tmp_path), interval=60)
+    # Another live worker (the parent process stands in for it) and one that is gone.
+    other = {"t_requests_total": [[["/read"], 2], [["/write"], 1]]}
+    with open(os.path.join(tmp_path, f"metrics-{os.getppid()}.json"), "w") as snapshot_file:
+        json.dump(other, snapshot_file)
+    gone = os.path.join(tmp_path, "metrics-999999999.json")
+    with open(gone, "w") as snapshot_file:
+        json.dump(other, snapshot_file)
+
+    text = metrics.render()
+    assert 't_requests_total{route="/read"} 3' in text and 't_requests_total{route="/write"} 1' in text
+    assert not os.path.exists(gone)
+
+
+def test_gone_worker_removed_by_another(tmp_path, monkeypatch):
+    metrics = Metrics("t")
+    metrics.counter("requests_total", "Requests.", ("route",)).inc("/read")
+    metrics.share(str(tmp_path), interval=60)
+    with open(os.path.join(tmp_path, "metrics-999999999.json"), "w") as snapshot_file:
+        json.dump({"t_requests_total": [[["/read"], 2]]}, snapshot_file)
+
+    # Both workers see the file; the other one unlinks it first.
+    unlink = os.unlink
+    def unlink_twice(path):
+        unlink(path)
+        unlink(path)
+    monkeypatch.setattr(os, "unlink", unlink_twice)
+    assert 't_requests_total{route="/read"} 1' in metrics.render()
+
+
+def test_registry_metrics_route(registry, register):
+    client = registry.app.test_client()
+    edge = register(0, "Edge")
+    client.get("/read", query_string={"signature": edge, "node_id": "N-0", "node_name": "node-0"})
+    client.get("/read")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200 and response.mimetype == "text/plain"
+    text = response.get_data(as_text=True)
+    assert 'node_registry_http_requests_total{route="/read",method="GET",status="200"} 1' in text
+    assert 'node_registry_http_requests_total{route="/read",method="GET",status="400"} 1' in text
+    assert 'node_registry_http_request_duration_seconds_count{route="/read",method="GET"} 2' in text
+    assert 'node_registry_stage_duration_seconds_count{stage="authorization_snapshot"} 1' in text
@@ -0,0 +1,65 @@
+"""NodeDirectory on its own and as the registry keeps it from the NodeRegistered events of a StubChain."""
+from node_directory import NodeDirectory
+
+
+def details(signature, node_id, address):
+    return {"nodeId": node_id, "nodeName": node_id, "nodeType": "3", "publicKey": "0xpub", "isRegistered": True,
+            "registeredBy": address, "nodeSignature": signature, "registeredByNodeType": "1"}
+
+
+def test_lookups_and_replaced_registrations():
+    directory = NodeDirectory()
+    directory.put(details("0xa", "N-0", "0xAA"))
+    assert directory.get("0xa")["nodeId"] == "N-0"
+    assert directory.get_by_node_id("N-0")["nodeSignature"] == "0xa"
+    assert directory.get_by_address("0xaa")["nodeSignature"] == "0xa"
+
+    # A newer registration of the same node ID drops the older one, and its address with it.
+    directory.put(details("0xb", "N-0", "0xBB"))
+    assert directory.get("0xa") is None and directory.get_by_address("0xaa") is None
+    assert directory.get_by_node_id("N-0")["nodeSignature"] == "0xb"
+
+    directory.forget("0xb")
+    assert directory.get("0xb") is None and directory.get_by_node_id("N-0") is None
+
+
+def test_negative_entries():
+    directory = NodeDirectory(negative_ttl=60)
+    directory.put_unregistered("0xa")
+    assert directory.is_unregistered("0xa")
+    directory.put(details("0xa", "N-0", "0xAA"))
+    assert not directory.is_unregistered("0xa")
+
+    directory = NodeDirectory(negative_ttl=0)
+    directory.put_unregistered("0xa")
+    assert not directory.is_unregistered("0xa") and directory.stats()["negative_entries"] == 0
+
+
+def test_bounded():
+    directory = NodeDirectory(max_entries=2)
+    for index in range(3):
+        directory.put(details(f"0x{index}", f"N-{index}", f"0x{index:040x}"))
+    assert directory.get("0x0") is None and directory.get_by_node_id("N-0") is None
+    assert directory.get("0x2") is not None and directory.stats()["entries"] == 2
+
+
+def test_registry_answers_from_the_directory_until_a_registration_event(registry, chain, register):
+    edge = register(0, "Edge")
+    registry.chain_events.poll()
+    assert registry.get_node_details_js(edge)[0]["details"]["nodeId"] == "N-0"
+    assert registry.is_node_registered_js("0xsig1")[0]["registered"] is False
+
+    calls = chain.calls
+    assert registry.is_node_registered_js(edge)[0]["registered"] is True
+    assert registry.get_node_details_js(edge)[0]["details"]["nodeId"] == "N-0"
+    assert registry.is_node_registered_js("0xsig1")[0]["registered"] is False
+    assert chain.calls == calls
+
+    # Registered through another registry: the NodeRegistered event replaces the negative entry.
+    fog = register(1, "Fog")
+    assert registry.is_node_registered_js(fog)[0]["registered"] is False
+    registry.chain_events.poll()
+    calls = chain.calls
+    assert registry.is_node_registered_js(fog)[0]["registered"] is True
+    assert registry.get_node_details_js(fog)[0]["details"]["nodeType"] == "2"
+    assert chain.calls == calls
@@ -0,0 +1,71 @@
+"""NodeIdentity's cached node-details.json and write_node_details, its atomic writer."""
+import json
+import os
+import threading
+import node_identity
+from node_identity import NodeIdentity, write_node_details
+
+
+def details(index):
+    return {"node_id": f"N-{index}", "node_name": f"node-{index}", "node_type": "Edge", "signature": f"0xsig{index}"}
+
+
+def test_file_is_parsed_again_only_when_it_changes(tmp_path, monkeypatch):
+    path = str(tmp_path / "node-details.json")
+    identity = NodeIdentity(path)
+    assert identity.get() is None
+
+    loads = []
+    load = json.load
+    monkeypatch.setattr(node_identity.json, "load", lambda json_file: loads.append(1) or load(json_file))
+    write_node_details(path, details(0))
+    assert identity.get() == details(0) and identity.get() == details(0)
+    assert len(loads) == 1
+
+    write_node_details(path, details(1))
+    assert identity.get() == details(1) and len(loads) == 2
+
+    os.unlink(path)
+    assert identity.get() is None
+
+
+def test_unparsable_file_keeps_the_previous_details(tmp_path):
+    path = str(tmp_path / "node-details.json")
+    identity = NodeIdentity(path)
+    write_node_details(path, details(0))
+    identity.get()
+
+    # A writer that truncates and rewrites in place, half-way through.
+    with open(path, "w") as json_file:
+        json_file.write('{"node_id": ')
+    assert identity.get() == details(0)
+    with open(path, "w") as json_file:
+        json.dump(details(1), json_file)
+    assert identity.get() == details(1)
+
+
+def test_write_node_details_replaces_the_file_atomically(tmp_path):
+    path = str(tmp_path / "node-details.json")
+    write_node_details(path, details(0))
+    with open(path, "r") as json_file:
+        assert json_file.read() == json.dumps(details(0), indent=4)
+
+    identity = NodeIdentity(path)
+    seen = []
+    done = threading.Event()
+
+    def read():
+        while not done.is_set():
+            seen.append(identity.get())
+    reader = threading.Thread(target=read)
+    reader.start()
+    try:
+        for index in range(1, 200):
+            write_node_details(path, details(index))
+    finally:
+        done.set()
+        reader.join()
+    # Never a missing or partial file, and no temporary file left behind.
+    assert all(entry in [details(index) for index in range(200)] for entry in seen)
+    assert identity.get() == details(199)
+    assert os.listdir(tmp_path) == ["node-details.json"]
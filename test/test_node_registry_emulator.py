@@ -0,0 +1,252 @@
+"""Conformance of test/node_registry_emulator.py with the compiled NodeRegistry contract.
+
+The same transactions and calls run against the emulator and against the bytecode of
+Node_cloud/data/NodeRegistry.json in py-evm (eth-tester); return data, revert data and logs
+must match byte for byte. The last test drives the emulator's JSON-RPC endpoint with
+ChainGateway, as the registry does.
+"""
+import ast
+import json
+import os
+import sys
+import threading
+import warnings
+import pytest
+
+pytest.importorskip("eth")
+eth_tester = pytest.importorskip("eth_tester")
+from eth_abi import encode
+from eth_tester.exceptions import TransactionFailed
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TEST_DIR)
+ARTIFACT = os.path.join(REPO_DIR, "Node_cloud", "data", "NodeRegistry.json")
+sys.path.insert(0, TEST_DIR)
+
+from node_registry_emulator import ERROR_SELECTOR, NODE_TYPES, ContractABI, EmulatorRPC, Message, NodeRegistryContract, Revert, from_artifact
+
+
+class Twin:
+    """The compiled contract in py-evm and the emulator, driven in lockstep."""
+
+    def __init__(self):
+        warnings.filterwarnings("ignore", module="eth_tester")
+        with open(ARTIFACT, "r") as artifact_file:
+            artifact = json.load(artifact_file)
+        self.tester = eth_tester.EthereumTester(eth_tester.PyEVMBackend())
+        self.sender = self.tester.get_accounts()[0]
+        tx_hash = self.tester.send_transaction({"from": self.sender, "data": artifact["bytecode"], "gas": 6000000})
+        self.address = self.tester.get_transaction_receipt(tx_hash)["contract_address"]
+        self.abi = ContractABI(artifact["abi"])
+        self.entries = {entry["name"]: entry for entry in artifact["abi"] if entry["type"] == "function"}
+        self.contract = NodeRegistryContract()
+
+    def calldata(self, name, *args):
+        entry = self.entries[name]
+        selector = next(selector for selector, function in self.abi.functions.items() if function is entry)
+        return selector + encode([param["type"] for param in entry["inputs"]], list(args))
+
+    @staticmethod
+    def revert_data(error):
+        """eth-tester gives the reason of an Error(string) revert, and the repr of any other payload."""
+        message = str(error.args[0]) if error.args else ""
+        if message.startswith("b'") or message.startswith('b"'):
+            return ast.literal_eval(message)
+        return ERROR_SELECTOR + encode(["string"], [message])
+
+    def _emulate(self, data, block):
+        message = Message(self.sender, block["timestamp"], block["number"])
+        try:
+            output = self.abi.execute(self.contract, message, data)
+        except Revert as e:
+            return ("revert", e.data), message
+        return ("ok", output), message
+
+    def transact(self, name, *args, data=None):
+        """Sends the transaction to both; returns (evm, emulator) outcomes: ("ok", logs) or ("revert", data)."""
+        data = self.calldata(name, *args) if data is None else data
+        try:
+            self.tester.call({"from": self.sender, "to": self.address, "data": "0x" + data.hex()})
+            evm_revert = None
+        except TransactionFailed as e:
+            evm_revert = self.revert_data(e)
+        tx_hash = self.tester.send_transaction({"from": self.sender, "to": self.address, "data": "0x" + data.hex(), "gas": 3000000})
+        receipt = self.tester.get_transaction_receipt(tx_hash)
+        if receipt["status"]:
+            evm = ("ok", [([bytes.fromhex(topic[2:]) for topic in log["topics"]], bytes.fromhex(log["data"][2:])) for log in receipt["logs"]])
+        else:
+            evm = ("revert", evm_revert)
+
+        emulated, message = self._emulate(data, self.tester.get_block_by_number(receipt["block_number"]))
+        if emulated[0] == "ok":
+            emulated = ("ok", [self.abi.log(event, args) for event, args in message.events])
+        return evm, emulated
+
+    def call(self, name, *args, data=None):
+        """eth_call at the latest block on both; returns (evm, emulator) outcomes: ("ok", output) or ("revert", data)."""
+        data = self.calldata(name, *args) if data is None else data
+        try:
+            output = self.tester.call({"from": self.sender, "to": self.address, "data": "0x" + data.hex()})
+            evm = ("ok", bytes.fromhex(output[2:]))
+        except TransactionFailed as e:
+            evm = ("revert", self.revert_data(e))
+        emulated, _ = self._emulate(data, self.tester.get_block_by_number("latest"))
+        return evm, emulated
+
+    def latest_timestamp(self):
+        return self.tester.get_block_by_number("latest")["timestamp"]
+
+    def time_travel(self, seconds):
+        self.tester.time_travel(self.latest_timestamp() + seconds)
+
+
+def node(index, node_type, signature=None, node_id=None):
+    """registerNode arguments of a test node."""
+    return (node_id or f"N-{index}", f"node-{index}", node_type, f"0xpub{index}", "0x" + f"{index + 1:040x}",
+            f"http://10.0.0.{index}:8545", "Cloud", signature or f"0xsig{index}")
+
+
+@pytest.fixture
+def twin():
+    return Twin()
+
+
+def assert_same(twin, method, name, *args, **kwargs):
+    evm, emulated = getattr(twin, method)(name, *args, **kwargs)
+    assert emulated == evm, f"{name}{args}"
+    return evm
+
+
+def test_every_contract_function_is_emulated(twin):
+    for name in twin.entries:
+        assert callable(getattr(NodeRegistryContract, name, None)), name
+
+
+def test_register_node(twin):
+    for index, node_type in enumerate(NODE_TYPES):
+        assert_same(twin, "transact", "registerNode", *node(index, node_type))
+    assert_same(twin, "transact", "registerNode", *node(1, "Fog"))  # Signature already registered.
+    assert_same(twin, "transact", "registerNode", *node(10, "fog"))
+    assert_same(twin, "transact", "registerNode", *node(11, "Fog")[:6], "Gateway", "0xsig11")
+    # A node id registered again under another signature: the first signature is orphaned.
+    assert_same(twin, "transact", "registerNode", *node(12, "Edge", node_id="N-2"))
+    assert_same(twin, "transact", "registerNode", *node(13, "Sensor", node_id=""))
+
+    for index in range(14):
+        signature = f"0xsig{index}"
+        for name in ("isNodeRegistered", "getNodeDetailsBySignature", "isValidator", "nodeSignatureToNodeId"):
+            assert_same(twin, "call", name, signature)
+        assert_same(twin, "call", "iotNodes", f"N-{index}")
+        address = "0x" + f"{index + 1:040x}"
+        for name in ("getNodeDetailsByAddress", "addressToNodeId", "nodeRpcUrls"):
+            assert_same(twin, "call", name, address)
+    assert_same(twin, "call", "iotNodes", "")
+
+
+def test_token_policies(twin):
+    signatures = ["0xunregistered"]
+    for index, node_type in enumerate(NODE_TYPES[1:]):
+        assert_same(twin, "transact", "registerNode", *node(index, node_type))
+        signatures.append(f"0xsig{index}")
+
+    for from_signature in signatures:
+        for to_signature in signatures:
+            assert_same(twin, "transact", "issueToken", from_signature, to_signature)
+            assert_same(twin, "call", "getToken", from_signature, to_signature)
+            assert_same(twin, "call", "checkToken", from_signature, to_signature)
+            assert_same(twin, "call", "capabilityTokens", NodeRegistryContract.token_id(from_signature, to_signature))
+
+
+def test_token_lifecycle(twin):
+    assert_same(twin, "transact", "registerNode", *node(0, "Fog"))
+    assert_same(twin, "transact", "registerNode", *node(1, "Cloud"))
+    pair = ("0xsig0", "0xsig1")
+    assert_same(twin, "transact", "revokeToken", *pair)  # Not issued.
+    assert_same(twin, "transact", "issueToken", *pair)
+    assert_same(twin, "transact", "issueToken", *pair)  # Already issued and active.
+    assert_same(twin, "transact", "revokeToken", *pair)
+    assert_same(twin, "transact", "revokeToken", *pair)  # Already revoked.
+    for name in ("getToken", "checkToken"):
+        assert_same(twin, "call", name, *pair)
+    assert_same(twin, "transact", "issueToken", *pair)  # Issued again after the revocation.
+    assert_same(twin, "call", "getToken", *pair)
+
+    # abi.encodePacked: ("ab", "c") and ("a", "bc") are the same token.
+    assert_same(twin, "transact", "issueToken", "ab", "c")
+    assert_same(twin, "transact", "issueToken", "a", "bc")
+    assert_same(twin, "call", "checkToken", "a", "bc")
+
+
+def test_token_expiry(twin):
+    assert_same(twin, "transact", "registerNode", *node(0, "Edge"))
+    assert_same(twin, "transact", "registerNode", *node(1, "Fog"))
+    assert_same(twin, "transact", "issueToken", "0xsig0", "0xsig1")
+    assert_same(twin, "call", "isTokenExpired", "0xsig1", "0xsig0", 100)  # Never issued.
+
+    twin.time_travel(50)
+    _, issued_at, _, _ = twin.contract.getToken(None, "0xsig0", "0xsig1")
+    elapsed = twin.latest_timestamp() - issued_at
+    for validity in (0, elapsed - 1, elapsed, elapsed + 1, 2 ** 255, 2 ** 256 - 1 - issued_at, 2 ** 256 - 1):
+        assert_same(twin, "call", "isTokenExpired", "0xsig0", "0xsig1", validity)
+
+    assert_same(twin, "transact", "revokeToken", "0xsig0", "0xsig1")
+    assert_same(twin, "call", "isTokenExpired", "0xsig0", "0xsig1", 2 ** 256 - 1)
+
+
+def test_propose_validator_and_bad_calldata(twin):
+    assert_same(twin, "transact", "proposeValidator", "0x" + "00" * 20)
+    assert_same(twin, "transact", "proposeValidator", "0x" + "ab" * 20)
+    assert_same(twin, "call", "proposeValidator", "0x" + "ab" * 20)
+    assert_same(twin, "call", "isNodeRegistered", data=bytes.fromhex("deadbeef"))
+    assert_same(twin, "call", "isNodeRegistered", data=twin.calldata("isNodeRegistered", "0xsig")[:40])
+    assert_same(twin, "transact", "issueToken", data=twin.calldata("issueToken", "a", "b")[:-32])
+
+
+def test_chain_gateway_on_the_emulator():
+    sys.path.insert(0, os.path.join(REPO_DIR, "Node_cloud"))
+    from chain_gateway import ChainError, ChainGateway
+
+    chain = from_artifact(ARTIFACT, validators=["0x" + "aa" * 20])
+    server = EmulatorRPC(chain).serve(port=0)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        gateway = ChainGateway(url, ARTIFACT, os.path.join(REPO_DIR, "Node_cloud", "prefunded_keys.json"))
+        assert gateway.check_if_deployed()
+
+        # Concurrent senders: nonces are allocated locally and may reach the pool out of order.
+        errors = []
+
+        def register(index):
+            try:
+                gateway.register_node(*node(index, "Fog" if index % 2 else "Edge"))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=register, args=(index,)) for index in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+        assert gateway.are_nodes_registered([f"0xsig{index}" for index in range(21)]) == [True] * 20 + [False]
+        assert gateway.get_node_details("0xsig3")["nodeType"] == str(NODE_TYPES.index("Fog"))
+        with pytest.raises(ChainError, match="No matching node registered with this signature"):
+            gateway.get_node_details("0xsig99")
+        with pytest.raises(ChainError, match="reverted"):
+            gateway.register_node(*node(3, "Fog"))
+
+        issued = gateway.issue_token("0xsig1", "0xsig2")
+        assert issued["event"]["policy"] == "Fog->Edge:READ,UPDATE"
+        snapshot = gateway.authorization_snapshot("0xsig1", "0xsig2", 60)
+        assert snapshot["registered"] and snapshot["tokenAvailable"] and not snapshot["tokenExpired"]
+        gateway.rpc("evm_increaseTime", [120])
+        gateway.rpc("evm_mine")
+        assert gateway.is_token_expired("0xsig1", "0xsig2", 60)
+
+        events = gateway.get_contract_logs(["NodeRegistered", "TokenIssued"], 0, chain.head())
+        assert [event["event"] for event in events].count("NodeRegistered") == 20
+        assert events[-1]["args"]["issuedAt"] == issued["event"]["issuedAt"]
+        assert gateway.get_validators() == ["0x" + "aa" * 20]
+        assert gateway.get_rpc_url_mappings()["0x" + f"{4:040x}"] == "http://10.0.0.3:8545"
+    finally:
+        server.shutdown()
@@ -0,0 +1,146 @@
+"""NonceManager on its own, and ChainGateway's nonces against the emulator's transaction pool."""
+import os
+import threading
+import pytest
+from nonce_manager import NonceManager
+
+from conftest import CLOUD_DIR, node
+
+ARTIFACT = os.path.join(CLOUD_DIR, "data", "NodeRegistry.json")
+KEYS_FILE = os.path.join(CLOUD_DIR, "prefunded_keys.json")
+
+
+class PendingCount:
+    """fetch_pending_nonce of a NonceManager: the count it returns and the URLs it was read from."""
+
+    def __init__(self, count):
+        self.count = count
+        self.urls = []
+
+    def __call__(self, url):
+        self.urls.append(url)
+        return self.count
+
+
+def test_allocate_counts_up_from_the_pending_count():
+    pending = PendingCount(5)
+    nonces = NonceManager(pending)
+    assert [nonces.allocate("http://validator:8545") for _ in range(3)] == [5, 6, 7]
+    assert pending.urls == ["http://validator:8545"]
+    assert nonces.stats()["in_flight"] == 3
+
+
+def test_released_nonce_is_handed_out_again():
+    nonces = NonceManager(PendingCount(0))
+    first, second, third = nonces.allocate(), nonces.allocate(), nonces.allocate()
+    nonces.release(second)
+    nonces.done(third)
+    # The transaction with nonce 1 never reached the pool: without reuse, nonce 2 could never be mined.
+    assert nonces.allocate() == second
+    nonces.release(nonces.allocate())
+    assert nonces.allocate() == 3
+    nonces.release(first)
+    nonces.release(first)
+    assert nonces.allocate() == first and nonces.allocate() == 4
+
+
+def test_resync_keeps_the_nonces_of_other_senders():
+    pending = PendingCount(0)
+    nonces = NonceManager(pending)
+    in_flight = [nonces.allocate() for _ in range(3)]
+    # Nonce 1 was rejected; the node's pool has 0 and 2 but has not counted past 0 yet.
+    pending.count = 1
+    nonces.resync(in_flight[1])
+    assert nonces.stats()["in_flight"] == 2
+    assert nonces.allocate() == 1
+    assert nonces.allocate() == 3
+    assert len(pending.urls) == 2 and nonces.stats()["resyncs"] == 1
+
+
+def test_concurrent_allocations_are_unique():
+    nonces = NonceManager(PendingCount(10))
+    allocated = []
+
+    def allocate():
+        for _ in range(100):
+            allocated.append(nonces.allocate())
+
+    threads = [threading.Thread(target=allocate) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(allocated) == list(range(10, 810))
+
+
+def test_nonce_errors():
+    assert NonceManager.is_nonce_error(Exception("Nonce too low"))
+    assert NonceManager.is_nonce_error(Exception("Replacement transaction underpriced"))
+    assert not NonceManager.is_nonce_error(Exception("execution reverted"))
+
+
+@pytest.fixture
+def emulated():
+    """(emulated chain, ChainGateway on its JSON-RPC endpoint)."""
+    pytest.importorskip("eth_account")
+    from chain_gateway import ChainGateway
+    from node_registry_emulator import EmulatorRPC, from_artifact
+
+    chain = from_artifact(ARTIFACT)
+    server = EmulatorRPC(chain).serve(port=0)
+    try:
+        yield chain, ChainGateway(f"http://127.0.0.1:{server.server_address[1]}", ARTIFACT, KEYS_FILE, receipt_timeout=5)
+    finally:
+        server.shutdown()
+
+
+def test_rejected_transaction_leaves_no_gap(emulated, monkeypatch):
+    from chain_gateway import ChainError
+    chain, gateway = emulated
+    gateway.register_node(*node(0, "Edge"))
+
+    rpc = gateway.rpc
+    rejected = []
+
+    def reject_first_send(method, params=None, url=None):
+        if method == "eth_sendRawTransaction" and not rejected:
+            rejected.append(params)
+            raise ChainError("Transaction gas price below the minimum")
+        return rpc(method, params, url=url)
+    monkeypatch.setattr(gateway, "rpc", reject_first_send)
+
+    with pytest.raises(ChainError, match="gas price"):
+        gateway.register_node(*node(1, "Edge"))
+    # The rejected nonce is reused: this transaction is mined instead of waiting behind a gap.
+    gateway.register_node(*node(2, "Fog"))
+    account = gateway._load_account().address
+    assert chain.transaction_count(account) == chain.transaction_count(account, "pending") == 2
+    assert gateway.are_nodes_registered(["0xsig0", "0xsig1", "0xsig2"]) == [True, False, True]
+
+
+def test_nonce_error_resyncs_and_resends(emulated):
+    from chain_gateway import ChainGateway
+    chain, gateway = emulated
+    gateway.register_node(*node(0, "Edge"))
+
+    # Another process sends from the same account: this gateway's next nonce is taken.
+    other = ChainGateway(gateway.rpc_url, ARTIFACT, KEYS_FILE, receipt_timeout=5)
+    other.register_node(*node(1, "Edge"))
+    gateway.register_node(*node(2, "Fog"))
+    assert gateway.nonces.stats()["resyncs"] == 1
+    assert gateway.are_nodes_registered(["0xsig0", "0xsig1", "0xsig2"]) == [True, True, True]
+
+
+def test_gateways_on_their_own_accounts_do_not_resync(emulated):
+    from chain_gateway import ChainGateway
+    chain, gateway = emulated
+    # The gateways of two prefork workers, each with its own prefunded account.
+    other = ChainGateway(gateway.rpc_url, ARTIFACT, KEYS_FILE, receipt_timeout=5, account_index=1)
+    threads = [threading.Thread(target=sender.register_node, args=node(index, "Edge")) for index, sender in enumerate((gateway, other, gateway, other))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert gateway._load_account().address != other._load_account().address
+    assert gateway.nonces.stats()["resyncs"] == other.nonces.stats()["resyncs"] == 0
+    assert gateway.are_nodes_registered(["0xsig0", "0xsig1", "0xsig2", "0xsig3"]) == [True] * 4
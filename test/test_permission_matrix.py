@@ -0,0 +1,54 @@
+"""PermissionMatrix: masks compiled from the contract's policies and their check against the artifact."""
+import os
+from permission_matrix import NODE_TYPES, NO_POLICY, POLICIES, PermissionMatrix, node_type_index, parse_policy, permission_mask, permission_names
+import stub_chain
+
+from conftest import CLOUD_DIR
+
+ARTIFACT = os.path.join(CLOUD_DIR, "data", "NodeRegistry.json")
+
+
+def test_masks_match_the_policy_strings():
+    matrix = PermissionMatrix()
+    for from_type in NODE_TYPES:
+        for to_type in NODE_TYPES:
+            policy = stub_chain.POLICIES.get((from_type, to_type), NO_POLICY)
+            assert matrix.policy_string(from_type, to_type) == policy
+            parsed = parse_policy(policy)
+            assert matrix.mask(from_type, to_type) == (parsed[1] if parsed else 0)
+    assert permission_names(matrix.mask("Edge", "Fog")) == ["READ", "REMOVE"]
+    assert matrix.allows("Sensor", "Edge", "write") and not matrix.allows("Sensor", "Edge", "READ")
+    assert not matrix.allows("Cloud", "Sensor", "READ")
+
+
+def test_node_types_and_actions():
+    matrix = PermissionMatrix()
+    assert node_type_index("Fog") == node_type_index("2") == node_type_index(2) == 2
+    assert node_type_index("Drone") == node_type_index(None) == node_type_index(9) == 0
+    assert matrix.mask("3", 1) == matrix.mask("Edge", "Cloud")
+    assert matrix.flow("3", "Cloud") == "Edge->Cloud"
+    assert PermissionMatrix.action_bit("EXECUTE") and not PermissionMatrix.action_bit("TRANSMIT")
+    assert matrix.grants("WRITE") and not matrix.grants("EXECUTE") and not matrix.grants("TRANSMIT")
+    assert permission_mask(["read", " WRITE ", "FLY"]) == permission_mask(["READ", "WRITE"])
+    assert parse_policy("NO POLICY") is None and parse_policy("") is None
+
+
+def test_verified_against_the_deployed_contract():
+    matrix = PermissionMatrix()
+    assert matrix.verify(ARTIFACT) == [] and matrix.verified
+
+
+def test_differences_are_reported():
+    policies = dict(POLICIES)
+    policies[("Edge", "Fog")] = ("READ",)
+    policies[("Cloud", "Sensor")] = ("READ",)
+    matrix = PermissionMatrix(policies)
+    problems = matrix.verify(ARTIFACT)
+    assert not matrix.verified
+    assert problems == ["Cloud->Sensor: table has ['READ'], contract has []",
+                        "Edge->Fog: table has ['READ'], contract has ['READ', 'REMOVE']"]
+
+    matrix = PermissionMatrix()
+    problems = matrix.verify(ARTIFACT, deployed_code="0x6080")
+    assert not matrix.verified and len(problems) == len(POLICIES)
+    assert all(problem.endswith("is not in the deployed code") for problem in problems)
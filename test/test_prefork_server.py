@@ -0,0 +1,53 @@
+"""prefork_server.serve: every worker has its own index, kept when the worker is started again."""
+import multiprocessing
+import os
+import signal
+import socket
+import time
+import pytest
+
+flask = pytest.importorskip("flask")
+import prefork_server
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def started_workers(log_path, count, timeout=20):
+    """The (index, pid) of the first `count` workers that built their app."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if os.path.exists(log_path):
+            with open(log_path, "r") as log_file:
+                lines = [line.split() for line in log_file.read().splitlines()]
+            if len(lines) >= count:
+                return [(int(index), int(pid)) for index, pid in lines[:count]]
+        time.sleep(0.05)
+    raise AssertionError(f"{count} workers did not start in {timeout}s")
+
+
+def test_restarted_worker_keeps_its_index(tmp_path):
+    log_path = str(tmp_path / "workers.log")
+
+    def create_app(runtime_dir, worker_index):
+        with open(log_path, "a") as log_file:
+            log_file.write(f"{worker_index} {os.getpid()}\n")
+        return flask.Flask(__name__)
+
+    server = multiprocessing.get_context("fork").Process(target=prefork_server.serve, args=(create_app, "127.0.0.1", free_port(), 3, 2, 5))
+    server.start()
+    try:
+        workers = started_workers(log_path, 3)
+        assert sorted(index for index, _ in workers) == [0, 1, 2]
+
+        index, pid = workers[1]
+        os.kill(pid, signal.SIGKILL)
+        restarted = started_workers(log_path, 4)[3]
+        assert restarted[0] == index and restarted[1] != pid
+    finally:
+        os.kill(server.pid, signal.SIGTERM)
+        server.join(15)
+    assert server.exitcode == 0
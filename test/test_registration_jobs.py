@@ -0,0 +1,136 @@
+"""RegistrationJobs and the /register-node routes of the root registry on a StubChain."""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from registration_jobs import ACKED, COMPLETED, FAILED, ON_CHAIN, VERIFYING, RegistrationJobs
+from load_test import make_identity
+
+
+class Steps:
+    """A step function walking a job through on-chain and acked; `release` lets the acked step finish."""
+
+    def __init__(self):
+        self.jobs = RegistrationJobs(self)
+        self.release = threading.Event()
+        self.runs = []
+
+    def __call__(self, job):
+        jobs = self.jobs
+        self.runs.append(job["state"])
+        if job["state"] == VERIFYING:
+            jobs.set_state(job, ON_CHAIN, "On chain.")
+            return 0
+        if job["state"] == ON_CHAIN:
+            jobs.set_state(job, ACKED, "Waiting.", timeout=60)
+            return 0
+        if job["state"] == ACKED:
+            if not self.release.is_set():
+                return 0.05
+            return jobs.finish(job, COMPLETED, 200, "Done.")
+        raise ValueError(f"unexpected state {job['state']}")
+
+
+def test_job_runs_through_its_states():
+    steps = Steps()
+    jobs = steps.jobs
+    job = jobs.submit({"node_id": "N-0"})
+    assert jobs.get(job["job_id"]) is job
+
+    job = jobs.wait(job["job_id"], 5)
+    while job["state"] != ACKED:
+        job = jobs.wait(job["job_id"], 5)
+    assert job["status"] == "pending" and not RegistrationJobs.timed_out(job)
+    time.sleep(0.2)
+    assert steps.runs.count(ACKED) >= 2  # Re-run by the timer while waiting.
+
+    steps.release.set()
+    job = jobs.wait(job["job_id"], 5)
+    assert (job["state"], job["status"], job["http_status"]) == (COMPLETED, "success", 200)
+    assert [entry["state"] for entry in job["history"]] == [VERIFYING, ON_CHAIN, ACKED, COMPLETED]
+    assert "request" not in RegistrationJobs.public(job) and "context" not in RegistrationJobs.public(job)
+
+
+def test_raising_step_fails_the_job():
+    def step(job):
+        raise RuntimeError("chain unreachable")
+    failing = RegistrationJobs(step)
+    job = failing.wait(failing.submit({"node_id": "N-0"})["job_id"], 5)
+    assert (job["state"], job["status"], job["http_status"]) == (FAILED, "error", 500)
+    assert "chain unreachable" in job["message"]
+
+
+def test_callback_gets_the_finished_job():
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            received.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        finishing = RegistrationJobs(lambda job: finishing.finish(job, COMPLETED, 200, "Done."))
+        job = finishing.submit({"node_id": "N-0"}, callback_url=f"http://127.0.0.1:{server.server_address[1]}/done")
+        deadline = time.monotonic() + 5
+        while not received and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        server.shutdown()
+    assert received == [RegistrationJobs.public(job)]
+    assert received[0]["state"] == COMPLETED
+
+
+def test_shared_store(tmp_path):
+    store_dir = str(tmp_path / "jobs")
+    owner = RegistrationJobs(lambda job: None, store_dir=store_dir)
+    other = RegistrationJobs(lambda job: None, store_dir=store_dir)
+    job = owner.submit({"node_id": "N-0"})
+    assert other.get(job["job_id"])["state"] == VERIFYING
+    owner.finish(job, COMPLETED, 200, "Done.")
+    assert other.wait(job["job_id"], 5)["state"] == COMPLETED
+    assert other.get("unknown") is None and other.get("../jobs") is None
+
+
+def register_request(client, data):
+    response = client.post("/register-node", json=data)
+    assert response.status_code == 202
+    job_id = response.get_json()["job_id"]
+    assert response.headers["Location"] == f"/register-node/{job_id}"
+    for _ in range(20):
+        job = client.get(f"/register-node/{job_id}", query_string={"wait": 5}).get_json()
+        if job["status"] != "pending":
+            return job
+    raise AssertionError(f"registration job {job_id} did not finish")
+
+
+def test_register_node_route(registry, chain):
+    client = registry.app.test_client()
+    sensor = make_identity(0, "Sensor", "registration-jobs")
+
+    job = register_request(client, sensor)
+    assert (job["state"], job["http_status"]) == (COMPLETED, 200)
+    assert chain.is_node_registered(sensor["signature"])
+
+    job = register_request(client, sensor)
+    assert (job["state"], job["http_status"], job["message"]) == (FAILED, 409, "Node already registered on the blockchain")
+    job = register_request(client, dict(make_identity(1, "Sensor", "registration-jobs"), node_name="Renamed"))
+    assert (job["state"], job["http_status"]) == (FAILED, 400)
+
+    assert client.get("/register-node/0123abcd").status_code == 404
+
+
+def test_register_node_rejects_malformed_requests(registry):
+    client = registry.app.test_client()
+    incomplete = make_identity(0, "Sensor", "registration-jobs")
+    del incomplete["rpcURL"]
+    for response in (client.post("/register-node", data="not json", content_type="text/plain"),
+                     client.post("/register-node", json=["not", "an", "object"]),
+                     client.post("/register-node", json=incomplete)):
+        assert response.status_code == 400 and "Missing node details" in response.get_json()["message"]
+    assert registry.registration_jobs.jobs == {}
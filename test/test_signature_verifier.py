@@ -0,0 +1,66 @@
+"""SignatureVerifier: the verification memo, single misses in the calling thread and batches in worker processes."""
+from signature_verifier import SignatureVerifier, verify_identity
+from load_test import make_identity
+
+
+def identities(count, seed="signature-verifier"):
+    return [make_identity(index, "Edge", seed) for index in range(count)]
+
+
+def forged(data):
+    return dict(data, node_name=data["node_name"] + "-forged")
+
+
+def test_identity_signature():
+    data = identities(1)[0]
+    assert verify_identity(data)
+    assert not verify_identity(forged(data))
+    assert not verify_identity(dict(data, signature="0x1234"))
+    assert not verify_identity({})
+
+
+def test_outcomes_are_remembered():
+    verifier = SignatureVerifier(processes=0)
+    data = identities(1)[0]
+    assert verifier.verify(data) and not verifier.verify(forged(data))
+    assert verifier.verify(data) and not verifier.verify(forged(data))
+    assert verifier.stats()["hits"] == 2 and verifier.stats()["misses"] == 2 and verifier.stats()["entries"] == 2
+
+
+def test_memo_is_bounded():
+    verifier = SignatureVerifier(max_entries=2, processes=0)
+    first, second, third = identities(3)
+    verifier.verify(first)
+    verifier.verify(second)
+    verifier.verify(first)
+    verifier.verify(third)  # second is the least recently used.
+    hits = verifier.stats()["hits"]
+    verifier.verify(first)
+    verifier.verify(third)
+    assert verifier.stats()["hits"] == hits + 2
+    verifier.verify(second)
+    assert verifier.stats()["hits"] == hits + 2 and verifier.stats()["entries"] == 2
+
+
+def test_single_miss_is_verified_without_the_pool():
+    verifier = SignatureVerifier(processes=2)
+    try:
+        data = identities(1)[0]
+        assert verifier.verify(data) and not verifier.verify(forged(data))
+        assert verifier._pool is None
+    finally:
+        verifier.close()
+
+
+def test_batch_misses_run_in_worker_processes():
+    verifier = SignatureVerifier(processes=2)
+    try:
+        nodes = identities(4)
+        verifier.verify(nodes[0])
+        batch = [nodes[1], forged(nodes[2]), nodes[0], nodes[3], nodes[1]]
+        assert verifier.verify_many(batch) == [True, False, True, True, True]
+        assert verifier._pool is not None and verifier.stats()["processes"] == 2
+        assert verifier.stats()["entries"] == 4
+        assert verifier.verify_many(batch) == [True, False, True, True, True]
+    finally:
+        verifier.close()
@@ -0,0 +1,97 @@
+"""TokenCache on its own and as the registry keeps it, invalidated by the token events of a StubChain."""
+import time
+from token_cache import TokenCache
+
+
+def token(policy="Edge->Fog:READ,REMOVE", issued_at=1000):
+    return {"policy": policy, "issuedAt": issued_at, "isIssued": True, "isRevoked": False}
+
+
+def test_entries_expire_and_are_bounded():
+    cache = TokenCache(max_entries=2)
+    cache.put("a", "b", token())
+    cache.put("a", "c", token())
+    assert cache.get("a", "b") == token()
+    cache.put("a", "d", token())  # ("a", "c") is the least recently used.
+    assert cache.get("a", "c") is None and cache.get("a", "b") is not None and cache.get("a", "d") is not None
+
+    cache = TokenCache(ttl=0)
+    cache.put("a", "b", token())
+    assert cache.get("a", "b") is None and cache.stats()["entries"] == 0
+
+
+def test_token_event_drops_only_its_pair():
+    cache = TokenCache()
+    cache.put("a", "b", token())
+    cache.put("b", "a", token())
+    cache.on_token_event({"event": "TokenRevoked", "args": {"fromNodeSignature": "a", "toNodeSignature": "b"}})
+    assert cache.get("a", "b") is None and cache.get("b", "a") is not None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_rules_match_the_contract():
+    assert TokenCache.from_issued_event({"policy": "Edge->Fog:READ,REMOVE", "issuedAt": "1000"}) == token()
+    assert TokenCache.is_available(token())
+    assert not TokenCache.is_available(dict(token(), isRevoked=True))
+    assert not TokenCache.is_expired(token(), 60, now=1060)
+    assert TokenCache.is_expired(token(), 60, now=1061)
+    assert TokenCache.is_expired(dict(token(), isIssued=False), 60, now=1000)
+
+
+def test_registry_reads_a_token_once_until_an_event_names_its_pair(registry, chain, register):
+    edge, fog = register(0, "Edge"), register(1, "Fog")
+    cloud = registry.identity.get()["signature"]
+    chain.issue_token(edge, cloud)
+    chain.issue_token(fog, cloud)
+    registry.chain_events.poll()
+
+    assert registry.get_capability_token(edge, cloud)["isIssued"]
+    assert registry.get_capability_token(fog, cloud)["isIssued"]
+    calls = chain.calls
+    assert registry.check_token_availability(edge, cloud)
+    assert not registry.check_token_expiry(edge, cloud, 60)
+    assert chain.calls == calls
+
+    # Revoked through another registry: the cached token stands until the event is handled.
+    chain.revoke_token(edge, cloud)
+    assert registry.check_token_availability(edge, cloud)
+    registry.chain_events.poll()
+    assert not registry.check_token_availability(edge, cloud)
+    assert chain.calls == calls + 1
+    assert registry.get_capability_token(fog, cloud)["isIssued"] and chain.calls == calls + 1
+
+    # Issued again: the TokenIssued event drops the revoked token.
+    chain.issue_token(edge, cloud)
+    registry.chain_events.poll()
+    assert registry.check_token_availability(edge, cloud)
+    assert registry.token_cache.stats()["invalidations"] == 2
+
+
+def test_token_read_before_a_handled_event_is_not_cached(registry, chain, register, monkeypatch):
+    edge = register(0, "Edge")
+    cloud = registry.identity.get()["signature"]
+    chain.issue_token(edge, cloud)
+    registry.chain_events.poll()
+
+    # The follower handles the revocation while the token read is in flight.
+    get_token = chain.get_token
+
+    def slow_get_token(from_signature, to_signature):
+        result = get_token(from_signature, to_signature)
+        chain.revoke_token(from_signature, to_signature)
+        registry.chain_events.poll()
+        return result
+    monkeypatch.setattr(chain, "get_token", slow_get_token)
+    assert registry.get_capability_token(edge, cloud)["isIssued"]
+    monkeypatch.setattr(chain, "get_token", get_token)
+    assert registry.get_capability_token(edge, cloud)["isRevoked"]
+
+
+def test_issued_token_is_cached_from_its_receipt(registry, chain, register):
+    edge = register(0, "Edge")
+    cloud = registry.identity.get()["signature"]
+    registry.issue_capability_token(edge, cloud)
+    calls = chain.calls
+    cached = registry.get_capability_token(edge, cloud)
+    assert chain.calls == calls
+    assert cached["policy"] == "Edge->Cloud:WRITE,UPDATE" and abs(cached["issuedAt"] - time.time()) < 5
@@ -0,0 +1,90 @@
+"""ValidatorProposalListener on a StubChain: the persisted cursor and the pending proposals."""
+import json
+import validator_proposals
+from validator_proposals import ValidatorProposalListener
+
+FIRST = "0x" + "aa" * 20
+SECOND = "0x" + "bb" * 20
+
+
+def record_votes(chain, monkeypatch):
+    votes = []
+    monkeypatch.setattr(chain, "propose_validator_vote", lambda address, add: votes.append(address) or True)
+    return votes
+
+
+def test_pending_proposals_are_voted_for_until_accepted(registry, chain, monkeypatch, tmp_path):
+    votes = record_votes(chain, monkeypatch)
+    listener = ValidatorProposalListener(registry, str(tmp_path / "proposals.json"))
+    chain.emit_validator_proposal(FIRST)
+    chain.emit_validator_proposal(SECOND)
+    listener.follower.poll()
+    assert listener.pending == {FIRST, SECOND}
+
+    listener.propose_pending("CL-001", "Cloud_Node")
+    listener.propose_pending("CL-001", "Cloud_Node")
+    assert votes == [FIRST, SECOND, FIRST, SECOND]
+
+    chain.validators.append(FIRST)
+    listener.propose_pending("CL-001", "Cloud_Node")
+    assert listener.pending == {SECOND} and votes[4:] == [SECOND]
+    with open(tmp_path / "proposals.json", "r") as state_file:
+        assert json.load(state_file)["pending"] == [SECOND]
+
+
+def test_restart_continues_from_the_cursor(registry, chain, monkeypatch, tmp_path):
+    state_path = str(tmp_path / "proposals.json")
+    listener = ValidatorProposalListener(registry, state_path)
+    chain.emit_validator_proposal(FIRST)
+    listener.follower.poll()
+    chain.validators.append(FIRST)
+    listener.propose_pending("CL-001", "Cloud_Node")
+    with open(state_path, "r") as state_file:
+        assert json.load(state_file) == {"cursor": listener.follower.cursor(), "pending": []}
+
+    chain.emit_validator_proposal(SECOND)
+    ranges = []
+    get_contract_logs = chain.get_contract_logs
+    monkeypatch.setattr(chain, "get_contract_logs", lambda names, from_block, to_block: ranges.append((from_block, to_block)) or get_contract_logs(names, from_block, to_block))
+    restarted = ValidatorProposalListener(registry, state_path)
+    restarted.follower.poll()
+    # Only the block mined since the saved cursor is read; the accepted proposal is not pending again.
+    assert ranges == [(chain.head_block(), chain.head_block())]
+    assert restarted.pending == {SECOND}
+
+
+def test_unreadable_state_reads_from_block_zero(registry, chain, tmp_path):
+    state_path = tmp_path / "proposals.json"
+    chain.emit_validator_proposal(FIRST)
+    state_path.write_text("{")
+    listener = ValidatorProposalListener(registry, str(state_path))
+    listener.follower.poll()
+    assert listener.pending == {FIRST}
+    assert json.loads(state_path.read_text())["cursor"]["block"] == chain.head_block()
+
+
+def test_run_returns_after_failed_polls(registry, chain, monkeypatch, tmp_path):
+    sleeps = []
+    monkeypatch.setattr(validator_proposals.time, "sleep", sleeps.append)
+    listener = ValidatorProposalListener(registry, str(tmp_path / "proposals.json"), poll_interval=5, max_failures=2)
+    polls = []
+
+    def poll():
+        polls.append(len(polls))
+        if len(polls) in (2, 4, 5):
+            raise ConnectionError("node down")
+    monkeypatch.setattr(listener.follower, "poll", poll)
+    # A success in between resets the count: it takes two failures in a row.
+    listener.run("CL-001", "Cloud_Node")
+    assert len(polls) == 5 and sleeps == [5] * 4
+
+
+def test_listener_is_restarted_while_a_validator(registry, monkeypatch):
+    import root_node_registration
+    monkeypatch.setattr(root_node_registration.time, "sleep", lambda seconds: None)
+    checks = iter([True, True, False])
+    monkeypatch.setattr(registry, "checkValidator", lambda signature: next(checks))
+    runs = []
+    monkeypatch.setattr(ValidatorProposalListener, "run", lambda self, node_id, node_name: runs.append(node_id))
+    registry.listenForValidatorProposal()
+    assert runs == ["CL-001", "CL-001"]